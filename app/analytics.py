@@ -0,0 +1,190 @@
+"""Hourly and daily rollups of chat, ticket and feedback activity.
+
+Every insert adds to an in-process ``RollupAccumulator`` (a few dictionary increments); a
+background task periodically merges the accumulated deltas into the ``analytics_rollups`` table
+with additive upserts. ``/api/analytics`` reads only that table, whose size depends on the number
+of buckets and dimensions rather than on chat volume, so dashboards never scan the live tables.
+
+Buckets are prefixes of the ISO ``created_at`` strings (``2024-05-01T13`` for an hour,
+``2024-05-01`` for a day), so the same SQL works on SQLite and PostgreSQL.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .config import ANALYTICS_FLUSH_INTERVAL
+
+if TYPE_CHECKING:
+    from .storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# (granularity, bucket, metric, dimension)
+RollupKey = Tuple[str, str, str, str]
+
+GRANULARITIES = {"hour": (13, timedelta(hours=1)), "day": (10, timedelta(days=1))}
+
+# Metrics and their dimension: chats and confidence_sum by intent, answers by source (faq/llm),
+# tickets by priority, feedback by rating.
+_SOURCE_QUERIES = [
+    ("chats", "COALESCE(intent, '')", "COUNT(*)", "chat_logs", ""),
+    ("confidence_sum", "COALESCE(intent, '')", "SUM(COALESCE(confidence, 0))", "chat_logs", ""),
+    ("answers", "source", "COUNT(*)", "chat_logs", " AND source IS NOT NULL"),
+    # By the priority a ticket was opened with, as recorded when it was created.
+    ("tickets", "COALESCE(opened_priority, priority)", "COUNT(*)", "tickets", ""),
+    ("feedback", "rating", "COUNT(*)", "feedback", ""),
+]
+
+# Recomputes the rollups of the buckets from ``?1`` up to, not including, the day ``?2`` (bucket
+# labels; "" for ``?1`` starts at the beginning) from the source tables. Only used to backfill or
+# repair the table.
+REBUILD_STATEMENTS = [
+    "DELETE FROM analytics_rollups WHERE bucket >= ?1 AND bucket < ?2",
+    *(
+        f"""
+        INSERT INTO analytics_rollups (granularity, bucket, metric, dimension, value)
+        SELECT '{granularity}', substr(created_at, 1, {length}), '{metric}', {dimension}, {value}
+        FROM {source}
+        WHERE created_at >= ?1 AND created_at < ?2{condition}
+        GROUP BY substr(created_at, 1, {length}), {dimension}
+        """
+        for granularity, (length, _) in GRANULARITIES.items()
+        for metric, dimension, value, source, condition in _SOURCE_QUERIES
+    ),
+]
+
+
+class RollupAccumulator:
+    """Thread-safe rollup deltas not yet written to ``analytics_rollups``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._deltas: Dict[RollupKey, float] = defaultdict(float)
+        self.flushes = 0
+
+    def _add(self, created_at: str, metric: str, dimension: str, value: float = 1.0) -> None:
+        with self._lock:
+            for granularity, (length, _) in GRANULARITIES.items():
+                self._deltas[(granularity, created_at[:length], metric, dimension)] += value
+
+    def record_chat(self, created_at: str, intent: Optional[str], confidence: Optional[float], source: Optional[str]) -> None:
+        self._add(created_at, "chats", intent or "")
+        self._add(created_at, "confidence_sum", intent or "", confidence or 0.0)
+        if source is not None:
+            self._add(created_at, "answers", source)
+
+    def record_ticket(self, created_at: str, priority: str) -> None:
+        self._add(created_at, "tickets", priority)
+
+    def record_feedback(self, created_at: str, rating: str) -> None:
+        self._add(created_at, "feedback", rating)
+
+    def drain(self) -> Dict[RollupKey, float]:
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(float)
+            return dict(deltas)
+
+    def discard_before(self, bucket: str) -> None:
+        """Drops the deltas of every bucket that sorts before ``bucket``."""
+        with self._lock:
+            for key in [key for key in self._deltas if key[1] < bucket]:
+                del self._deltas[key]
+
+    def restore(self, deltas: Mapping[RollupKey, float]) -> None:
+        """Puts back deltas whose flush failed so the next flush retries them."""
+        with self._lock:
+            for key, value in deltas.items():
+                self._deltas[key] += value
+
+    def peek(self, granularity: str, since: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"bucket": bucket, "metric": metric, "dimension": dimension, "value": value}
+                for (key_granularity, bucket, metric, dimension), value in self._deltas.items()
+                if key_granularity == granularity and bucket >= since
+            ]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"pending_keys": len(self._deltas), "flushes": self.flushes}
+
+
+rollups = RollupAccumulator()
+
+
+async def flush(storage: "Storage") -> int:
+    deltas = rollups.drain()
+    if not deltas:
+        return 0
+    try:
+        await storage.merge_rollups(deltas)
+    except BaseException:
+        rollups.restore(deltas)
+        raise
+    rollups.flushes += 1
+    return len(deltas)
+
+
+async def rebuild(storage: "Storage", now: Optional[datetime] = None) -> str:
+    """Recomputes the rollups of past days from the source tables; returns the first day kept.
+
+    Only days that ended at least two flush intervals ago are rebuilt. Their rows are committed
+    and every worker has merged its deltas for them, so the recomputed buckets are exact; this
+    process's leftover deltas for them are dropped. Newer buckets and their pending deltas are
+    left alone, as are days whose chat logs were archived by retention. With periodic flushing
+    off (``ANALYTICS_FLUSH_INTERVAL <= 0``) other workers only merge on shutdown, so rebuild
+    from a single worker then.
+    """
+    settle = timedelta(seconds=2 * max(ANALYTICS_FLUSH_INTERVAL, 0))
+    until = ((now or datetime.utcnow()) - settle).date().isoformat()
+    rollups.discard_before(until)
+    await storage.rebuild_rollups(until)
+    return until
+
+
+async def flush_periodically(storage: "Storage", interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush(storage)
+        except Exception:
+            logger.exception("Failed to flush analytics rollups; will retry")
+
+
+def since_bucket(granularity: str, buckets: int, now: Optional[datetime] = None) -> str:
+    """Returns the oldest bucket label of the ``buckets`` most recent ones, the current one included."""
+    length, step = GRANULARITIES[granularity]
+    start = (now or datetime.utcnow()) - step * (buckets - 1)
+    return start.isoformat()[:length]
+
+
+def summarize(rows: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Folds ``(bucket, metric, dimension, value)`` rows into one summary per bucket, oldest first."""
+    grouped: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+    for row in rows:
+        grouped[row["bucket"]][row["metric"]][row["dimension"]] += row["value"]
+
+    summaries = []
+    for bucket in sorted(grouped):
+        metrics = grouped[bucket]
+        chats = sum(metrics["chats"].values())
+        tickets = sum(metrics["tickets"].values())
+        summaries.append(
+            {
+                "bucket": bucket,
+                "chats": int(chats),
+                "intents": {intent: int(count) for intent, count in metrics["chats"].items()},
+                "faq_answers": int(metrics["answers"]["faq"]),
+                "llm_answers": int(metrics["answers"]["llm"]),
+                "avg_confidence": round(sum(metrics["confidence_sum"].values()) / chats, 4) if chats else None,
+                "tickets": int(tickets),
+                "ticket_rate": round(tickets / chats, 4) if chats else None,
+                "feedback_up": int(metrics["feedback"]["up"]),
+                "feedback_down": int(metrics["feedback"]["down"]),
+            }
+        )
+    return summaries
@@ -0,0 +1,153 @@
+"""Bulk classification and answering of archived chat requests.
+
+Usage:
+    python -m app.batch requests.jsonl > responses.ndjson
+
+Each input line is a ``ChatRequest`` JSON object; each output line is the matching
+``ChatResponse``. Requests are processed in chunks: intent detection and FAQ matching run over
+a whole chunk at once, LLM fallbacks run with bounded concurrency, and each chunk's chat logs
+and tickets are written in a single transaction. Session history is not used, since archived
+questions are replayed independently.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from . import db, metrics
+from .config import (
+    BATCH_CHUNK_SIZE,
+    BATCH_LLM_CONCURRENCY,
+    DEFAULT_LOW_CONFIDENCE_THRESHOLD,
+    FAQ_MATCH_THRESHOLD,
+    FAQ_PATH,
+    LLM_MIN_CONFIDENCE,
+)
+from .faq import FAQService
+from .intent import detect_intents
+from .llm import agenerate_response
+from .schemas import ChatRequest, ChatResponse
+from .storage import SQLiteStorage, Storage, create_storage
+
+
+def _chunks(requests: Iterable[ChatRequest], size: int) -> Iterator[List[ChatRequest]]:
+    chunk: List[ChatRequest] = []
+    for request in requests:
+        chunk.append(request)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _answer_chunk(
+    chunk: List[ChatRequest],
+    faq_service: FAQService,
+    storage: Storage,
+    llm_slots: asyncio.Semaphore,
+) -> List[ChatResponse]:
+    messages = [request.message for request in chunk]
+    intents, matches = await asyncio.gather(
+        asyncio.to_thread(detect_intents, messages),
+        asyncio.to_thread(faq_service.best_matches, messages),
+    )
+
+    async def answer(
+        message: str, faq_answer: Optional[str], faq_score: float, intent_score: float
+    ) -> tuple[str, float, str]:
+        if faq_answer and faq_score >= FAQ_MATCH_THRESHOLD:
+            metrics.inc(metrics.chat_path_total, "faq")
+            return faq_answer, faq_score, "faq"
+        async with llm_slots:
+            response = await agenerate_response(message, context=faq_answer)
+        metrics.inc(metrics.chat_path_total, "llm")
+        return response, max(intent_score, faq_score, LLM_MIN_CONFIDENCE), "llm"
+
+    answers = await asyncio.gather(
+        *(
+            answer(message, faq_answer, faq_score, intent_score)
+            for message, (faq_answer, faq_score), (_, intent_score) in zip(messages, matches, intents)
+        )
+    )
+
+    entries = []
+    for request, (intent, _), (bot_response, confidence, source) in zip(chunk, intents, answers):
+        create_ticket = intent == "escalation" or confidence < DEFAULT_LOW_CONFIDENCE_THRESHOLD
+        entries.append((request.message, bot_response, intent, confidence, request.session_id, create_ticket, source))
+    ids = await storage.insert_chat_batch(entries)
+    for _, _, ticket_created in ids:
+        if ticket_created:
+            metrics.inc(metrics.tickets_created_total)
+
+    return [
+        ChatResponse(
+            response=bot_response,
+            intent=intent,
+            confidence=round(confidence, 2),
+            created_ticket=ticket_created,
+            ticket_id=ticket_id,
+            chat_log_id=chat_log_id,
+            session_id=request.session_id,
+            context_summary=faq_answer,
+        )
+        for request, (intent, _), (bot_response, confidence, _), (faq_answer, _), (
+            chat_log_id,
+            ticket_id,
+            ticket_created,
+        ) in zip(chunk, intents, answers, matches, ids)
+    ]
+
+
+async def answer_batch(
+    requests: Iterable[ChatRequest],
+    faq_service: FAQService,
+    storage: Storage,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+) -> AsyncIterator[ChatResponse]:
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    for chunk in _chunks(requests, chunk_size):
+        for response in await _answer_chunk(chunk, faq_service, storage, llm_slots):
+            yield response
+
+
+async def _run(input_lines: Iterable[str], output) -> int:
+    faq_service = FAQService(FAQ_PATH)
+    faq_service.load()
+    storage = create_storage()
+    await storage.start()
+    if not isinstance(storage, SQLiteStorage):
+        # The LLM response cache stays in the local SQLite file whichever backend stores chats.
+        await asyncio.to_thread(db.init_db)
+    try:
+        requests = (ChatRequest.parse_raw(line) for line in input_lines if line.strip())
+        count = 0
+        async for response in answer_batch(requests, faq_service, storage):
+            output.write(response.json() + "\n")
+            count += 1
+    finally:
+        await storage.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of chat requests in bulk")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of ChatRequest objects (default: stdin)")
+    args = parser.parse_args()
+
+    try:
+        if args.input == "-":
+            count = asyncio.run(_run(sys.stdin, sys.stdout))
+        else:
+            with open(args.input, "r", encoding="utf-8") as file:
+                count = asyncio.run(_run(file, sys.stdout))
+    finally:
+        db.shutdown()
+    print(json.dumps({"processed": count}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from . import db
+from .faq import fold, words
+
+
+def response_cache_key(user_message: str, context: Optional[str], model: str) -> str:
+    # Case, accents and punctuation do not change the key; words of every script do. A message
+    # without any (only emoji or symbols) is keyed on its folded text instead.
+    normalized = " ".join(words(user_message)) or " ".join(fold(user_message).split())
+    payload = "\x1f".join((model, normalized, context or ""))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of LLM completions with a per-entry TTL.
+
+    When ``persist`` is set, entries are written through to the ``llm_cache`` table and
+    ``load()`` warms the in-memory LRU from it, so cached answers survive restarts.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, persist: bool = False) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key: str, value: str) -> None:
+        created_at = time.time()
+        self._store(key, value, created_at + self.ttl)
+        if self.persist:
+            db.store_llm_cache_entry(key, value, created_at)
+
+    def load(self) -> int:
+        if not self.persist:
+            return 0
+        cutoff = time.time() - self.ttl
+        db.delete_llm_cache_entries(before=cutoff)
+        rows = db.load_llm_cache_entries(since=cutoff, limit=self.max_entries)
+        # Oldest first so the most recent entries end up at the MRU end.
+        for row in reversed(rows):
+            self._store(row["key"], row["response"], row["created_at"] + self.ttl)
+        return len(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
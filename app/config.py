@@ -2,12 +2,122 @@ import os
 import pathlib
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
-DB_PATH = BASE_DIR / "support.sqlite3"
-FAQ_PATH = BASE_DIR / "data" / "faqs.json"
+# ":memory:" gives a throwaway in-memory database on a single pooled connection (for tests)
+DB_PATH = pathlib.Path(os.getenv("DB_PATH", str(BASE_DIR / "support.sqlite3")))
+FAQ_PATH = pathlib.Path(os.getenv("FAQ_PATH", str(BASE_DIR / "data" / "faqs.json")))
+# Compiled, memory-mappable FAQ index shared by worker processes (python -m app.faq_store)
+FAQ_INDEX_PATH = pathlib.Path(os.getenv("FAQ_INDEX_PATH", str(BASE_DIR / "data" / "faqs.idx")))
+INTENT_PATH = pathlib.Path(os.getenv("INTENT_PATH", str(BASE_DIR / "data" / "intents.json")))
 STATIC_DIR = BASE_DIR / "static"
 
+# SQLite connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5.0"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "128"))
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+
+# Storage backend for chat logs, tickets and feedback: "sqlite" (DB_PATH) or "postgres"
+# (DATABASE_URL, needs asyncpg). The LLM response cache always stays in SQLite.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+PG_STATEMENT_CACHE_SIZE = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "128"))
+
+# Retention: chat logs older than RETENTION_DAYS (0 keeps everything) are moved to compressed
+# per-day files under ARCHIVE_DIR, every RETENTION_INTERVAL seconds (<= 0: only on demand)
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "500"))
+RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "1000"))
+ARCHIVE_DIR = pathlib.Path(os.getenv("ARCHIVE_DIR", str(BASE_DIR / "archive")))
+
+# Write-behind batching of chat log and feedback inserts (tickets are always written directly)
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "0") == "1"
+DB_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("DB_WRITE_BEHIND_BATCH_SIZE", "200"))
+DB_WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+DB_WRITE_BEHIND_ID_BLOCK = int(os.getenv("DB_WRITE_BEHIND_ID_BLOCK", "100"))
+
 DEFAULT_LOW_CONFIDENCE_THRESHOLD = 0.4
+# Session id of chat requests that do not send one; shared by all such clients
+DEFAULT_SESSION_ID = "default"
+# FAQ answers at or above this score are returned directly; below it the LLM answers
+FAQ_MATCH_THRESHOLD = 0.5
+# Confidence floor reported for LLM-generated answers
+LLM_MIN_CONFIDENCE = 0.35
+
+# Batch chat API
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "100"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "10000"))
+
+# FAQ retrieval: number of indexed candidates re-scored with SequenceMatcher per query
+FAQ_CANDIDATES = int(os.getenv("FAQ_CANDIDATES", "20"))
+# "lexical" (BM25 + SequenceMatcher re-scoring) or "semantic" (hashed n-gram vectors, needs numpy)
+FAQ_MATCH_MODE = os.getenv("FAQ_MATCH_MODE", "lexical")
+FAQ_VECTOR_DIM = int(os.getenv("FAQ_VECTOR_DIM", "256"))
+# Cosine similarity at which a semantic match counts as an FAQ hit. Semantic scores are rescaled
+# so that this value lands on FAQ_MATCH_THRESHOLD, keeping confidences comparable across modes
+FAQ_SEMANTIC_THRESHOLD = float(os.getenv("FAQ_SEMANTIC_THRESHOLD", "0.31"))
+# Seconds between checks of the FAQ file for changes; negative disables the watcher
+FAQ_RELOAD_INTERVAL = float(os.getenv("FAQ_RELOAD_INTERVAL", "5.0"))
+
+# Seconds between checks of INTENT_PATH for changes; negative disables hot reload
+INTENT_RELOAD_INTERVAL = float(os.getenv("INTENT_RELOAD_INTERVAL", "5.0"))
+
+# Per-session cache of recent chat turns, read instead of chat_logs on each chat request
+HISTORY_CACHE_SESSIONS = int(os.getenv("HISTORY_CACHE_SESSIONS", "10000"))
+HISTORY_CACHE_TURNS = int(os.getenv("HISTORY_CACHE_TURNS", "5"))
+
+# Seconds between merges of in-process analytics counters into the rollup table; <= 0 only
+# writes them on shutdown
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "10"))
+
+# Ticket queue: seconds until a ticket of each priority breaches its SLA, and the default
+# seconds an agent's claim lasts before the ticket goes back to the queue
+TICKET_SLA_URGENT = float(os.getenv("TICKET_SLA_URGENT", "900"))
+TICKET_SLA_HIGH = float(os.getenv("TICKET_SLA_HIGH", "3600"))
+TICKET_SLA_NORMAL = float(os.getenv("TICKET_SLA_NORMAL", "14400"))
+TICKET_LEASE_SECONDS = float(os.getenv("TICKET_LEASE_SECONDS", "300"))
+# Characters of customer text kept on one ticket across repeat contacts; <= 0 keeps everything
+TICKET_MESSAGE_MAX_CHARS = int(os.getenv("TICKET_MESSAGE_MAX_CHARS", "4000"))
+
+# Shared secret for the /api/admin endpoints (X-Admin-Token header); unset leaves them open
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Prometheus-style /metrics and Server-Timing headers
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
 
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "20.0"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5.0"))
+
+# LLM resilience: total deadline per answer (retries included), jittered retry backoff,
+# circuit breaker, and caps on concurrent / per-second calls (0 disables the rate cap)
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.25"))
+LLM_RETRY_BACKOFF_MAX = float(os.getenv("LLM_RETRY_BACKOFF_MAX", "2.0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2.0"))
+
+# LLM response cache (skipped for turns that carry session history)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "0") == "1"
+
+# Prompt size limits (approximate tokens) for LLM requests, including the system prompt
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "1500"))
+PROMPT_TURN_MAX_TOKENS = int(os.getenv("PROMPT_TURN_MAX_TOKENS", "200"))
+
+# Semantic answer cache: reuse an earlier answer when a new question is a near-duplicate
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "2000"))
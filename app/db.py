@@ -1,20 +1,223 @@
+import queue
 import sqlite3
+import sys
+import threading
+import time
 from contextlib import contextmanager
-from datetime import datetime
-from typing import Generator, List, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Mapping, Optional, Sequence, Tuple
 
-from .config import DB_PATH
+from .config import (
+    DB_MMAP_SIZE,
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_WRITE_BEHIND_BATCH_SIZE,
+    DB_WRITE_BEHIND_FLUSH_INTERVAL,
+    DB_WRITE_BEHIND_ID_BLOCK,
+    HISTORY_CACHE_SESSIONS,
+    HISTORY_CACHE_TURNS,
+)
+from .analytics import REBUILD_STATEMENTS, RollupKey, rollups
+from .history import SessionHistoryCache
+from .tickets import (
+    TICKET_COLUMNS,
+    derive_priority,
+    due_at,
+    earlier,
+    lease_until,
+    raise_priority,
+    ticket_message,
+    ticket_session,
+)
+from .writer import WriteBehindWriter
+
+
+def _open_connection(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        path,
+        timeout=DB_POOL_TIMEOUT,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+    )
+    connection.row_factory = sqlite3.Row
+    # Only takes effect on a new, empty database, and must precede the switch to WAL. Lets
+    # retention hand freed pages back to the filesystem in small steps (see app.retention).
+    connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    return connection
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections shared across threads.
+
+    Connections are configured once when opened and handed out LIFO so the warmest connection
+    (page cache, prepared statements) is reused first.
+    """
+
+    def __init__(self, path: Path, max_size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = None
+
+        if connection is None:
+            with self._lock:
+                can_open = self._size < self.max_size
+                if can_open:
+                    self._size += 1
+            if can_open:
+                try:
+                    connection = _open_connection(self.path)
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    connection = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No database connection available within {self.timeout}s") from None
+                waited = time.perf_counter() - started
+                with self._lock:
+                    self._waits += 1
+                    self._wait_seconds += waited
+                    self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+        with self._lock:
+            self._acquired += 1
+        return connection
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        self._idle.put(connection)
+
+    def discard(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            self._size -= 1
+        connection.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(connection)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "idle": self._idle.qsize(),
+                "in_use": self._size - self._idle.qsize(),
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "wait_ms_total": round(self._wait_seconds * 1000, 3),
+                "wait_ms_max": round(self._max_wait_seconds * 1000, 3),
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            # Every connection to ":memory:" opens its own empty database, so share a single one.
+            _pool = ConnectionPool(DB_PATH, max_size=1 if str(DB_PATH) == ":memory:" else DB_POOL_SIZE)
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    history_cache.clear()
+
+
+def pool_stats() -> Dict[str, float]:
+    return get_pool().stats()
+
+
+_writer: Optional[WriteBehindWriter] = None
+
+history_cache = SessionHistoryCache(HISTORY_CACHE_SESSIONS, HISTORY_CACHE_TURNS)
+
+
+def start_write_behind() -> None:
+    global _writer
+    if _writer is None:
+        _writer = WriteBehindWriter(
+            get_connection,
+            batch_size=DB_WRITE_BEHIND_BATCH_SIZE,
+            flush_interval=DB_WRITE_BEHIND_FLUSH_INTERVAL,
+            id_block_size=DB_WRITE_BEHIND_ID_BLOCK,
+        )
+
+
+def stop_write_behind() -> None:
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        writer.close()
+
+
+def flush_write_behind() -> None:
+    if _writer is not None:
+        _writer.flush()
+
+
+def write_behind_stats() -> Optional[Dict[str, int]]:
+    return _writer.stats() if _writer is not None else None
+
+
+def shutdown() -> None:
+    stop_write_behind()
+    close_pool()
 
 
 @contextmanager
 def get_connection() -> Generator[sqlite3.Connection, None, None]:
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    pool = get_pool()
+    connection = pool.acquire()
     try:
         yield connection
         connection.commit()
-    finally:
-        connection.close()
+    except BaseException:
+        try:
+            connection.rollback()
+        except sqlite3.Error:
+            # The connection is unusable; drop it so the pool opens a fresh one.
+            pool.discard(connection)
+        else:
+            pool.release(connection)
+        raise
+    else:
+        pool.release(connection)
 
 
 def init_db() -> None:
@@ -28,7 +231,8 @@ def init_db() -> None:
                 intent TEXT,
                 confidence REAL,
                 created_at TEXT NOT NULL,
-                session_id TEXT NOT NULL DEFAULT 'default'
+                session_id TEXT NOT NULL DEFAULT 'default',
+                source TEXT
             );
             """
         )
@@ -41,10 +245,19 @@ def init_db() -> None:
                 status TEXT NOT NULL,
                 priority TEXT NOT NULL,
                 created_at TEXT NOT NULL,
-                bot_confidence REAL
+                bot_confidence REAL,
+                session_id TEXT,
+                contacts INTEGER NOT NULL DEFAULT 1,
+                negative_feedback INTEGER NOT NULL DEFAULT 0,
+                due_at TEXT,
+                claimed_by TEXT,
+                lease_expires_at TEXT,
+                updated_at TEXT,
+                opened_priority TEXT
             );
             """
         )
+        ensure_ticket_schema(conn)
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS feedback (
@@ -57,12 +270,97 @@ def init_db() -> None:
             );
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analytics_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (granularity, bucket, metric, dimension)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_log_archives (
+                path TEXT PRIMARY KEY,
+                partition TEXT NOT NULL,
+                min_id INTEGER NOT NULL,
+                max_id INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                archived_at TEXT NOT NULL
+            );
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            """
+        )
+        ensure_indexes(conn)
 
 
 def ensure_chat_log_schema(conn: sqlite3.Connection) -> None:
     columns = {row["name"] for row in conn.execute("PRAGMA table_info(chat_logs)")}
     if "session_id" not in columns:
         conn.execute("ALTER TABLE chat_logs ADD COLUMN session_id TEXT NOT NULL DEFAULT 'default'")
+    if "source" not in columns:
+        conn.execute("ALTER TABLE chat_logs ADD COLUMN source TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_session_id ON chat_logs (session_id, id)")
+
+
+def ensure_ticket_schema(conn: sqlite3.Connection) -> None:
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(tickets)")}
+    added = [
+        ("session_id", "TEXT"),
+        ("contacts", "INTEGER NOT NULL DEFAULT 1"),
+        ("negative_feedback", "INTEGER NOT NULL DEFAULT 0"),
+        ("due_at", "TEXT"),
+        ("claimed_by", "TEXT"),
+        ("lease_expires_at", "TEXT"),
+        ("updated_at", "TEXT"),
+        ("opened_priority", "TEXT"),
+    ]
+    for name, definition in added:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE tickets ADD COLUMN {name} {definition}")
+    if "due_at" not in columns:
+        # Tickets from before the queue existed are treated as already due.
+        conn.execute("UPDATE tickets SET due_at = created_at")
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets (created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status_created_at ON tickets (status, created_at, id)")
+    # The queue: the next ticket to claim is the first 'open' entry.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status_due_at ON tickets (status, due_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_session_id ON tickets (session_id, id)")
+    # At most one active ticket per session; also the lookup used to fold repeat contacts into it.
+    conn.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_active_session
+        ON tickets (session_id) WHERE status IN ('open', 'claimed')
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_chat_log_id ON feedback (chat_log_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_log_archives_ids ON chat_log_archives (max_id, min_id)")
+
+
+def _insert(table: str, sql: str, params: tuple) -> int:
+    # ``sql`` takes the row id as its first parameter: NULL lets SQLite assign it, while the
+    # write-behind writer passes an id it has already reserved.
+    if _writer is not None:
+        return _writer.submit(table, sql, params)
+    with get_connection() as conn:
+        cursor = conn.execute(sql, (None, *params))
+        return cursor.lastrowid
 
 
 def insert_chat_log(
@@ -71,67 +369,438 @@ def insert_chat_log(
     intent: Optional[str],
     confidence: float,
     session_id: str,
+    source: Optional[str] = None,
 ) -> int:
     created_at = datetime.utcnow().isoformat()
+    chat_log_id = _insert(
+        "chat_logs",
+        """
+        INSERT INTO chat_logs (id, user_message, bot_response, intent, confidence, created_at, session_id, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (user_message, bot_response, intent, confidence, created_at, session_id, source),
+    )
+    rollups.record_chat(created_at, intent, confidence, source)
+    history_cache.append(
+        session_id,
+        {"id": chat_log_id, "user_message": user_message, "bot_response": bot_response, "created_at": created_at},
+    )
+    return chat_log_id
+
+
+@contextmanager
+def _immediate_transaction() -> Generator[sqlite3.Connection, None, None]:
+    # Takes the write lock up front, so a read followed by a write sees no interleaved writer.
     with get_connection() as conn:
-        cursor = conn.execute(
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+_TICKET_SELECT = f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets"
+# Served by the partial unique index on active tickets.
+_ACTIVE_TICKET = """
+    SELECT id, user_message, priority, created_at, contacts, negative_feedback, due_at
+    FROM tickets
+    WHERE session_id = ? AND status IN ('open', 'claimed')
+"""
+
+
+def _open_ticket(
+    conn: sqlite3.Connection,
+    user_message: str,
+    session_id: Optional[str],
+    intent: Optional[str],
+    confidence: Optional[float],
+    now: str,
+) -> Tuple[int, bool, str]:
+    # Must run inside an immediate transaction. Returns (ticket id, whether it is new, priority).
+    session_id = ticket_session(session_id)
+    previous_contacts = negative_feedback = 0
+    if session_id is not None:
+        active = conn.execute(_ACTIVE_TICKET, (session_id,)).fetchone()
+        if active is not None:
+            contacts = active["contacts"] + 1
+            priority = raise_priority(
+                active["priority"], derive_priority(intent, confidence, contacts, active["negative_feedback"])
+            )
+            conn.execute(
+                """
+                UPDATE tickets
+                SET user_message = ?, contacts = ?, priority = ?, due_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    ticket_message(user_message, active["user_message"]),
+                    contacts,
+                    priority,
+                    earlier(active["due_at"], due_at(active["created_at"], priority)),
+                    now,
+                    active["id"],
+                ),
+            )
+            return active["id"], False, priority
+
+        # Contacts already handled by earlier tickets of this session count as repeats.
+        previous_contacts = conn.execute(
+            "SELECT COALESCE(SUM(contacts), 0) FROM tickets WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        negative_feedback = conn.execute(
             """
-            INSERT INTO chat_logs (user_message, bot_response, intent, confidence, created_at, session_id)
-            VALUES (?, ?, ?, ?, ?, ?)
+            SELECT COUNT(*) FROM feedback
+            WHERE rating = 'down' AND chat_log_id IN (SELECT id FROM chat_logs WHERE session_id = ?)
             """,
-            (user_message, bot_response, intent, confidence, created_at, session_id),
+            (session_id,),
+        ).fetchone()[0]
+    priority = derive_priority(intent, confidence, previous_contacts + 1, negative_feedback)
+    ticket_id = conn.execute(
+        """
+        INSERT INTO tickets (
+            user_message, status, priority, created_at, bot_confidence, session_id,
+            contacts, negative_feedback, due_at, updated_at, opened_priority
         )
-        return cursor.lastrowid
+        VALUES (?, 'open', ?, ?, ?, ?, 1, ?, ?, ?, ?)
+        """,
+        (
+            ticket_message(user_message),
+            priority,
+            now,
+            confidence,
+            session_id,
+            negative_feedback,
+            due_at(now, priority),
+            now,
+            priority,
+        ),
+    ).lastrowid
+    return ticket_id, True, priority
+
+
+def open_ticket(
+    user_message: str,
+    session_id: str,
+    intent: Optional[str],
+    confidence: Optional[float],
+) -> Tuple[int, bool]:
+    """Opens a ticket for the session, or appends this contact to its active one.
 
+    Returns ``(ticket id, created)``; ``created`` is False when the contact was appended.
+    Bypasses the write-behind queue, since deduplication has to see every earlier ticket.
+    """
+    now = datetime.utcnow().isoformat()
+    with _immediate_transaction() as conn:
+        ticket_id, created, priority = _open_ticket(conn, user_message, session_id, intent, confidence, now)
+    if created:
+        rollups.record_ticket(now, priority)
+    return ticket_id, created
 
-def insert_ticket(user_message: str, priority: str, bot_confidence: Optional[float]) -> int:
+
+def insert_chat_batch(
+    entries: Sequence[Tuple[str, str, Optional[str], float, str, bool, Optional[str]]],
+) -> List[Tuple[int, Optional[int], bool]]:
+    """Writes chat logs, and a ticket for each entry that asks for one, in one transaction.
+
+    Each entry is ``(user_message, bot_response, intent, confidence, session_id, create_ticket, source)``.
+    Returns ``(chat_log_id, ticket_id, ticket_created)`` per entry; tickets are deduplicated per
+    session as in ``open_ticket``. Bypasses the write-behind queue.
+    """
     created_at = datetime.utcnow().isoformat()
+    results: List[Tuple[int, Optional[int], bool]] = []
+    new_priorities: List[str] = []
+    with _immediate_transaction() as conn:
+        for user_message, bot_response, intent, confidence, session_id, create_ticket, source in entries:
+            chat_log_id = conn.execute(
+                """
+                INSERT INTO chat_logs (user_message, bot_response, intent, confidence, created_at, session_id, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (user_message, bot_response, intent, confidence, created_at, session_id, source),
+            ).lastrowid
+            ticket_id = None
+            ticket_created = False
+            if create_ticket:
+                ticket_id, ticket_created, priority = _open_ticket(
+                    conn, user_message, session_id, intent, confidence, created_at
+                )
+                if ticket_created:
+                    new_priorities.append(priority)
+            results.append((chat_log_id, ticket_id, ticket_created))
+    for (user_message, bot_response, intent, confidence, session_id, _, source), (chat_log_id, _, _) in zip(
+        entries, results
+    ):
+        history_cache.append(
+            session_id,
+            {"id": chat_log_id, "user_message": user_message, "bot_response": bot_response, "created_at": created_at},
+        )
+        rollups.record_chat(created_at, intent, confidence, source)
+    for priority in new_priorities:
+        rollups.record_ticket(created_at, priority)
+    return results
+
+
+def list_tickets(
+    limit: int = 50,
+    after_id: Optional[int] = None,
+    status: Optional[str] = None,
+    order: str = "created",
+) -> List[sqlite3.Row]:
+    # Keyset pagination: ``after_id`` is the last ticket of the previous page, and the next page
+    # continues from its position instead of using OFFSET. ``created`` lists newest first;
+    # ``due`` lists in queue order (earliest SLA deadline first).
+    clauses = []
+    params: List[Any] = []
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    if order == "due":
+        position = "(due_at, id) > (SELECT due_at, id FROM tickets WHERE id = ?)"
+        sort = "due_at ASC, id ASC"
+    else:
+        position = "(created_at, id) < (SELECT created_at, id FROM tickets WHERE id = ?)"
+        sort = "created_at DESC, id DESC"
+    if after_id is not None:
+        clauses.append(position)
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     with get_connection() as conn:
         cursor = conn.execute(
+            f"""
+            {_TICKET_SELECT}
+            {where}
+            ORDER BY {sort}
+            LIMIT ?
+            """,
+            (*params, limit),
+        )
+        return cursor.fetchall()
+
+
+def claim_ticket(agent: str, lease_seconds: float) -> Optional[sqlite3.Row]:
+    """Leases the most urgent open ticket to ``agent``; None when the queue is empty.
+
+    Claims whose lease ran out go back to the queue first (the claimed range of the status index
+    is as small as the number of busy agents); the next ticket is then the first 'open' entry of
+    that index. Both steps run in one write transaction, so two agents never claim the same ticket.
+    """
+    now = datetime.utcnow()
+    stamp = now.isoformat()
+    with _immediate_transaction() as conn:
+        conn.execute(
             """
-            INSERT INTO tickets (user_message, status, priority, created_at, bot_confidence)
-            VALUES (?, 'open', ?, ?, ?)
+            UPDATE tickets SET status = 'open', claimed_by = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE status = 'claimed' AND lease_expires_at < ?
             """,
-            (user_message, priority, created_at, bot_confidence),
+            (stamp, stamp),
+        )
+        row = conn.execute("SELECT id FROM tickets WHERE status = 'open' ORDER BY due_at, id LIMIT 1").fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE tickets SET status = 'claimed', claimed_by = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+            (agent, lease_until(now, lease_seconds), stamp, row["id"]),
+        )
+        return conn.execute(f"{_TICKET_SELECT} WHERE id = ?", (row["id"],)).fetchone()
+
+
+def renew_ticket(ticket_id: int, agent: str, lease_seconds: float) -> Optional[sqlite3.Row]:
+    """Extends ``agent``'s lease; None if the ticket is not (or no longer) claimed by ``agent``."""
+    now = datetime.utcnow()
+    with get_connection() as conn:
+        updated = conn.execute(
+            """
+            UPDATE tickets SET lease_expires_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'claimed' AND claimed_by = ?
+            """,
+            (lease_until(now, lease_seconds), now.isoformat(), ticket_id, agent),
+        ).rowcount
+        if not updated:
+            return None
+        return conn.execute(f"{_TICKET_SELECT} WHERE id = ?", (ticket_id,)).fetchone()
+
+
+def release_ticket(ticket_id: int, agent: str, status: str) -> Optional[sqlite3.Row]:
+    """Hands a claimed ticket back as ``status`` ('open' requeues it, 'resolved' closes it).
+
+    Returns None if the ticket is not claimed by ``agent``.
+    """
+    with get_connection() as conn:
+        updated = conn.execute(
+            """
+            UPDATE tickets SET status = ?, claimed_by = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ? AND status = 'claimed' AND claimed_by = ?
+            """,
+            (status, datetime.utcnow().isoformat(), ticket_id, agent),
+        ).rowcount
+        if not updated:
+            return None
+        return conn.execute(f"{_TICKET_SELECT} WHERE id = ?", (ticket_id,)).fetchone()
+
+
+def insert_feedback(chat_log_id: int, rating: str, comment: Optional[str]) -> int:
+    created_at = datetime.utcnow().isoformat()
+    feedback_id = _insert(
+        "feedback",
+        """
+        INSERT INTO feedback (id, chat_log_id, rating, comment, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (chat_log_id, rating, comment, created_at),
+    )
+    rollups.record_feedback(created_at, rating)
+    if rating == "down":
+        _escalate_for_feedback(chat_log_id, created_at)
+    return feedback_id
+
+
+def _chat_log_session(chat_log_id: int) -> Optional[str]:
+    if _writer is not None:
+        for row in _writer.pending("chat_logs"):
+            if row[0] == chat_log_id:
+                return row[6]
+    with get_connection() as conn:
+        row = conn.execute("SELECT session_id FROM chat_logs WHERE id = ?", (chat_log_id,)).fetchone()
+    return row["session_id"] if row is not None else None
+
+
+def _escalate_for_feedback(chat_log_id: int, now: str) -> None:
+    # A 👎 on an answer raises the priority of the session's active ticket, if it has one.
+    session_id = ticket_session(_chat_log_session(chat_log_id))
+    if session_id is None:
+        return
+    with _immediate_transaction() as conn:
+        active = conn.execute(_ACTIVE_TICKET, (session_id,)).fetchone()
+        if active is None:
+            return
+        negative_feedback = active["negative_feedback"] + 1
+        priority = raise_priority(
+            active["priority"], derive_priority(None, None, active["contacts"], negative_feedback)
+        )
+        conn.execute(
+            "UPDATE tickets SET negative_feedback = ?, priority = ?, due_at = ?, updated_at = ? WHERE id = ?",
+            (
+                negative_feedback,
+                priority,
+                earlier(active["due_at"], due_at(active["created_at"], priority)),
+                now,
+                active["id"],
+            ),
         )
-        return cursor.lastrowid
 
 
-def list_tickets() -> List[sqlite3.Row]:
+def _pending_chat_history(session_id: str, before_id: Optional[int]) -> List[Dict[str, Any]]:
+    if _writer is None:
+        return []
+    return [
+        {"id": row[0], "user_message": row[1], "bot_response": row[2], "created_at": row[5]}
+        for row in _writer.pending("chat_logs")
+        if row[6] == session_id and (before_id is None or row[0] < before_id)
+    ]
+
+
+def recent_chat_history(session_id: str, limit: int = 5, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    # Newest first; ``after_id`` is the last (oldest) id of the previous page. The first page is
+    # served from ``history_cache`` when the session is cached; returned rows must not be mutated.
+    if after_id is None:
+        cached = history_cache.get(session_id, limit)
+        if cached is not None:
+            return cached
+
+    pending = _pending_chat_history(session_id, after_id)
     with get_connection() as conn:
         cursor = conn.execute(
             """
-            SELECT id, user_message, status, priority, created_at, bot_confidence
-            FROM tickets
-            ORDER BY created_at DESC
+            SELECT id, user_message, bot_response, created_at
+            FROM chat_logs
+            WHERE session_id = ? AND id < ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (session_id, after_id if after_id is not None else sys.maxsize, limit),
+        )
+        rows = [dict(row) for row in cursor.fetchall()]
+    if pending:
+        rows = sorted([*rows, *pending], key=lambda row: row["id"], reverse=True)[:limit]
+    # The page holds the session's newest turns if it is complete or at least as long as a cache entry.
+    if after_id is None and (len(rows) < limit or len(rows) >= history_cache.turns):
+        history_cache.fill(session_id, rows)
+    return rows
+
+
+def merge_rollups(deltas: Mapping[RollupKey, float]) -> None:
+    with get_connection() as conn:
+        conn.executemany(
             """
+            INSERT INTO analytics_rollups (granularity, bucket, metric, dimension, value)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (granularity, bucket, metric, dimension)
+            DO UPDATE SET value = analytics_rollups.value + excluded.value
+            """,
+            [(*key, value) for key, value in deltas.items()],
+        )
+
+
+def read_rollups(granularity: str, since: str) -> List[sqlite3.Row]:
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            SELECT bucket, metric, dimension, value
+            FROM analytics_rollups
+            WHERE granularity = ? AND bucket >= ?
+            """,
+            (granularity, since),
         )
         return cursor.fetchall()
 
 
-def insert_feedback(chat_log_id: int, rating: str, comment: Optional[str]) -> int:
-    created_at = datetime.utcnow().isoformat()
+def rebuild_rollups(until: str) -> None:
+    # Full scans of the source tables before the day ``until``; meant for backfills, not for the
+    # request path. Days up to the newest archive partition no longer have all their chat logs,
+    # so their buckets are kept.
+    flush_write_behind()
+    with get_connection() as conn:
+        archived = conn.execute("SELECT MAX(partition) FROM chat_log_archives").fetchone()[0]
+        since = (datetime.fromisoformat(archived) + timedelta(days=1)).date().isoformat() if archived else ""
+        for statement in REBUILD_STATEMENTS:
+            conn.execute(statement, (since, until))
+
+
+def store_llm_cache_entry(key: str, response: str, created_at: float) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+            (key, response, created_at),
+        )
+
+
+def load_llm_cache_entries(since: float, limit: int) -> List[sqlite3.Row]:
     with get_connection() as conn:
         cursor = conn.execute(
             """
-            INSERT INTO feedback (chat_log_id, rating, comment, created_at)
-            VALUES (?, ?, ?, ?)
+            SELECT key, response, created_at
+            FROM llm_cache
+            WHERE created_at > ?
+            ORDER BY created_at DESC
+            LIMIT ?
             """,
-            (chat_log_id, rating, comment, created_at),
+            (since, limit),
         )
-        return cursor.lastrowid
+        return cursor.fetchall()
 
 
-def recent_chat_history(session_id: str, limit: int = 5) -> List[sqlite3.Row]:
+def delete_llm_cache_entries(before: float) -> int:
+    with get_connection() as conn:
+        return conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (before,)).rowcount
+
+
+def upvoted_chat_logs(limit: int) -> List[sqlite3.Row]:
     with get_connection() as conn:
         cursor = conn.execute(
             """
-            SELECT id, user_message, bot_response, created_at
+            SELECT id, user_message, bot_response
             FROM chat_logs
-            WHERE session_id = ?
+            WHERE id IN (SELECT chat_log_id FROM feedback WHERE rating = 'up')
             ORDER BY id DESC
             LIMIT ?
             """,
-            (session_id, limit),
+            (limit,),
         )
         return cursor.fetchall()
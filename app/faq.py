@@ -1,37 +1,717 @@
+import hashlib
+import heapq
 import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
 from difflib import SequenceMatcher
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Collection,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+from .config import (
+    FAQ_CANDIDATES,
+    FAQ_MATCH_MODE,
+    FAQ_MATCH_THRESHOLD,
+    FAQ_RELOAD_INTERVAL,
+    FAQ_SEMANTIC_THRESHOLD,
+)
 
-class FAQService:
-    def __init__(self, faq_path: Path) -> None:
-        self.faq_path = faq_path
-        self.faqs: List[Dict[str, str]] = []
+if TYPE_CHECKING:
+    import numpy as np
 
-    def load(self) -> None:
-        if not self.faq_path.exists():
-            raise FileNotFoundError(f"FAQ file not found at {self.faq_path}")
-        with self.faq_path.open("r", encoding="utf-8") as file:
-            self.faqs = json.load(file)
+    from .vectors import HashingVectorizer
 
-    def best_match(self, query: str) -> Tuple[Optional[str], float]:
-        if not self.faqs:
-            return None, 0.0
 
-        normalized_query = query.lower().strip()
+logger = logging.getLogger(__name__)
+
+# Letters and digits of any script; runs of anything else (punctuation, symbols) separate words.
+_WORD_RE = re.compile(r"[^\W_]+")
+_VOWEL_RE = re.compile(r"[aeiouy]")
+
+# Function words that carry no meaning for FAQ lookup. Negations are kept on purpose.
+STOPWORDS = frozenset(
+    """
+    a about am an and any are as at be been being but by can could d did do does doing for from
+    had has have having how i if in into is it its just ll m me my of on or our please re s should
+    so some t than that the their them then there these they this those to too us ve was we were
+    what when where which who whom why will with would you your yours
+    """.split()
+)
+
+# BM25 tuning constants (standard Okapi defaults).
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+# Character n-grams present in more than this share of a large corpus carry no signal
+# for the prefilter and only lengthen the postings walk.
+_MAX_GRAM_DF_RATIO = 0.5
+_MIN_DOCS_FOR_DF_CUTOFF = 100
+
+
+def fold(text: str) -> str:
+    """Case- and accent-folds ``text`` ("Café" -> "cafe") and maps compatibility forms ("ﬁ" -> "fi")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Light suffix stripping so inflected forms meet: refunds/refund, shipping/ship, arrived/arrive."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and not word.endswith("eed"):
+            base = word[: -len(suffix)]
+            if len(base) >= 3 and _VOWEL_RE.search(base):
+                word = base
+                # shipp -> ship, but keep -ll/-ss/-zz (bill, pass, buzz).
+                if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeioulsz":
+                    word = word[:-1]
+            break
+    if len(word) > 4 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def words(text: str) -> List[str]:
+    """The case- and accent-folded words of ``text``, in any script ("¿Dónde está?" -> donde, esta)."""
+    return _WORD_RE.findall(fold(text))
+
+
+def normalize(text: str) -> str:
+    """The analysis pipeline shared by FAQ questions and queries for indexing and retrieval.
+
+    Folds case and accents, splits on punctuation, drops stopwords (unless nothing else is left)
+    and stems. The distinct terms are returned sorted and space-separated, so word order and
+    repetition do not affect which FAQs become candidates ("track my order" == "order, track").
+    The result also identifies a question for edits and de-duplication.
+    """
+    found = words(text)
+    terms = [word for word in found if word not in STOPWORDS] or found
+    return " ".join(sorted({stem(word) for word in terms}))
+
+
+def match_text(text: str) -> str:
+    """The word-ordered, case- and accent-folded text that candidates are re-scored on.
+
+    ``FAQ_MATCH_THRESHOLD`` is calibrated for ``SequenceMatcher`` ratios over running text;
+    the sorted term sets of ``normalize`` score unrelated questions far too high.
+    """
+    return " ".join(fold(text).split())
+
+
+def rescale_semantic(score: float, threshold: float = FAQ_SEMANTIC_THRESHOLD) -> float:
+    """Maps a cosine similarity onto the ``SequenceMatcher`` scale of the lexical mode.
+
+    Piecewise linear through (0, 0), (``threshold``, ``FAQ_MATCH_THRESHOLD``) and (1, 1), so the
+    match threshold, the reported confidence and the low-confidence ticket rule mean the same in
+    both modes. Hashed n-gram cosines run much lower than ratios for equally good matches.
+    """
+    if score <= 0.0:
+        return 0.0
+    if score < threshold:
+        return score * FAQ_MATCH_THRESHOLD / threshold
+    return FAQ_MATCH_THRESHOLD + (score - threshold) * (1.0 - FAQ_MATCH_THRESHOLD) / (1.0 - threshold)
+
+
+def char_ngrams(normalized: str, n: int = 3) -> set[str]:
+    padded = f" {normalized} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+class FAQRecord:
+    """One FAQ answer and the questions it answers: the main one followed by any paraphrases."""
+
+    __slots__ = ("questions", "answer")
+
+    def __init__(self, questions: Tuple[str, ...], answer: str) -> None:
+        self.questions = questions
+        self.answer = answer
+
+    @classmethod
+    def from_json(cls, entry: Any) -> Optional["FAQRecord"]:
+        """Validates one ``{"question", "answer", "paraphrases"?}`` entry; returns None if it is unusable."""
+        if not isinstance(entry, dict):
+            return None
+        answer = entry.get("answer")
+        if not isinstance(answer, str) or not answer.strip():
+            return None
+        paraphrases = entry.get("paraphrases") or []
+        candidates = [entry.get("question"), *(paraphrases if isinstance(paraphrases, list) else [])]
+        questions = tuple(dict.fromkeys(q.strip() for q in candidates if isinstance(q, str) and q.strip()))
+        if not questions:
+            return None
+        return cls(questions, answer)
+
+    def to_json(self) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"question": self.questions[0], "answer": self.answer}
+        if len(self.questions) > 1:
+            entry["paraphrases"] = list(self.questions[1:])
+        return entry
+
+
+def parse_faqs(entries: Any) -> List[FAQRecord]:
+    """Validates raw FAQ JSON once, merging entries that share an answer into one record."""
+    if not isinstance(entries, list):
+        raise ValueError("FAQ data must be a list of entries")
+    by_answer: Dict[str, FAQRecord] = {}
+    skipped = 0
+    for entry in entries:
+        record = FAQRecord.from_json(entry)
+        if record is None:
+            skipped += 1
+            continue
+        existing = by_answer.get(record.answer)
+        if existing is not None:
+            existing.questions = tuple(dict.fromkeys((*existing.questions, *record.questions)))
+        else:
+            by_answer[record.answer] = record
+    if skipped:
+        logger.warning("Skipped %d FAQ entries without a question or answer", skipped)
+    return list(by_answer.values())
+
+
+def _compile_postings(postings: Dict[str, Dict[int, float]]) -> Tuple[Dict[str, int], array, array, array]:
+    # Flatten {key: {doc: weight}} into CSR arrays: key -> slot, offsets[slot]..offsets[slot + 1]
+    # delimit that key's doc ids and weights.
+    slots: Dict[str, int] = {}
+    offsets = array("I", [0])
+    docs = array("I")
+    weights = array("f")
+    for key, entries in postings.items():
+        slots[key] = len(slots)
+        for doc_id in sorted(entries):
+            docs.append(doc_id)
+            weights.append(entries[doc_id])
+        offsets.append(len(docs))
+    return slots, offsets, docs, weights
+
+
+class FAQIndex:
+    """Immutable search structures built once from the FAQ questions.
+
+    Holds a BM25-weighted inverted index over the normalized question terms and a character
+    trigram index over the word-ordered ``texts`` (see ``match_text``), used as a typo-tolerant
+    candidate prefilter. Only the top candidates from both are re-scored with ``SequenceMatcher``
+    against their texts. When a vectorizer is given, the texts are also embedded into a
+    contiguous float32 matrix for the semantic mode.
+
+    Postings are stored as CSR arrays; ``term_slots``/``gram_slots`` map a key to its row. Any
+    sequence and mapping types with the same interface work, which lets ``faq_store`` serve an
+    index straight from a memory-mapped file.
+    """
+
+    def __init__(
+        self,
+        questions: Sequence[str],
+        texts: Sequence[str],
+        answers: Sequence[str],
+        term_slots: Mapping[str, int],
+        term_offsets: Sequence[int],
+        term_docs: Sequence[int],
+        term_weights: Sequence[float],
+        gram_slots: Mapping[str, int],
+        gram_offsets: Sequence[int],
+        gram_docs: Sequence[int],
+        gram_counts: Sequence[int],
+        max_gram_df: int,
+        vectorizer: Optional["HashingVectorizer"] = None,
+        vectors: Optional["np.ndarray"] = None,
+    ) -> None:
+        self.questions = questions
+        self.texts = texts
+        self.answers = answers
+        self.term_slots = term_slots
+        self.term_offsets = term_offsets
+        self.term_docs = term_docs
+        self.term_weights = term_weights
+        self.gram_slots = gram_slots
+        self.gram_offsets = gram_offsets
+        self.gram_docs = gram_docs
+        self.gram_counts = gram_counts
+        self.max_gram_df = max_gram_df
+        self.vectorizer = vectorizer
+        self.vectors = vectors
+
+    @classmethod
+    def build(
+        cls,
+        questions: List[str],
+        texts: List[str],
+        answers: List[str],
+        vectorizer: Optional["HashingVectorizer"] = None,
+    ) -> "FAQIndex":
+        term_postings: Dict[str, Dict[int, float]] = {}
+        gram_postings: Dict[str, Dict[int, float]] = {}
+        doc_lengths = []
+        gram_counts = array("I")
+
+        for doc_id, question in enumerate(questions):
+            tokens = question.split()
+            doc_lengths.append(len(tokens))
+            for token in tokens:
+                entry = term_postings.setdefault(token, {})
+                entry[doc_id] = entry.get(doc_id, 0.0) + 1.0
+            grams = char_ngrams(texts[doc_id])
+            gram_counts.append(len(grams))
+            for gram in grams:
+                gram_postings.setdefault(gram, {})[doc_id] = 1.0
+
+        total_docs = len(questions)
+        avg_length = (sum(doc_lengths) / total_docs) if total_docs else 0.0
+        for entries in term_postings.values():
+            idf = math.log(1.0 + (total_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            for doc_id, tf in entries.items():
+                norm = 1.0 - _BM25_B + _BM25_B * (doc_lengths[doc_id] / avg_length if avg_length else 0.0)
+                entries[doc_id] = idf * tf * (_BM25_K1 + 1.0) / (tf + _BM25_K1 * norm)
+
+        term_slots, term_offsets, term_docs, term_weights = _compile_postings(term_postings)
+        gram_slots, gram_offsets, gram_docs, _ = _compile_postings(gram_postings)
+
+        if total_docs >= _MIN_DOCS_FOR_DF_CUTOFF:
+            max_gram_df = max(1, int(total_docs * _MAX_GRAM_DF_RATIO))
+        else:
+            max_gram_df = total_docs
+
+        return cls(
+            questions,
+            texts,
+            answers,
+            term_slots,
+            term_offsets,
+            term_docs,
+            term_weights,
+            gram_slots,
+            gram_offsets,
+            gram_docs,
+            gram_counts,
+            max_gram_df,
+            vectorizer=vectorizer,
+            vectors=vectorizer.transform(texts) if vectorizer is not None else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def _bm25_scores(self, tokens: Iterable[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for token in set(tokens):
+            slot = self.term_slots.get(token)
+            if slot is None:
+                continue
+            start, end = self.term_offsets[slot], self.term_offsets[slot + 1]
+            for doc_id, weight in zip(self.term_docs[start:end], self.term_weights[start:end]):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return scores
+
+    def _gram_scores(self, grams: set[str]) -> Dict[int, float]:
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            slot = self.gram_slots.get(gram)
+            if slot is None:
+                continue
+            start, end = self.gram_offsets[slot], self.gram_offsets[slot + 1]
+            if end - start > self.max_gram_df:
+                continue
+            for doc_id in self.gram_docs[start:end]:
+                shared[doc_id] = shared.get(doc_id, 0) + 1
+        # Dice coefficient over the trigram sets.
+        query_size = len(grams)
+        return {doc_id: 2.0 * count / (query_size + self.gram_counts[doc_id]) for doc_id, count in shared.items()}
+
+    def candidates(self, normalized_query: str, query_text: str, limit: int) -> List[int]:
+        bm25 = self._bm25_scores(normalized_query.split())
+        grams = self._gram_scores(char_ngrams(query_text))
+        selected = set(heapq.nlargest(limit, bm25, key=bm25.__getitem__))
+        selected.update(heapq.nlargest(limit, grams, key=grams.__getitem__))
+        return sorted(selected)
+
+    def best_match(
+        self,
+        normalized_query: str,
+        query_text: str,
+        limit: int,
+        excluded: Collection[int] = (),
+    ) -> Tuple[Optional[str], float]:
         best_answer: Optional[str] = None
         best_score = 0.0
+        # Same orientation as FAQ_MATCH_THRESHOLD was calibrated with (ratio() is not symmetric):
+        # query first, question second. The cheap upper bounds skip candidates that cannot beat
+        # the best score.
+        matcher = SequenceMatcher()
+        matcher.set_seq1(query_text)
 
-        for entry in self.faqs:
-            question = entry.get("question", "").lower().strip()
-            answer = entry.get("answer")
-            if not answer:
+        # Widen the candidate pool so excluded (tombstoned) docs do not crowd out live ones.
+        for doc_id in self.candidates(normalized_query, query_text, limit + len(excluded)):
+            if doc_id in excluded:
                 continue
-
-            score = SequenceMatcher(None, normalized_query, question).ratio()
+            matcher.set_seq2(self.texts[doc_id])
+            if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                continue
+            score = matcher.ratio()
             if score > best_score:
                 best_score = score
-                best_answer = answer
+                best_answer = self.answers[doc_id]
 
         return best_answer, best_score
+
+    def semantic_match(self, query_text: str, excluded: Collection[int] = ()) -> Tuple[Optional[str], float]:
+        if self.vectors is None or self.vectorizer is None:
+            raise RuntimeError("FAQ index was built without vectors")
+        from .vectors import top_k
+
+        ids, scores = top_k(self.vectors, self.vectorizer.transform_one(query_text), len(excluded) + 1)
+        for doc_id, score in zip(ids, scores):
+            if int(doc_id) in excluded:
+                continue
+            if score <= 0.0:
+                break
+            return self.answers[int(doc_id)], float(score)
+        return None, 0.0
+
+    def semantic_matches(
+        self,
+        query_texts: List[str],
+        excluded: Collection[int] = (),
+    ) -> List[Tuple[Optional[str], float]]:
+        if self.vectors is None or self.vectorizer is None:
+            raise RuntimeError("FAQ index was built without vectors")
+        # One matrix-matrix product scores the whole batch against every FAQ.
+        scores = self.vectorizer.transform(query_texts) @ self.vectors.T
+        if excluded:
+            scores[:, sorted(excluded)] = 0.0
+        best_ids = scores.argmax(axis=1)
+        best_scores = scores[range(len(query_texts)), best_ids]
+        return [
+            (self.answers[int(doc_id)], float(score)) if score > 0.0 else (None, 0.0)
+            for doc_id, score in zip(best_ids, best_scores)
+        ]
+
+
+class LayeredIndex:
+    """A base index overlaid with recent edits, so single FAQs change without a full rebuild.
+
+    ``delta`` indexes FAQs added or updated since the base was built and ``tombstones`` holds the
+    base doc ids they replace or delete. Queries search both and keep the better match.
+    """
+
+    def __init__(self, base: FAQIndex, delta: Optional[FAQIndex], tombstones: FrozenSet[int]) -> None:
+        self.base = base
+        self.delta = delta
+        self.tombstones = tombstones
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.tombstones) + (len(self.delta) if self.delta is not None else 0)
+
+    @staticmethod
+    def _better(base: Tuple[Optional[str], float], delta: Tuple[Optional[str], float]) -> Tuple[Optional[str], float]:
+        return delta if delta[1] > base[1] else base
+
+    def best_match(self, normalized_query: str, query_text: str, limit: int) -> Tuple[Optional[str], float]:
+        match = self.base.best_match(normalized_query, query_text, limit, self.tombstones)
+        if self.delta is None:
+            return match
+        return self._better(match, self.delta.best_match(normalized_query, query_text, limit))
+
+    def semantic_match(self, query_text: str) -> Tuple[Optional[str], float]:
+        match = self.base.semantic_match(query_text, self.tombstones)
+        if self.delta is None:
+            return match
+        return self._better(match, self.delta.semantic_match(query_text))
+
+    def semantic_matches(self, query_texts: List[str]) -> List[Tuple[Optional[str], float]]:
+        matches = self.base.semantic_matches(query_texts, self.tombstones)
+        if self.delta is None:
+            return matches
+        return [
+            self._better(match, delta_match)
+            for match, delta_match in zip(matches, self.delta.semantic_matches(query_texts))
+        ]
+
+
+class FAQService:
+    """Answers queries from the FAQ file and keeps the index current without blocking readers.
+
+    Every change (a full reload or a single-entry edit) builds new structures off to the side
+    and publishes them with one assignment to ``self.index``; queries read that reference once,
+    so they never see a partially built index. The file's mtime is checked at most every
+    ``reload_interval`` seconds (negative disables it) and a changed file is rebuilt on a
+    background thread. ``upsert``/``delete`` edit single entries through a small delta index and
+    write the file back; once the delta grows past ``compact_ratio`` of the base, a background
+    reload folds it into a new base.
+    """
+
+    def __init__(
+        self,
+        faq_path: Path,
+        candidate_limit: int = FAQ_CANDIDATES,
+        mode: str = FAQ_MATCH_MODE,
+        index_path: Optional[Path] = None,
+        reload_interval: float = FAQ_RELOAD_INTERVAL,
+        compact_ratio: float = 0.1,
+        semantic_threshold: float = FAQ_SEMANTIC_THRESHOLD,
+    ) -> None:
+        if mode not in {"lexical", "semantic"}:
+            raise ValueError(f"Unknown FAQ match mode: {mode!r}")
+        self.faq_path = faq_path
+        self.candidate_limit = candidate_limit
+        self.mode = mode
+        # Compiled index file (see faq_store); used instead of parsing faq_path when it is current.
+        self.index_path = index_path
+        self.reload_interval = reload_interval
+        self.compact_ratio = compact_ratio
+        self.semantic_threshold = semantic_threshold
+        self.faqs: List[FAQRecord] = []
+        self.index: Optional[Union[FAQIndex, LayeredIndex]] = None
+        self.reloads = 0
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        # Edit state relative to the current base index; only touched under _reload_lock.
+        self._delta: Dict[str, Tuple[str, str, str]] = {}
+        self._tombstones: set[int] = set()
+        self._base_ids: Optional[Dict[str, List[int]]] = None
+        self._compacting = False
+
+    def _read(self) -> Tuple[List[FAQRecord], FAQIndex]:
+        if not self.faq_path.exists():
+            raise FileNotFoundError(f"FAQ file not found at {self.faq_path}")
+        if self.index_path is not None:
+            from .faq_store import load_compiled
+
+            compiled = load_compiled(self.index_path, self.faq_path, self.mode)
+            if compiled is not None:
+                return [], compiled
+        source = self.faq_path.read_bytes()
+        entries = json.loads(source)
+        if not isinstance(entries, list):
+            raise ValueError(f"FAQ file {self.faq_path} must contain a list of entries")
+        faqs = parse_faqs(entries)
+        index = self.build_index(faqs)
+        if self.index_path is not None:
+            self._cache_index(index, hashlib.sha256(source).hexdigest())
+        return faqs, index
+
+    def _cache_index(self, index: FAQIndex, digest: str) -> None:
+        # Leaves the freshly built index behind so the next process start maps it instead of
+        # rebuilding. Best effort: a read-only deployment just keeps building in memory.
+        from .faq_store import write_index
+
+        assert self.index_path is not None
+        try:
+            write_index(index, self.index_path, digest)
+        except OSError as error:
+            logger.warning("Could not cache the FAQ index at %s: %s", self.index_path, error)
+
+    def _publish(self, faqs: List[FAQRecord], index: FAQIndex) -> None:
+        self._delta = {}
+        self._tombstones = set()
+        self._base_ids = None
+        self.faqs = faqs
+        self.index = index
+
+    def load(self) -> None:
+        with self._reload_lock:
+            self._checked_at = time.monotonic()
+            mtime = os.stat(self.faq_path).st_mtime if self.faq_path.exists() else None
+            self._publish(*self._read())
+            self._mtime = mtime
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuilds the index if the file changed (or ``force``); returns whether it was swapped."""
+        with self._reload_lock:
+            self._checked_at = time.monotonic()
+            if not self.faq_path.exists():
+                return False
+            mtime = os.stat(self.faq_path).st_mtime
+            if mtime == self._mtime and not force:
+                return False
+            try:
+                faqs, index = self._read()
+            except (OSError, ValueError) as error:
+                logger.error("Keeping previous FAQ index; failed to load %s: %s", self.faq_path, error)
+                return False
+            self._publish(faqs, index)
+            self._mtime = mtime
+            self.reloads += 1
+            return True
+
+    def maybe_reload(self) -> None:
+        if self.reload_interval < 0 or time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        if self._reload_lock.locked():
+            return
+        self._checked_at = time.monotonic()
+        if self.faq_path.exists() and os.stat(self.faq_path).st_mtime != self._mtime:
+            threading.Thread(target=self.reload, name="faq-reload", daemon=True).start()
+
+    def build_index(self, faqs: List[FAQRecord]) -> FAQIndex:
+        # One document per question or paraphrase. Questions that normalize alike are indexed
+        # once, the later entry winning; paraphrases share their record's answer string.
+        documents: Dict[str, Tuple[str, str]] = {}
+        for record in faqs:
+            for question in record.questions:
+                key = normalize(question)
+                if key:
+                    documents.pop(key, None)
+                    documents[key] = (match_text(question), record.answer)
+        questions = list(documents)
+        texts = [text for text, _ in documents.values()]
+        answers = [answer for _, answer in documents.values()]
+
+        vectorizer = None
+        if self.mode == "semantic":
+            from .vectors import HashingVectorizer
+
+            vectorizer = HashingVectorizer()
+        return FAQIndex.build(questions, texts, answers, vectorizer)
+
+    def _base(self) -> FAQIndex:
+        index = self.index
+        if isinstance(index, LayeredIndex):
+            return index.base
+        if index is None:
+            raise RuntimeError("FAQ index is not loaded")
+        return index
+
+    def _entries(self) -> List[FAQRecord]:
+        # A memory-mapped index carries no records; parse the file on the first edit.
+        if not self.faqs and self.faq_path.exists():
+            with self.faq_path.open("r", encoding="utf-8") as file:
+                self.faqs = parse_faqs(json.load(file))
+        return self.faqs
+
+    def _edit(self, key: str, entry: Optional[FAQRecord]) -> None:
+        base = self._base()
+        if self._base_ids is None:
+            base_ids: Dict[str, List[int]] = {}
+            for doc_id in range(len(base)):
+                base_ids.setdefault(base.questions[doc_id], []).append(doc_id)
+            self._base_ids = base_ids
+
+        faqs = []
+        for record in self._entries():
+            questions = tuple(question for question in record.questions if normalize(question) != key)
+            if len(questions) == len(record.questions):
+                faqs.append(record)
+            elif questions:
+                faqs.append(FAQRecord(questions, record.answer))
+        if entry is not None:
+            faqs.append(entry)
+
+        doc_ids = self._base_ids.get(key, [])
+        self._delta.pop(key, None)
+        if entry is not None and len(doc_ids) == 1 and base.answers[doc_ids[0]] == entry.answer:
+            # Back to what the base already holds.
+            self._tombstones.discard(doc_ids[0])
+        else:
+            self._tombstones.update(doc_ids)
+            if entry is not None:
+                self._delta[key] = (key, match_text(entry.questions[0]), entry.answer)
+
+        delta = None
+        if self._delta:
+            questions, texts, answers = (list(column) for column in zip(*self._delta.values()))
+            delta = FAQIndex.build(questions, texts, answers, base.vectorizer)
+        index = LayeredIndex(base, delta, frozenset(self._tombstones)) if delta or self._tombstones else base
+        self._write_file(faqs)
+        self.faqs = faqs
+        self.index = index
+
+        if len(self._delta) + len(self._tombstones) > max(self.compact_ratio * len(base), 32) and not self._compacting:
+            # Fold the edits into a new base off the request thread, like a changed file.
+            self._compacting = True
+            threading.Thread(target=self._compact, name="faq-reload", daemon=True).start()
+
+    def _compact(self) -> None:
+        try:
+            self.reload(force=True)
+        finally:
+            self._compacting = False
+
+    def _write_file(self, faqs: List[FAQRecord]) -> None:
+        temp_path = self.faq_path.with_name(f"{self.faq_path.name}.{os.getpid()}.tmp")
+        with temp_path.open("w", encoding="utf-8") as file:
+            json.dump([record.to_json() for record in faqs], file, indent=2, ensure_ascii=False)
+            file.write("\n")
+        os.replace(temp_path, self.faq_path)
+        # Our own write is already reflected in the index; do not let the watcher rebuild it.
+        self._mtime = os.stat(self.faq_path).st_mtime
+
+    def upsert(self, question: str, answer: str) -> None:
+        """Adds a FAQ or replaces the answer of the entry with the same (normalized) question."""
+        if not answer.strip():
+            raise ValueError("FAQ answer must not be empty")
+        key = normalize(question)
+        if not key:
+            raise ValueError("FAQ question must contain at least one word")
+        with self._reload_lock:
+            self._edit(key, FAQRecord((question.strip(),), answer))
+
+    def delete(self, question: str) -> bool:
+        """Removes the entry with this (normalized) question; returns False if there is none."""
+        key = normalize(question)
+        with self._reload_lock:
+            if not any(normalize(existing) == key for record in self._entries() for existing in record.questions):
+                return False
+            self._edit(key, None)
+            return True
+
+    def stats(self) -> Dict[str, float]:
+        index = self.index
+        return {
+            "entries": len(index) if index is not None else 0,
+            "delta_entries": len(index.delta) if isinstance(index, LayeredIndex) and index.delta is not None else 0,
+            "tombstones": len(index.tombstones) if isinstance(index, LayeredIndex) else 0,
+            "reloads": self.reloads,
+        }
+
+    def best_match(self, query: str) -> Tuple[Optional[str], float]:
+        self.maybe_reload()
+        index = self.index
+        if index is None or not len(index):
+            return None, 0.0
+        if self.mode == "semantic":
+            answer, score = index.semantic_match(match_text(query))
+            return answer, rescale_semantic(score, self.semantic_threshold)
+        return index.best_match(normalize(query), match_text(query), self.candidate_limit)
+
+    def best_matches(self, queries: List[str]) -> List[Tuple[Optional[str], float]]:
+        self.maybe_reload()
+        index = self.index
+        if index is None or not len(index) or not queries:
+            return [(None, 0.0) for _ in queries]
+        texts = [match_text(query) for query in queries]
+        if self.mode == "semantic":
+            return [
+                (answer, rescale_semantic(score, self.semantic_threshold))
+                for answer, score in index.semantic_matches(texts)
+            ]
+        return [
+            index.best_match(normalize(query), text, self.candidate_limit) for query, text in zip(queries, texts)
+        ]
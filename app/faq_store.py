@@ -0,0 +1,263 @@
+"""Compiled FAQ index files shared by worker processes.
+
+Usage:
+    python -m app.faq_store [--mode lexical|semantic] [--output data/faqs.idx]
+
+The file holds the normalized questions, their match texts, answers, BM25 and trigram postings, and (for the
+semantic mode) the question vectors, each as a flat section. Workers ``mmap`` it read-only, so
+every process on a host shares the same page-cache copy and startup skips parsing and indexing
+``faqs.json``. Posting keys are stored sorted and looked up by binary search, so no per-worker
+dictionaries are built either.
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .config import FAQ_INDEX_PATH, FAQ_MATCH_MODE, FAQ_PATH
+from .faq import FAQIndex, FAQService
+
+MAGIC = b"FAQIDX01"
+# Bump whenever the layout or the text normalization changes, so stale files are rebuilt.
+FORMAT_VERSION = 3
+_ALIGNMENT = 8
+
+
+def source_digest(faq_path: Path) -> str:
+    return hashlib.sha256(faq_path.read_bytes()).hexdigest()
+
+
+class _StringTable(Sequence[str]):
+    """Read-only sequence of UTF-8 strings decoded on access from an offsets + data section pair."""
+
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position: int) -> str:  # type: ignore[override]
+        return str(self._data[self._offsets[position] : self._offsets[position + 1]], "utf-8")
+
+
+class _SortedKeys(Mapping[str, int]):
+    """Maps a posting key to its slot by binary search over the sorted key table."""
+
+    def __init__(self, keys: _StringTable) -> None:
+        self._keys = keys
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:  # type: ignore[override]
+        slot = bisect.bisect_left(self._keys, key)
+        if slot < len(self._keys) and self._keys[slot] == key:
+            return slot
+        return default
+
+    def __getitem__(self, key: str) -> int:
+        slot = self.get(key)
+        if slot is None:
+            raise KeyError(key)
+        return slot
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def _string_sections(name: str, values: Sequence[str]) -> List[Tuple[str, str, bytes]]:
+    offsets = array("Q", [0])
+    data = bytearray()
+    for value in values:
+        data += value.encode("utf-8")
+        offsets.append(len(data))
+    return [(f"{name}.offsets", "Q", offsets.tobytes()), (f"{name}.data", "B", bytes(data))]
+
+
+def _sorted_postings(
+    slots: Mapping[str, int],
+    offsets: Sequence[int],
+    docs: Sequence[int],
+    weights: Optional[Sequence[float]],
+) -> Tuple[List[str], array, array, array]:
+    # Re-lay the CSR rows in key order so slot numbers match positions in the sorted key table.
+    keys = sorted(slots)
+    sorted_offsets = array("I", [0])
+    sorted_docs = array("I")
+    sorted_weights = array("f")
+    for key in keys:
+        slot = slots[key]
+        start, end = offsets[slot], offsets[slot + 1]
+        sorted_docs.extend(docs[start:end])
+        if weights is not None:
+            sorted_weights.extend(weights[start:end])
+        sorted_offsets.append(len(sorted_docs))
+    return keys, sorted_offsets, sorted_docs, sorted_weights
+
+
+def write_index(index: FAQIndex, path: Path, source_sha256: str) -> None:
+    """Writes ``index`` to ``path`` atomically (temp file + rename), so running workers never see a partial file."""
+    term_keys, term_offsets, term_docs, term_weights = _sorted_postings(
+        index.term_slots, index.term_offsets, index.term_docs, index.term_weights
+    )
+    gram_keys, gram_offsets, gram_docs, _ = _sorted_postings(index.gram_slots, index.gram_offsets, index.gram_docs, None)
+
+    sections: List[Tuple[str, str, bytes]] = [
+        *_string_sections("questions", index.questions),
+        *_string_sections("texts", index.texts),
+        *_string_sections("answers", index.answers),
+        *_string_sections("term_keys", term_keys),
+        ("term_offsets", "I", term_offsets.tobytes()),
+        ("term_docs", "I", term_docs.tobytes()),
+        ("term_weights", "f", term_weights.tobytes()),
+        *_string_sections("gram_keys", gram_keys),
+        ("gram_offsets", "I", gram_offsets.tobytes()),
+        ("gram_docs", "I", gram_docs.tobytes()),
+        ("gram_counts", "I", array("I", index.gram_counts).tobytes()),
+    ]
+    header: Dict[str, Any] = {
+        "version": FORMAT_VERSION,
+        "source_sha256": source_sha256,
+        "count": len(index),
+        "max_gram_df": index.max_gram_df,
+        "vectors": None,
+    }
+    if index.vectors is not None and index.vectorizer is not None:
+        sections.append(("vectors", "f", index.vectors.astype("<f4", copy=False).tobytes()))
+        header["vectors"] = {"dim": index.vectorizer.dim, "ngram_sizes": list(index.vectorizer.ngram_sizes)}
+
+    # Section offsets are relative to the (aligned) end of the header.
+    layout: Dict[str, List[Any]] = {}
+    position = 0
+    for name, fmt, payload in sections:
+        position += -position % _ALIGNMENT
+        layout[name] = [position, len(payload), fmt]
+        position += len(payload)
+    header["sections"] = layout
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % _ALIGNMENT)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with temp_path.open("wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(header_bytes)))
+        file.write(header_bytes)
+        written = 0
+        for name, _, payload in sections:
+            offset = layout[name][0]
+            file.write(b"\0" * (offset - written))
+            file.write(payload)
+            written = offset + len(payload)
+    os.replace(temp_path, path)
+
+
+def read_header(path: Path) -> Dict[str, Any]:
+    with path.open("rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compiled FAQ index")
+        (length,) = struct.unpack("<Q", file.read(8))
+        return json.loads(file.read(length))
+
+
+def open_index(path: Path) -> FAQIndex:
+    """Memory-maps a compiled index read-only; all arrays are views into the shared mapping."""
+    with path.open("rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if bytes(view[: len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a compiled FAQ index")
+    (length,) = struct.unpack_from("<Q", mapped, len(MAGIC))
+    data_start = len(MAGIC) + 8 + length
+    header = json.loads(bytes(view[len(MAGIC) + 8 : data_start]))
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported FAQ index version {header['version']} in {path}")
+
+    def section(name: str) -> memoryview:
+        offset, size, fmt = header["sections"][name]
+        start = data_start + offset
+        return view[start : start + size].cast(fmt)
+
+    def strings(name: str) -> _StringTable:
+        return _StringTable(section(f"{name}.offsets"), section(f"{name}.data"))
+
+    vectorizer = None
+    vectors = None
+    if header["vectors"] is not None:
+        import numpy as np
+
+        from .vectors import HashingVectorizer
+
+        dim = header["vectors"]["dim"]
+        vectorizer = HashingVectorizer(dim, tuple(header["vectors"]["ngram_sizes"]))
+        offset, size, _ = header["sections"]["vectors"]
+        vectors = np.frombuffer(mapped, dtype="<f4", count=size // 4, offset=data_start + offset).reshape(-1, dim)
+
+    return FAQIndex(
+        strings("questions"),
+        strings("texts"),
+        strings("answers"),
+        _SortedKeys(strings("term_keys")),
+        section("term_offsets"),
+        section("term_docs"),
+        section("term_weights"),
+        _SortedKeys(strings("gram_keys")),
+        section("gram_offsets"),
+        section("gram_docs"),
+        section("gram_counts"),
+        header["max_gram_df"],
+        vectorizer=vectorizer,
+        vectors=vectors,
+    )
+
+
+def load_compiled(index_path: Path, faq_path: Path, mode: str) -> Optional[FAQIndex]:
+    """Returns the compiled index if it exists, matches ``faq_path`` and suits ``mode``; None otherwise."""
+    if not index_path.exists():
+        return None
+    try:
+        header = read_header(index_path)
+    except (OSError, ValueError):
+        return None
+    if header.get("version") != FORMAT_VERSION or header.get("source_sha256") != source_digest(faq_path):
+        return None
+    if mode == "semantic" and header.get("vectors") is None:
+        return None
+    return open_index(index_path)
+
+
+def compile_index(faq_path: Path = FAQ_PATH, index_path: Path = FAQ_INDEX_PATH, mode: str = FAQ_MATCH_MODE) -> int:
+    """Builds the index for ``faq_path`` and writes it to ``index_path``; returns the entry count."""
+    service = FAQService(faq_path, mode=mode)
+    service.load()
+    assert service.index is not None
+    write_index(service.index, index_path, source_digest(faq_path))
+    return len(service.index)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile data/faqs.json into a memory-mappable index file")
+    parser.add_argument("--faqs", type=Path, default=FAQ_PATH, help="FAQ JSON file")
+    parser.add_argument("--output", type=Path, default=FAQ_INDEX_PATH, help="Index file to write")
+    parser.add_argument(
+        "--mode",
+        choices=["lexical", "semantic"],
+        default=FAQ_MATCH_MODE,
+        help="semantic also stores question vectors (usable by both modes)",
+    )
+    args = parser.parse_args()
+    count = compile_index(args.faqs, args.output, args.mode)
+    print(json.dumps({"entries": count, "path": str(args.output)}))
+
+
+if __name__ == "__main__":
+    main()
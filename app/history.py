@@ -0,0 +1,122 @@
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+HistoryRow = Dict[str, Any]
+
+
+def _row_size(row: HistoryRow) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+
+
+class _Session:
+    __slots__ = ("rows", "complete")
+
+    def __init__(self, turns: int) -> None:
+        self.rows: Deque[HistoryRow] = deque(maxlen=turns)
+        # False while the entry only holds turns written since the session was last seen; such
+        # entries are merged with the database rows on the next read instead of being served.
+        self.complete = False
+
+
+class SessionHistoryCache:
+    """Thread-safe cache of each session's most recent chat turns, newest first.
+
+    Holds at most ``turns`` rows per session and ``max_sessions`` sessions, evicting the least
+    recently used session. New chat logs are written through with ``append``; a session is only
+    served from memory once its earlier turns have been loaded from the database with ``fill``.
+    Cached rows are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_sessions: int, turns: int) -> None:
+        self.max_sessions = max_sessions
+        self.turns = turns
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0 and self.turns > 0
+
+    def get(self, session_id: str, limit: int) -> Optional[List[HistoryRow]]:
+        if not self.enabled or limit > self.turns:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or not session.complete:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return list(session.rows)[:limit]
+
+    def fill(self, session_id: str, rows: Iterable[HistoryRow]) -> None:
+        """Stores the session's newest turns as read from the database."""
+        if not self.enabled:
+            return
+        with self._lock:
+            session = self._session(session_id)
+            merged = {row["id"]: row for row in rows}
+            for row in session.rows:
+                merged.setdefault(row["id"], row)
+            self._replace(session, sorted(merged.values(), key=lambda row: row["id"], reverse=True))
+            session.complete = True
+
+    def append(self, session_id: str, row: HistoryRow) -> None:
+        """Records a newly written turn for the session."""
+        if not self.enabled:
+            return
+        with self._lock:
+            session = self._session(session_id)
+            if session.rows and session.rows[0]["id"] > row["id"]:
+                # Out-of-order write from a concurrent request: re-sort to keep newest first.
+                self._replace(session, sorted([*session.rows, row], key=lambda item: item["id"], reverse=True))
+                return
+            if len(session.rows) == self.turns:
+                self._bytes -= _row_size(session.rows[-1])
+            session.rows.appendleft(row)
+            self._bytes += _row_size(row)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session(self.turns)
+            self._sessions[session_id] = session
+            self._bytes += sys.getsizeof(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, evicted = self._sessions.popitem(last=False)
+                self._bytes -= sys.getsizeof(evicted_id) + sum(_row_size(row) for row in evicted.rows)
+                self.evictions += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _replace(self, session: _Session, rows: List[HistoryRow]) -> None:
+        self._bytes -= sum(_row_size(row) for row in session.rows)
+        session.rows.clear()
+        session.rows.extend(rows[: self.turns])
+        self._bytes += sum(_row_size(row) for row in session.rows)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "turns_per_session": self.turns,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "approx_bytes": self._bytes,
+            }
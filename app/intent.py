@@ -1,23 +1,187 @@
-from typing import Tuple
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
+from .config import INTENT_PATH, INTENT_RELOAD_INTERVAL
 
+logger = logging.getLogger(__name__)
+
+# Built-in table, used unless INTENT_PATH points at an existing intent file (same shape, as
+# {"intents": {...}}). A trailing "*" matches any word that starts with the phrase (e.g.
+# "refund*" also matches "refunds" and "refunded").
 INTENT_KEYWORDS = {
-    "refund": ["refund", "return", "money back"],
-    "order_tracking": ["track", "tracking", "where is my order"],
-    "account_help": ["account", "login", "password"],
-    "escalation": ["agent", "human", "representative", "escalate"],
+    "refund": ["refund*", "return*", "money back"],
+    "order_tracking": ["track*", "tracking", "where is my order"],
+    "account_help": ["account*", "login*", "password*"],
+    "escalation": ["agent*", "human*", "representative*", "escalate*"],
 }
 
 
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class IntentAutomaton:
+    """Aho-Corasick automaton over every phrase of every intent.
+
+    ``scan`` walks the lowercased message once and reports which phrases occur on word
+    boundaries, regardless of how many intents or phrases the table holds.
+    """
+
+    def __init__(self, table: Mapping[str, Sequence[str]]) -> None:
+        self.intents: List[str] = list(table)
+        self.phrase_counts: List[int] = []
+        # Per pattern: (intent index, phrase index within the intent, length, prefix match)
+        self.patterns: List[Tuple[int, int, int, bool]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for intent_index, intent in enumerate(self.intents):
+            # Blank phrases are skipped and do not count towards the intent's score denominator.
+            phrase_count = 0
+            for raw_phrase in table[intent]:
+                phrase = " ".join(raw_phrase.lower().split())
+                prefix = phrase.endswith("*")
+                phrase = phrase.rstrip("*").rstrip()
+                if not phrase:
+                    continue
+                self._add(phrase, len(self.patterns))
+                self.patterns.append((intent_index, phrase_count, len(phrase), prefix))
+                phrase_count += 1
+            self.phrase_counts.append(phrase_count)
+
+        self._link()
+
+    def _add(self, phrase: str, pattern_id: int) -> None:
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text: str) -> set[int]:
+        matched = set()
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in self._output[state]:
+                _, _, length, prefix = self.patterns[pattern_id]
+                start = position - length + 1
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if not prefix and position + 1 < len(text) and _is_word_char(text[position + 1]):
+                    continue
+                matched.add(pattern_id)
+        return matched
+
+    def detect(self, message: str) -> Tuple[str, float]:
+        hits = [set() for _ in self.intents]
+        for pattern_id in self.scan(message.lower()):
+            intent_index, phrase_index, _, _ = self.patterns[pattern_id]
+            hits[intent_index].add(phrase_index)
+
+        best_intent = "general"
+        best_score = 0.0
+        for intent_index, intent in enumerate(self.intents):
+            score = len(hits[intent_index]) / max(self.phrase_counts[intent_index], 1)
+            if score > best_score:
+                best_score = score
+                best_intent = intent
+        return best_intent, best_score
+
+
+def load_intent_table(path: Path) -> Dict[str, List[str]]:
+    with path.open("r", encoding="utf-8") as file:
+        data = json.load(file)
+    table = data.get("intents", data) if isinstance(data, dict) else data
+    if not isinstance(table, dict) or not all(isinstance(phrases, list) for phrases in table.values()):
+        raise ValueError(f"Intent file {path} must map intent names to lists of phrases")
+    return table
+
+
+class IntentMatcher:
+    """Holds the compiled automaton for an intent file and swaps in a new one when it changes.
+
+    The file's mtime is checked at most every ``reload_interval`` seconds (a negative interval
+    disables the check). Readers never wait on a reload: they keep using the current automaton
+    until the rebuilt one is assigned.
+    """
+
+    def __init__(self, path: Optional[Path], reload_interval: float = INTENT_RELOAD_INTERVAL) -> None:
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self.automaton = IntentAutomaton(INTENT_KEYWORDS)
+        self.reload()
+
+    def reload(self) -> bool:
+        with self._reload_lock:
+            self._checked_at = time.monotonic()
+            if self.path is None or not self.path.exists():
+                return False
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return False
+            try:
+                automaton = IntentAutomaton(load_intent_table(self.path))
+            except (OSError, ValueError) as error:
+                logger.error("Keeping previous intent table; failed to load %s: %s", self.path, error)
+                return False
+            self.automaton = automaton
+            self._mtime = mtime
+            return True
+
+    def maybe_reload(self) -> None:
+        if self.reload_interval < 0 or time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        if self._reload_lock.locked():
+            return
+        self.reload()
+
+    def detect(self, message: str) -> Tuple[str, float]:
+        self.maybe_reload()
+        return self.automaton.detect(message)
+
+
+intent_matcher = IntentMatcher(INTENT_PATH)
+
+
 def detect_intent(message: str) -> Tuple[str, float]:
-    text = message.lower()
-    best_intent = "general"
-    best_score = 0.0
+    return intent_matcher.detect(message)
 
-    for intent, keywords in INTENT_KEYWORDS.items():
-        score = sum(1 for keyword in keywords if keyword in text) / max(len(keywords), 1)
-        if score > best_score:
-            best_score = score
-            best_intent = intent
 
-    return best_intent, best_score
+def detect_intents(messages: List[str]) -> List[Tuple[str, float]]:
+    # One reload check and one automaton snapshot for the whole batch.
+    intent_matcher.maybe_reload()
+    automaton = intent_matcher.automaton
+    return [automaton.detect(message) for message in messages]
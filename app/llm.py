@@ -1,50 +1,166 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from functools import lru_cache
 from textwrap import dedent
-from typing import Iterable, Mapping
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, Mapping, Sequence
 
-from openai import OpenAI
+from . import metrics
+from .cache import ResponseCache, response_cache_key
+from .config import (
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PERSIST,
+    LLM_CACHE_TTL,
+    LLM_DEADLINE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_QUEUE_TIMEOUT,
+    LLM_RATE_LIMIT,
+    LLM_RETRY_BACKOFF,
+    LLM_RETRY_BACKOFF_MAX,
+    OPENAI_API_KEY,
+    OPENAI_CONNECT_TIMEOUT,
+    OPENAI_MODEL,
+    OPENAI_TIMEOUT,
+    PROMPT_MAX_TOKENS,
+    PROMPT_TURN_MAX_TOKENS,
+    SEMANTIC_CACHE_CAPACITY,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+from .prompt import PromptBuilder
+from .resilience import CallLimiter, CircuitBreaker, LLMUnavailable, backoff_delay
+from .singleflight import SingleFlight
 
-from .config import OPENAI_API_KEY, OPENAI_MODEL
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
+    from .semantic_cache import SemanticCache
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 
+# The OpenAI SDK takes longer to import than the rest of the app together, so it is imported and
+# the clients are built only when first needed (``warm_up`` does it off the request path). Without
+# an API key (fallback mode) that never happens.
+client: "OpenAI | None" = None
+async_client: "AsyncOpenAI | None" = None
+_client_lock = threading.Lock()
 
-def _render_history(history: Iterable[Mapping[str, str]]) -> str:
-    snippets = []
-    for item in history:
-        user = item.get("user_message")
-        bot = item.get("bot_response")
-        snippets.append(f"User: {user}\nBot: {bot}")
-    return "\n\n".join(snippets)
+breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+limiter = CallLimiter(LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT)
+# Identical prompts in flight at the same time share one completion.
+flights = SingleFlight()
 
+prompt_builder = PromptBuilder(PROMPT_MAX_TOKENS, PROMPT_TURN_MAX_TOKENS)
 
-def _build_messages(user_message: str, context: str | None, history: Iterable[Mapping[str, str]] | None) -> list[dict[str, str]]:
-    system_prompt = dedent(
-        """
-        You are a concise and polite customer support assistant. Use the provided FAQ context and
-        recent conversation to answer the user's question. If you do not have enough information,
-        ask a brief clarifying question and mention that you can escalate to a human agent if needed.
-        Keep responses under 120 words.
-        """
-    ).strip()
+response_cache = ResponseCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, persist=LLM_CACHE_PERSIST)
+
+semantic_cache: "SemanticCache | None" = None
+if SEMANTIC_CACHE_ENABLED:
+    from .semantic_cache import SemanticCache
+
+    semantic_cache = SemanticCache(SEMANTIC_CACHE_CAPACITY, SEMANTIC_CACHE_THRESHOLD)
+
+
+def _cache_key(user_message: str, context: str | None, history: Iterable[Mapping[str, str]] | None) -> str | None:
+    # Answers that depend on earlier turns are not reusable across sessions.
+    if history:
+        return None
+    return response_cache_key(user_message, context, OPENAI_MODEL)
+
+
+def _build_clients() -> None:
+    global async_client, client
+    with _client_lock:
+        if client is not None and async_client is not None:
+            return
+        import httpx
+        from openai import AsyncOpenAI, OpenAI
+
+        timeout = httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+        # Retries are handled below (with jitter, a deadline and the circuit breaker), not by the SDK.
+        if client is None:
+            client = OpenAI(api_key=OPENAI_API_KEY, timeout=timeout, max_retries=0)
+        if async_client is None:
+            async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=timeout, max_retries=0)
+
+
+def _get_client() -> "OpenAI":
+    if client is None:
+        _build_clients()
+    assert client is not None
+    return client
+
+
+async def _get_async_client() -> "AsyncOpenAI":
+    if async_client is None:
+        # Built on a worker thread: the first call imports the SDK, which would stall the loop.
+        await asyncio.to_thread(_build_clients)
+    assert async_client is not None
+    return async_client
+
+
+def warm_up() -> None:
+    """Imports the SDK and builds the clients ahead of the first request; a no-op without an API key."""
+    if OPENAI_API_KEY:
+        _build_clients()
+        _retryable_errors()
+        _credential_errors()
+
+
+@lru_cache(maxsize=1)
+def _retryable_errors() -> tuple[type[BaseException], ...]:
+    # Errors worth retrying: the provider is slow, unreachable, overloaded or failing server-side.
+    # Only evaluated once an exception is raised, so the SDK stays unimported until then.
+    import openai
+
+    return (
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+        asyncio.TimeoutError,
+    )
 
-    history_section = _render_history(history) if history else None
 
-    user_parts = [f"Customer question: {user_message}"]
-    if context:
-        user_parts.append(f"FAQ context: {context}")
-    if history_section:
-        user_parts.append(f"Recent history (most recent first):\n{history_section}")
+@lru_cache(maxsize=1)
+def _credential_errors() -> tuple[type[BaseException], ...]:
+    # Not worth retrying, but every call will fail the same way until the key or its access is
+    # fixed, so they count towards opening the breaker.
+    import openai
 
-    return [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": "\n\n".join(user_parts)},
-    ]
+    return (openai.AuthenticationError, openai.PermissionDeniedError)
+
+
+def _cached_answer(cache_key: str | None, user_message: str, context: str | None) -> str | None:
+    if cache_key is None:
+        return None
+    if LLM_CACHE_ENABLED:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    if semantic_cache is not None:
+        return semantic_cache.lookup(user_message, context)
+    return None
+
+
+def _remember_answer(cache_key: str | None, user_message: str, context: str | None, answer: str) -> None:
+    # May write to SQLite when the response cache is persisted; async callers use a thread.
+    if cache_key is None:
+        return
+    if LLM_CACHE_ENABLED:
+        response_cache.put(cache_key, answer)
+    if semantic_cache is not None:
+        semantic_cache.add(user_message, answer, context)
 
 
 def _fallback_response(user_message: str, context: str | None, history: Iterable[Mapping[str, str]] | None) -> str:
     context_section = f"\nContext: {context}" if context else ""
-    history_section = f"\nPrevious conversation (most recent first):\n{_render_history(history)}" if history else ""
+    rendered = prompt_builder.render_history(history, PROMPT_MAX_TOKENS) if history else None
+    history_section = f"\nPrevious conversation (most recent first):\n{rendered}" if rendered else ""
     return dedent(
         f"""
         Thanks for your question!{context_section}{history_section}
@@ -54,22 +170,277 @@ def _fallback_response(user_message: str, context: str | None, history: Iterable
     ).strip()
 
 
+def _attempt_timeout(deadline: float) -> float:
+    return max(min(OPENAI_TIMEOUT, deadline - time.monotonic()), 0.001)
+
+
+def _retry_delay(attempt: int, deadline: float) -> float | None:
+    """Backoff before retry ``attempt``, or None when retries or the deadline are used up."""
+    if attempt >= LLM_MAX_RETRIES:
+        return None
+    delay = backoff_delay(attempt, LLM_RETRY_BACKOFF, LLM_RETRY_BACKOFF_MAX)
+    if time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def _create(deadline: float, messages: list[dict[str, str]]) -> Any:
+    # Caller holds a limiter slot and has passed the breaker. Records success or failure only
+    # (credential errors count as failures); other errors (e.g. a 400) say nothing about the
+    # provider and leave that to the caller.
+    openai_client = _get_client()
+    attempt = 0
+    while True:
+        try:
+            completion = openai_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=0.4,
+                timeout=_attempt_timeout(deadline),
+            )
+        except _retryable_errors():
+            metrics.inc(metrics.llm_errors_total)
+            delay = _retry_delay(attempt, deadline)
+            if delay is None:
+                breaker.record_failure()
+                raise
+            attempt += 1
+            time.sleep(delay)
+            continue
+        except _credential_errors():
+            metrics.inc(metrics.llm_errors_total)
+            breaker.record_failure()
+            raise
+        except Exception:
+            metrics.inc(metrics.llm_errors_total)
+            raise
+        breaker.record_success()
+        return completion
+
+
+def _complete(messages: list[dict[str, str]]) -> str | None:
+    deadline = time.monotonic() + LLM_DEADLINE
+    limiter.acquire(LLM_QUEUE_TIMEOUT)
+    try:
+        if not breaker.allow():
+            raise LLMUnavailable("circuit_open")
+        try:
+            completion = _create(deadline, messages)
+        except BaseException:
+            breaker.record_abandoned()
+            raise
+        return completion.choices[0].message.content
+    finally:
+        limiter.release()
+
+
+async def _acreate(deadline: float, **kwargs: Any) -> Any:
+    # Caller holds a limiter slot and has passed the breaker. Records success or failure only
+    # (credential errors count as failures); other errors (e.g. a 400) say nothing about the
+    # provider and leave that to the caller.
+    openai_client = await _get_async_client()
+    attempt = 0
+    while True:
+        timeout = _attempt_timeout(deadline)
+        try:
+            response = await asyncio.wait_for(
+                openai_client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    temperature=0.4,
+                    timeout=timeout,
+                    **kwargs,
+                ),
+                timeout,
+            )
+        except _retryable_errors():
+            metrics.inc(metrics.llm_errors_total)
+            delay = _retry_delay(attempt, deadline)
+            if delay is None:
+                breaker.record_failure()
+                raise
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+        except _credential_errors():
+            metrics.inc(metrics.llm_errors_total)
+            breaker.record_failure()
+            raise
+        except Exception:
+            metrics.inc(metrics.llm_errors_total)
+            raise
+        breaker.record_success()
+        return response
+
+
+async def _acomplete(messages: list[dict[str, str]]) -> str | None:
+    deadline = time.monotonic() + LLM_DEADLINE
+    await limiter.aacquire(LLM_QUEUE_TIMEOUT)
+    try:
+        if not breaker.allow():
+            raise LLMUnavailable("circuit_open")
+        try:
+            completion = await _acreate(deadline, messages=messages)
+        except BaseException:
+            # Includes cancellation, e.g. a coalesced caller that went away mid-probe.
+            breaker.record_abandoned()
+            raise
+        return completion.choices[0].message.content
+    finally:
+        limiter.release()
+
+
+async def _astream(messages: list[dict[str, str]]) -> AsyncIterator[str]:
+    deadline = time.monotonic() + LLM_DEADLINE
+    await limiter.aacquire(LLM_QUEUE_TIMEOUT)
+    try:
+        if not breaker.allow():
+            raise LLMUnavailable("circuit_open")
+        # Retries only cover opening the stream; tokens already sent cannot be taken back.
+        try:
+            stream = await _acreate(deadline, messages=messages, stream=True)
+        except BaseException:
+            # Includes cancellation when the client closes the event stream.
+            breaker.record_abandoned()
+            raise
+        chunks = stream.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), _attempt_timeout(deadline))
+            except StopAsyncIteration:
+                break
+            except _retryable_errors():
+                metrics.inc(metrics.llm_errors_total)
+                breaker.record_failure()
+                raise
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+    finally:
+        limiter.release()
+
+
+def _flight_key(cache_key: str | None, messages: list[dict[str, str]]) -> str:
+    # Without history the normalized cache key identifies the prompt; otherwise hash it whole.
+    if cache_key is not None:
+        return cache_key
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _fallback_reason(error: Exception) -> str:
+    return error.reason if isinstance(error, LLMUnavailable) else "error"
+
+
 def generate_response(
     user_message: str,
     context: str | None = None,
     history: Iterable[Mapping[str, str]] | None = None,
 ) -> str:
     if not OPENAI_API_KEY:
+        metrics.inc(metrics.llm_fallbacks_total, "no_api_key")
         return _fallback_response(user_message, context, history)
 
+    cache_key = _cache_key(user_message, context, history)
+    cached = _cached_answer(cache_key, user_message, context)
+    if cached is not None:
+        return cached
+
     try:
-        messages = _build_messages(user_message, context, history)
-        completion = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-            temperature=0.4,
-        )
-        content = completion.choices[0].message.content
-        return content.strip() if content else _fallback_response(user_message, context, history)
-    except Exception:
+        messages = prompt_builder.build(user_message, context, history)
+        content = flights.run(_flight_key(cache_key, messages), lambda: _complete(messages))
+    except Exception as error:
+        metrics.inc(metrics.llm_fallbacks_total, _fallback_reason(error))
+        return _fallback_response(user_message, context, history)
+    if not content:
+        metrics.inc(metrics.llm_fallbacks_total, "empty")
         return _fallback_response(user_message, context, history)
+
+    answer = content.strip()
+    _remember_answer(cache_key, user_message, context, answer)
+    return answer
+
+
+async def agenerate_response(
+    user_message: str,
+    context: str | None = None,
+    history: Iterable[Mapping[str, str]] | None = None,
+) -> str:
+    if not OPENAI_API_KEY:
+        metrics.inc(metrics.llm_fallbacks_total, "no_api_key")
+        return _fallback_response(user_message, context, history)
+
+    cache_key = _cache_key(user_message, context, history)
+    cached = _cached_answer(cache_key, user_message, context)
+    if cached is not None:
+        return cached
+
+    try:
+        messages = prompt_builder.build(user_message, context, history)
+        content = await flights.arun(_flight_key(cache_key, messages), lambda: _acomplete(messages))
+    except Exception as error:
+        metrics.inc(metrics.llm_fallbacks_total, _fallback_reason(error))
+        return _fallback_response(user_message, context, history)
+    if not content:
+        metrics.inc(metrics.llm_fallbacks_total, "empty")
+        return _fallback_response(user_message, context, history)
+
+    answer = content.strip()
+    if cache_key is not None:
+        await asyncio.to_thread(_remember_answer, cache_key, user_message, context, answer)
+    return answer
+
+
+async def astream_response(
+    user_message: str,
+    context: str | None = None,
+    history: Iterable[Mapping[str, str]] | None = None,
+) -> AsyncIterator[str]:
+    if not OPENAI_API_KEY:
+        metrics.inc(metrics.llm_fallbacks_total, "no_api_key")
+        yield _fallback_response(user_message, context, history)
+        return
+
+    cache_key = _cache_key(user_message, context, history)
+    cached = _cached_answer(cache_key, user_message, context)
+    if cached is not None:
+        yield cached
+        return
+
+    tokens = []
+    fallback_reason = "empty"
+    try:
+        async for token in _astream(prompt_builder.build(user_message, context, history)):
+            tokens.append(token)
+            yield token
+    except Exception as error:
+        # Once tokens have reached the client the partial answer stands; otherwise fall back.
+        # Neither case is cached.
+        if tokens:
+            return
+        fallback_reason = _fallback_reason(error)
+    if not tokens:
+        metrics.inc(metrics.llm_fallbacks_total, fallback_reason)
+        yield _fallback_response(user_message, context, history)
+    elif cache_key is not None:
+        await asyncio.to_thread(_remember_answer, cache_key, user_message, context, "".join(tokens).strip())
+
+
+def llm_stats() -> dict[str, float]:
+    return {
+        **{f"breaker_{key}": value for key, value in breaker.stats().items()},
+        **{f"limiter_{key}": value for key, value in limiter.stats().items()},
+        **{f"singleflight_{key}": value for key, value in flights.stats().items()},
+    }
+
+
+def rebuild_semantic_cache(rows: Sequence[Mapping[str, Any]], contexts: Sequence[str | None]) -> int:
+    """Reloads the semantic cache from upvoted chat logs (newest first, as ``Storage.upvoted_chat_logs`` returns them).
+
+    ``contexts`` holds the FAQ context of each row's question, which chat logs do not store.
+    """
+    if semantic_cache is None:
+        return 0
+    # Oldest first so the most recent answers win on near-duplicates.
+    entries = [(row["user_message"], row["bot_response"], context) for row, context in zip(rows, contexts)]
+    return semantic_cache.rebuild(reversed(entries))
@@ -1,22 +1,64 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-from . import db
-from .config import DEFAULT_LOW_CONFIDENCE_THRESHOLD, FAQ_PATH, STATIC_DIR
+from . import analytics, db, metrics, retention
+from .batch import answer_batch
+from .config import (
+    ADMIN_TOKEN,
+    ANALYTICS_FLUSH_INTERVAL,
+    ARCHIVE_DIR,
+    BATCH_MAX_REQUESTS,
+    DEFAULT_LOW_CONFIDENCE_THRESHOLD,
+    FAQ_INDEX_PATH,
+    FAQ_MATCH_THRESHOLD,
+    FAQ_PATH,
+    LLM_MIN_CONFIDENCE,
+    METRICS_ENABLED,
+    RETENTION_DAYS,
+    RETENTION_INTERVAL,
+    SEMANTIC_CACHE_CAPACITY,
+    STATIC_DIR,
+    TICKET_LEASE_SECONDS,
+)
 from .faq import FAQService
 from .intent import detect_intent
-from .llm import generate_response
+from .llm import (
+    agenerate_response,
+    astream_response,
+    llm_stats,
+    rebuild_semantic_cache,
+    response_cache,
+    semantic_cache,
+    warm_up,
+)
 from .schemas import (
+    AnalyticsBucket,
+    AnalyticsResponse,
     ChatRequest,
     ChatResponse,
     ChatHistoryItem,
+    ChatLogItem,
+    FAQEntry,
+    FAQIndexResponse,
     FeedbackRequest,
     FeedbackResponse,
     HealthResponse,
+    ReadinessResponse,
+    TicketClaimRequest,
+    TicketReleaseRequest,
     TicketResponse,
 )
+from .storage import SQLiteStorage, create_storage
+from .tickets import TICKET_COLUMNS, is_breached
+
+_created_at = time.monotonic()
 
 app = FastAPI(title="AI Customer Support Bot", version="0.1.0")
 
@@ -28,15 +70,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-faq_service = FAQService(FAQ_PATH)
+if METRICS_ENABLED:
+    app.add_middleware(metrics.ServerTimingMiddleware)
+
+faq_service = FAQService(FAQ_PATH, index_path=FAQ_INDEX_PATH)
+
+storage = create_storage()
+_background_tasks: list["asyncio.Task[None]"] = []
+# Seconds from importing this module to the end of startup; None until ready and again once shutting down.
+_ready_after: Optional[float] = None
+
+MAX_PAGE_SIZE = 200
 
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
+def _set_next_cursor(response: Response, rows: list, limit: int) -> None:
+    # A full page means there may be more rows; clients pass this value back as ``after_id``.
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+
+
 @app.on_event("startup")
-def startup_event() -> None:
+async def startup_event() -> None:
+    global _ready_after
+    # The local SQLite file always holds the LLM response cache, whichever backend stores chats.
     db.init_db()
+    await storage.start()
     faq_service.load()
+    response_cache.load()
+    if semantic_cache is not None:
+        rows = await storage.upvoted_chat_logs(SEMANTIC_CACHE_CAPACITY)
+        # The FAQ context each answer was generated with, as _chat_context finds it.
+        matches = faq_service.best_matches([row["user_message"] for row in rows])
+        rebuild_semantic_cache(rows, [answer for answer, _ in matches])
+    if ANALYTICS_FLUSH_INTERVAL > 0:
+        _background_tasks.append(asyncio.create_task(analytics.flush_periodically(storage, ANALYTICS_FLUSH_INTERVAL)))
+    if RETENTION_DAYS > 0 and RETENTION_INTERVAL > 0 and isinstance(storage, SQLiteStorage):
+        _background_tasks.append(asyncio.create_task(retention.retain_periodically(storage, RETENTION_INTERVAL)))
+    # Requests that need the LLM wait for the client on their own; everything else is servable now.
+    _background_tasks.append(asyncio.create_task(asyncio.to_thread(warm_up)))
+    _ready_after = time.monotonic() - _created_at
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    global _ready_after
+    _ready_after = None
+    while _background_tasks:
+        _background_tasks.pop().cancel()
+    # Closing the storage also flushes the remaining analytics deltas.
+    await storage.close()
+    db.shutdown()
 
 
 @app.get("/")
@@ -57,50 +142,184 @@ def chat_ui() -> HTMLResponse:
     raise HTTPException(status_code=404, detail="UI not found")
 
 
+def _stats_samples(stats: Optional[dict[str, float]]) -> list[tuple[str, dict[str, str], float]]:
+    return [("", {"stat": key}, value) for key, value in (stats or {}).items()]
+
+
+metrics.registry.gauge_collector(
+    "support_bot_db_pool", "Storage connection pool statistics.", lambda: _stats_samples(storage.stats())
+)
+metrics.registry.gauge_collector(
+    "support_bot_db_write_behind",
+    "Write-behind queue statistics.",
+    lambda: _stats_samples(db.write_behind_stats()),
+)
+metrics.registry.gauge_collector(
+    "support_bot_history_cache",
+    "Per-session chat history cache statistics.",
+    lambda: _stats_samples(db.history_cache.stats()),
+)
+metrics.registry.gauge_collector(
+    "support_bot_llm_client",
+    "LLM circuit breaker (breaker_state: 0 closed, 1 half-open, 2 open) and call limiter.",
+    lambda: _stats_samples(llm_stats()),
+)
+metrics.registry.gauge_collector(
+    "support_bot_llm_cache", "LLM response cache statistics.", lambda: _stats_samples(response_cache.stats())
+)
+metrics.registry.gauge_collector(
+    "support_bot_semantic_cache",
+    "Semantic answer cache statistics.",
+    lambda: _stats_samples(semantic_cache.stats() if semantic_cache is not None else None),
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint() -> PlainTextResponse:
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/health", response_model=HealthResponse)
 def health_check() -> HealthResponse:
-    return HealthResponse(status="ok", message="Service is healthy")
+    return HealthResponse(
+        status="ok",
+        message="Service is healthy",
+        database=storage.stats(),
+        faq=faq_service.stats(),
+        history_cache=db.history_cache.stats(),
+        analytics=analytics.rollups.stats(),
+        llm=llm_stats(),
+        llm_cache=response_cache.stats(),
+        semantic_cache=semantic_cache.stats() if semantic_cache is not None else None,
+    )
+
+
+@app.get("/api/ready", response_model=ReadinessResponse)
+def readiness_check(response: Response) -> ReadinessResponse:
+    """Readiness probe: 200 once startup has finished, 503 before that and while shutting down.
+
+    Unlike ``/api/health`` it reads no statistics, so load balancers can poll it cheaply.
+    """
+    if _ready_after is None:
+        response.status_code = 503
+        return ReadinessResponse(status="unavailable")
+    return ReadinessResponse(status="ready", startup_seconds=round(_ready_after, 4))
+
+
+async def _chat_context(payload: ChatRequest) -> tuple[str, float, Optional[str], float, list[dict]]:
+    (intent, intent_score), (faq_answer, faq_score), history_rows = await asyncio.gather(
+        metrics.timed("detect_intent", asyncio.to_thread(detect_intent, payload.message)),
+        metrics.timed("faq_service.best_match", asyncio.to_thread(faq_service.best_match, payload.message)),
+        metrics.timed("db.recent_chat_history", storage.recent_chat_history(payload.session_id, limit=5)),
+    )
+    return intent, intent_score, faq_answer, faq_score, history_rows
 
 
 @app.post("/api/chat", response_model=ChatResponse)
-def chat_endpoint(payload: ChatRequest) -> ChatResponse:
-    intent, intent_score = detect_intent(payload.message)
-    faq_answer, faq_score = faq_service.best_match(payload.message)
-    history_rows = db.recent_chat_history(payload.session_id, limit=5)
-    history_payload = [dict(row) for row in history_rows]
+async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
+    intent, intent_score, faq_answer, faq_score, history_payload = await _chat_context(payload)
 
-    if faq_answer and faq_score >= 0.5:
+    if faq_answer and faq_score >= FAQ_MATCH_THRESHOLD:
         bot_response = faq_answer
         confidence = faq_score
+        source = "faq"
     else:
-        bot_response = generate_response(
-            payload.message,
-            context=faq_answer,
-            history=history_payload,
+        bot_response = await metrics.timed(
+            "generate_response",
+            agenerate_response(payload.message, context=faq_answer, history=history_payload),
         )
-        confidence = max(intent_score, faq_score, 0.35)
-
-    chat_log_id = db.insert_chat_log(
-        payload.message,
-        bot_response,
-        intent,
-        confidence,
-        payload.session_id,
+        confidence = max(intent_score, faq_score, LLM_MIN_CONFIDENCE)
+        source = "llm"
+    metrics.inc(metrics.chat_path_total, source)
+
+    return await _record_chat(payload, bot_response, intent, confidence, faq_answer, source)
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest) -> StreamingResponse:
+    intent, intent_score, faq_answer, faq_score, history_payload = await _chat_context(payload)
+
+    async def events() -> AsyncIterator[str]:
+        if faq_answer and faq_score >= FAQ_MATCH_THRESHOLD:
+            bot_response = faq_answer
+            confidence = faq_score
+            source = "faq"
+            yield _sse("token", {"text": faq_answer})
+        else:
+            parts = []
+            async for token in astream_response(payload.message, context=faq_answer, history=history_payload):
+                parts.append(token)
+                yield _sse("token", {"text": token})
+            bot_response = "".join(parts).strip()
+            confidence = max(intent_score, faq_score, LLM_MIN_CONFIDENCE)
+            source = "llm"
+        metrics.inc(metrics.chat_path_total, source)
+
+        # Persist only once the full answer is known, then send the usual ChatResponse payload.
+        result = await _record_chat(payload, bot_response, intent, confidence, faq_answer, source)
+        yield _sse("done", result.dict())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    should_create_ticket = intent == "escalation" or confidence < DEFAULT_LOW_CONFIDENCE_THRESHOLD
-    created_ticket = False
-    ticket_id = None
 
+@app.post("/api/chat/batch")
+async def chat_batch_endpoint(payload: list[ChatRequest]) -> StreamingResponse:
+    if len(payload) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_REQUESTS} requests")
+
+    async def lines() -> AsyncIterator[str]:
+        async for result in answer_batch(payload, faq_service, storage):
+            yield result.json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _record_chat(
+    payload: ChatRequest,
+    bot_response: str,
+    intent: str,
+    confidence: float,
+    faq_answer: Optional[str],
+    source: str,
+) -> ChatResponse:
+    should_create_ticket = intent == "escalation" or confidence < DEFAULT_LOW_CONFIDENCE_THRESHOLD
+    writes = [
+        metrics.timed(
+            "db.insert_chat_log",
+            storage.insert_chat_log(payload.message, bot_response, intent, confidence, payload.session_id, source),
+        )
+    ]
     if should_create_ticket:
-        ticket_id = db.insert_ticket(payload.message, priority="normal", bot_confidence=confidence)
-        created_ticket = True
+        # Repeat contacts from the session are folded into its active ticket, whose id comes back.
+        writes.append(
+            metrics.timed(
+                "db.open_ticket",
+                storage.open_ticket(payload.message, payload.session_id, intent, confidence),
+            )
+        )
+    chat_log_id, *tickets = await asyncio.gather(*writes)
+    ticket_id = None
+    ticket_created = False
+    if tickets:
+        ticket_id, ticket_created = tickets[0]
+        if ticket_created:
+            metrics.inc(metrics.tickets_created_total)
 
     return ChatResponse(
         response=bot_response,
         intent=intent,
         confidence=round(confidence, 2),
-        created_ticket=created_ticket,
+        created_ticket=ticket_created,
         ticket_id=ticket_id,
         chat_log_id=chat_log_id,
         session_id=payload.session_id,
@@ -109,8 +328,14 @@ def chat_endpoint(payload: ChatRequest) -> ChatResponse:
 
 
 @app.get("/api/chat/history/{session_id}", response_model=list[ChatHistoryItem])
-def chat_history(session_id: str, limit: int = 10) -> list[ChatHistoryItem]:
-    rows = db.recent_chat_history(session_id, limit=limit)
+async def chat_history(
+    session_id: str,
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+) -> list[ChatHistoryItem]:
+    rows = await storage.recent_chat_history(session_id, limit=limit, after_id=after_id)
+    _set_next_cursor(response, rows, limit)
     return [
         ChatHistoryItem(
             id=row["id"],
@@ -122,26 +347,130 @@ def chat_history(session_id: str, limit: int = 10) -> list[ChatHistoryItem]:
     ]
 
 
+@app.get("/api/chat/logs/{chat_log_id}", response_model=ChatLogItem)
+async def chat_log_endpoint(chat_log_id: int) -> ChatLogItem:
+    # Also finds logs moved to the archive by retention, e.g. ones referenced by feedback.
+    if not isinstance(storage, SQLiteStorage):
+        raise HTTPException(status_code=501, detail="Chat log lookup requires the SQLite backend")
+    row = await storage.run(retention.resolve_chat_log, chat_log_id, ARCHIVE_DIR)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Chat log not found")
+    return ChatLogItem(**row)
+
+
 @app.post("/api/feedback", response_model=FeedbackResponse)
-def feedback_endpoint(payload: FeedbackRequest) -> FeedbackResponse:
+async def feedback_endpoint(payload: FeedbackRequest) -> FeedbackResponse:
     if payload.rating not in {"up", "down"}:
         raise HTTPException(status_code=422, detail="Rating must be 'up' or 'down'")
 
-    feedback_id = db.insert_feedback(payload.chat_log_id, payload.rating, payload.comment)
+    feedback_id = await storage.insert_feedback(payload.chat_log_id, payload.rating, payload.comment)
     return FeedbackResponse(feedback_id=feedback_id)
 
 
+def _ticket_response(row: Any) -> TicketResponse:
+    return TicketResponse(**{column: row[column] for column in TICKET_COLUMNS}, sla_breached=is_breached(row))
+
+
 @app.get("/api/tickets", response_model=list[TicketResponse])
-def tickets_endpoint() -> list[TicketResponse]:
-    rows = db.list_tickets()
-    return [
-        TicketResponse(
-            id=row["id"],
-            user_message=row["user_message"],
-            status=row["status"],
-            priority=row["priority"],
-            created_at=row["created_at"],
-            bot_confidence=row["bot_confidence"],
-        )
-        for row in rows
-    ]
+async def tickets_endpoint(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    status: Optional[str] = None,
+    order: str = Query("created", pattern="^(created|due)$"),
+) -> list[TicketResponse]:
+    rows = await storage.list_tickets(limit=limit, after_id=after_id, status=status, order=order)
+    _set_next_cursor(response, rows, limit)
+    return [_ticket_response(row) for row in rows]
+
+
+@app.post(
+    "/api/tickets/claim",
+    response_model=TicketResponse,
+    responses={204: {"description": "No open tickets"}},
+)
+async def claim_ticket_endpoint(payload: TicketClaimRequest) -> Any:
+    row = await storage.claim_ticket(payload.agent, payload.lease_seconds or TICKET_LEASE_SECONDS)
+    if row is None:
+        return Response(status_code=204)
+    return _ticket_response(row)
+
+
+@app.post("/api/tickets/{ticket_id}/renew", response_model=TicketResponse)
+async def renew_ticket_endpoint(ticket_id: int, payload: TicketClaimRequest) -> TicketResponse:
+    row = await storage.renew_ticket(ticket_id, payload.agent, payload.lease_seconds or TICKET_LEASE_SECONDS)
+    if row is None:
+        raise HTTPException(status_code=409, detail="Ticket is not claimed by this agent")
+    return _ticket_response(row)
+
+
+@app.post("/api/tickets/{ticket_id}/release", response_model=TicketResponse)
+async def release_ticket_endpoint(ticket_id: int, payload: TicketReleaseRequest) -> TicketResponse:
+    row = await storage.release_ticket(ticket_id, payload.agent, "open")
+    if row is None:
+        raise HTTPException(status_code=409, detail="Ticket is not claimed by this agent")
+    return _ticket_response(row)
+
+
+@app.post("/api/tickets/{ticket_id}/resolve", response_model=TicketResponse)
+async def resolve_ticket_endpoint(ticket_id: int, payload: TicketReleaseRequest) -> TicketResponse:
+    row = await storage.release_ticket(ticket_id, payload.agent, "resolved")
+    if row is None:
+        raise HTTPException(status_code=409, detail="Ticket is not claimed by this agent")
+    return _ticket_response(row)
+
+
+@app.get("/api/analytics", response_model=AnalyticsResponse)
+async def analytics_endpoint(
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    buckets: int = Query(24, ge=1, le=24 * 31),
+) -> AnalyticsResponse:
+    # Reads only the rollup table plus this process's not-yet-flushed deltas.
+    since = analytics.since_bucket(granularity, buckets)
+    rows = [*await storage.read_rollups(granularity, since), *analytics.rollups.peek(granularity, since)]
+    return AnalyticsResponse(
+        granularity=granularity,
+        buckets=[AnalyticsBucket(**bucket) for bucket in analytics.summarize(rows)],
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/api/admin/faqs/reload", response_model=FAQIndexResponse, dependencies=[Depends(require_admin)])
+def reload_faqs_endpoint() -> FAQIndexResponse:
+    faq_service.reload(force=True)
+    return FAQIndexResponse(**faq_service.stats())
+
+
+@app.put("/api/admin/faqs", response_model=FAQIndexResponse, dependencies=[Depends(require_admin)])
+def upsert_faq_endpoint(payload: FAQEntry) -> FAQIndexResponse:
+    try:
+        faq_service.upsert(payload.question, payload.answer)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error)) from error
+    return FAQIndexResponse(**faq_service.stats())
+
+
+@app.delete("/api/admin/faqs", response_model=FAQIndexResponse, dependencies=[Depends(require_admin)])
+def delete_faq_endpoint(question: str = Query(..., min_length=1)) -> FAQIndexResponse:
+    if not faq_service.delete(question):
+        raise HTTPException(status_code=404, detail="FAQ not found")
+    return FAQIndexResponse(**faq_service.stats())
+
+
+@app.post("/api/admin/analytics/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_analytics_endpoint() -> dict[str, str]:
+    until = await analytics.rebuild(storage)
+    return {"status": "rebuilt", "rebuilt_before": until}
+
+
+@app.post("/api/admin/retention/run", dependencies=[Depends(require_admin)])
+async def retention_endpoint(days: Optional[int] = Query(None, ge=1)) -> dict[str, int]:
+    if not isinstance(storage, SQLiteStorage):
+        raise HTTPException(status_code=501, detail="Retention requires the SQLite backend")
+    if days is None and RETENTION_DAYS <= 0:
+        raise HTTPException(status_code=422, detail="Pass days or set RETENTION_DAYS")
+    return await storage.run(retention.run_retention, days or RETENTION_DAYS)
@@ -0,0 +1,241 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from .config import METRICS_ENABLED
+
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts (non-cumulative) + overflow, sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.labels, values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                cumulative += counts[-1]
+                labels = _format_labels(self.labels, values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total[0]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+        self._collectors: List[Tuple[str, str, Collector]] = []
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_collector(self, name: str, documentation: str, collect: Collector) -> None:
+        """Registers gauges whose values are read from ``collect`` at scrape time."""
+        self._collectors.append((name, documentation, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, collect in self._collectors:
+            samples = list(collect())
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for suffix, labels, value in samples:
+                label_text = _format_labels(list(labels), tuple(labels.values()))
+                lines.append(f"{name}{suffix}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "support_bot_stage_seconds",
+    "Time spent in each stage of the chat pipeline.",
+    labels=("stage",),
+)
+chat_path_total = registry.counter(
+    "support_bot_chat_answers_total",
+    "Chat answers by source (faq or llm).",
+    labels=("path",),
+)
+llm_errors_total = registry.counter(
+    "support_bot_llm_errors_total",
+    "LLM calls that raised an error.",
+)
+llm_fallbacks_total = registry.counter(
+    "support_bot_llm_fallbacks_total",
+    "Responses served by the template fallback instead of the LLM.",
+    labels=("reason",),
+)
+tickets_created_total = registry.counter(
+    "support_bot_tickets_created_total",
+    "Support tickets created.",
+)
+
+# Stage timings of the current request, used for the Server-Timing header.
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _record(stage: str, seconds: float) -> None:
+    stage_seconds.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _record(self.stage, time.perf_counter() - self.started)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name: str) -> Any:
+    """Context manager timing a synchronous block; a shared no-op when metrics are disabled."""
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _StageTimer(name)
+
+
+def timed(name: str, awaitable: Awaitable[T]) -> Awaitable[T]:
+    """Times an awaitable from the event loop; returned unchanged when metrics are disabled."""
+    if not METRICS_ENABLED:
+        return awaitable
+
+    async def run() -> T:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            _record(name, time.perf_counter() - started)
+
+    return run()
+
+
+def inc(counter: Counter, *label_values: str) -> None:
+    if METRICS_ENABLED:
+        counter.inc(*label_values)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a ``Server-Timing`` header with the request's stage timings."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings]
+                entries.append(f"total;dur={(time.perf_counter() - started) * 1000:.3f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,527 @@
+"""PostgreSQL storage backend (``STORAGE_BACKEND=postgres``), built on an asyncpg connection pool.
+
+Queries run on the event loop without a thread hop. asyncpg prepares each statement once per
+connection and keeps it in the connection's statement cache, so repeated inserts and lookups skip
+parsing and planning. Batch writes reserve chat log ids from the sequence and then stream the rows
+with ``COPY``. The tables mirror the SQLite schema; ``created_at`` stays an ISO-8601 string so both
+backends sort, paginate and serialize rows the same way.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from . import analytics, db
+from .analytics import REBUILD_STATEMENTS, RollupKey, rollups
+from .config import PG_STATEMENT_CACHE_SIZE
+from .storage import ChatBatchEntry, Storage
+from .tickets import (
+    TICKET_COLUMNS,
+    derive_priority,
+    due_at,
+    earlier,
+    lease_until,
+    raise_priority,
+    ticket_message,
+    ticket_session,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_logs (
+    id BIGSERIAL PRIMARY KEY,
+    user_message TEXT NOT NULL,
+    bot_response TEXT NOT NULL,
+    intent TEXT,
+    confidence DOUBLE PRECISION,
+    created_at TEXT NOT NULL,
+    session_id TEXT NOT NULL DEFAULT 'default',
+    source TEXT
+);
+ALTER TABLE chat_logs ADD COLUMN IF NOT EXISTS source TEXT;
+CREATE TABLE IF NOT EXISTS tickets (
+    id BIGSERIAL PRIMARY KEY,
+    user_message TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    bot_confidence DOUBLE PRECISION,
+    session_id TEXT,
+    contacts INTEGER NOT NULL DEFAULT 1,
+    negative_feedback INTEGER NOT NULL DEFAULT 0,
+    due_at TEXT,
+    claimed_by TEXT,
+    lease_expires_at TEXT,
+    updated_at TEXT,
+    opened_priority TEXT
+);
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns WHERE table_name = 'tickets' AND column_name = 'due_at'
+    ) THEN
+        ALTER TABLE tickets ADD COLUMN due_at TEXT;
+        -- Tickets from before the queue existed are treated as already due.
+        UPDATE tickets SET due_at = created_at;
+    END IF;
+END $$;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS session_id TEXT;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS contacts INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS negative_feedback INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS lease_expires_at TEXT;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS updated_at TEXT;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS opened_priority TEXT;
+CREATE TABLE IF NOT EXISTS feedback (
+    id BIGSERIAL PRIMARY KEY,
+    chat_log_id BIGINT NOT NULL REFERENCES chat_logs(id),
+    rating TEXT NOT NULL,
+    comment TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analytics_rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (granularity, bucket, metric, dimension)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_logs_session_id ON chat_logs (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created_at ON tickets (status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_due_at ON tickets (status, due_at, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_session_id ON tickets (session_id, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_active_session ON tickets (session_id) WHERE status IN ('open', 'claimed');
+CREATE INDEX IF NOT EXISTS idx_feedback_chat_log_id ON feedback (chat_log_id);
+"""
+
+_RESERVE_IDS = "SELECT nextval(pg_get_serial_sequence($1, 'id')) FROM generate_series(1, $2)"
+_TICKET_COLUMNS = ", ".join(TICKET_COLUMNS)
+# Row-locks the session's active ticket, found through the partial unique index.
+_ACTIVE_TICKET = """
+    SELECT id, user_message, priority, created_at, contacts, negative_feedback, due_at
+    FROM tickets
+    WHERE session_id = $1 AND status IN ('open', 'claimed')
+    FOR UPDATE
+"""
+
+
+class PostgresStorage(Storage):
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int,
+        max_size: int,
+        statement_cache_size: int = PG_STATEMENT_CACHE_SIZE,
+    ) -> None:
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self._pool: Any = None
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size,
+        )
+        async with self._pool.acquire() as conn:
+            await conn.execute(SCHEMA)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await analytics.flush(self)
+            pool, self._pool = self._pool, None
+            await pool.close()
+        db.history_cache.clear()
+
+    async def insert_chat_log(
+        self,
+        user_message: str,
+        bot_response: str,
+        intent: Optional[str],
+        confidence: float,
+        session_id: str,
+        source: Optional[str] = None,
+    ) -> int:
+        created_at = datetime.utcnow().isoformat()
+        chat_log_id = await self._pool.fetchval(
+            """
+            INSERT INTO chat_logs (user_message, bot_response, intent, confidence, created_at, session_id, source)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            RETURNING id
+            """,
+            user_message,
+            bot_response,
+            intent,
+            confidence,
+            created_at,
+            session_id,
+            source,
+        )
+        rollups.record_chat(created_at, intent, confidence, source)
+        db.history_cache.append(
+            session_id,
+            {"id": chat_log_id, "user_message": user_message, "bot_response": bot_response, "created_at": created_at},
+        )
+        return chat_log_id
+
+    async def _open_ticket(
+        self,
+        conn: Any,
+        user_message: str,
+        session_id: Optional[str],
+        intent: Optional[str],
+        confidence: Optional[float],
+        now: str,
+    ) -> Tuple[int, bool, str]:
+        # Same rules as app.db._open_ticket; must run inside a transaction. Without a session
+        # (NULL) the unique index never conflicts, so the loop ends after one insert.
+        session_id = ticket_session(session_id)
+        while True:
+            previous_contacts = negative_feedback = 0
+            if session_id is not None:
+                active = await conn.fetchrow(_ACTIVE_TICKET, session_id)
+                if active is not None:
+                    contacts = active["contacts"] + 1
+                    priority = raise_priority(
+                        active["priority"], derive_priority(intent, confidence, contacts, active["negative_feedback"])
+                    )
+                    await conn.execute(
+                        """
+                        UPDATE tickets
+                        SET user_message = $1, contacts = $2, priority = $3, due_at = $4, updated_at = $5
+                        WHERE id = $6
+                        """,
+                        ticket_message(user_message, active["user_message"]),
+                        contacts,
+                        priority,
+                        earlier(active["due_at"], due_at(active["created_at"], priority)),
+                        now,
+                        active["id"],
+                    )
+                    return active["id"], False, priority
+
+                previous_contacts = await conn.fetchval(
+                    "SELECT COALESCE(SUM(contacts), 0) FROM tickets WHERE session_id = $1", session_id
+                )
+                negative_feedback = await conn.fetchval(
+                    """
+                    SELECT COUNT(*) FROM feedback
+                    WHERE rating = 'down' AND chat_log_id IN (SELECT id FROM chat_logs WHERE session_id = $1)
+                    """,
+                    session_id,
+                )
+            priority = derive_priority(intent, confidence, previous_contacts + 1, negative_feedback)
+            ticket_id = await conn.fetchval(
+                """
+                INSERT INTO tickets (
+                    user_message, status, priority, created_at, bot_confidence, session_id,
+                    contacts, negative_feedback, due_at, updated_at, opened_priority
+                )
+                VALUES ($1, 'open', $2, $3, $4, $5, 1, $6, $7, $3, $2)
+                ON CONFLICT (session_id) WHERE status IN ('open', 'claimed') DO NOTHING
+                RETURNING id
+                """,
+                ticket_message(user_message),
+                priority,
+                now,
+                confidence,
+                session_id,
+                negative_feedback,
+                due_at(now, priority),
+            )
+            if ticket_id is not None:
+                return ticket_id, True, priority
+            # A concurrent request opened the session's ticket first; fold this contact into it.
+
+    async def open_ticket(
+        self,
+        user_message: str,
+        session_id: str,
+        intent: Optional[str],
+        confidence: Optional[float],
+    ) -> Tuple[int, bool]:
+        now = datetime.utcnow().isoformat()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                ticket_id, created, priority = await self._open_ticket(
+                    conn, user_message, session_id, intent, confidence, now
+                )
+        if created:
+            rollups.record_ticket(now, priority)
+        return ticket_id, created
+
+    async def insert_feedback(self, chat_log_id: int, rating: str, comment: Optional[str]) -> int:
+        created_at = datetime.utcnow().isoformat()
+        feedback_id = await self._pool.fetchval(
+            """
+            INSERT INTO feedback (chat_log_id, rating, comment, created_at)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id
+            """,
+            chat_log_id,
+            rating,
+            comment,
+            created_at,
+        )
+        rollups.record_feedback(created_at, rating)
+        if rating == "down":
+            await self._escalate_for_feedback(chat_log_id, created_at)
+        return feedback_id
+
+    async def _escalate_for_feedback(self, chat_log_id: int, now: str) -> None:
+        async with self._pool.acquire() as conn:
+            session_id = ticket_session(
+                await conn.fetchval("SELECT session_id FROM chat_logs WHERE id = $1", chat_log_id)
+            )
+            if session_id is None:
+                return
+            async with conn.transaction():
+                active = await conn.fetchrow(_ACTIVE_TICKET, session_id)
+                if active is None:
+                    return
+                negative_feedback = active["negative_feedback"] + 1
+                priority = raise_priority(
+                    active["priority"], derive_priority(None, None, active["contacts"], negative_feedback)
+                )
+                await conn.execute(
+                    """
+                    UPDATE tickets SET negative_feedback = $1, priority = $2, due_at = $3, updated_at = $4
+                    WHERE id = $5
+                    """,
+                    negative_feedback,
+                    priority,
+                    earlier(active["due_at"], due_at(active["created_at"], priority)),
+                    now,
+                    active["id"],
+                )
+
+    async def insert_chat_batch(self, entries: Sequence[ChatBatchEntry]) -> List[Tuple[int, Optional[int], bool]]:
+        if not entries:
+            return []
+        created_at = datetime.utcnow().isoformat()
+        tickets: Dict[int, Tuple[int, bool]] = {}
+        new_priorities: List[str] = []
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                # COPY cannot return generated keys, so take the ids from the sequence first.
+                chat_log_ids = [row[0] for row in await conn.fetch(_RESERVE_IDS, "chat_logs", len(entries))]
+                await conn.copy_records_to_table(
+                    "chat_logs",
+                    columns=[
+                        "id",
+                        "user_message",
+                        "bot_response",
+                        "intent",
+                        "confidence",
+                        "created_at",
+                        "session_id",
+                        "source",
+                    ],
+                    records=[
+                        (chat_log_id, user_message, bot_response, intent, confidence, created_at, session_id, source)
+                        for chat_log_id, (user_message, bot_response, intent, confidence, session_id, _, source) in zip(
+                            chat_log_ids, entries
+                        )
+                    ],
+                )
+                # Tickets go one by one: each has to see the ones before it to deduplicate.
+                for position, (user_message, _, intent, confidence, session_id, create_ticket, _) in enumerate(entries):
+                    if create_ticket:
+                        ticket_id, created, priority = await self._open_ticket(
+                            conn, user_message, session_id, intent, confidence, created_at
+                        )
+                        tickets[position] = (ticket_id, created)
+                        if created:
+                            new_priorities.append(priority)
+
+        results: List[Tuple[int, Optional[int], bool]] = []
+        for position, chat_log_id in enumerate(chat_log_ids):
+            user_message, bot_response, intent, confidence, session_id, _, source = entries[position]
+            ticket_id, created = tickets.get(position, (None, False))
+            results.append((chat_log_id, ticket_id, created))
+            db.history_cache.append(
+                session_id,
+                {"id": chat_log_id, "user_message": user_message, "bot_response": bot_response, "created_at": created_at},
+            )
+            rollups.record_chat(created_at, intent, confidence, source)
+        for priority in new_priorities:
+            rollups.record_ticket(created_at, priority)
+        return results
+
+    async def recent_chat_history(
+        self,
+        session_id: str,
+        limit: int = 5,
+        after_id: Optional[int] = None,
+    ) -> List[Mapping[str, Any]]:
+        if after_id is None:
+            cached = db.history_cache.get(session_id, limit)
+            if cached is not None:
+                return cached
+            records = await self._pool.fetch(
+                """
+                SELECT id, user_message, bot_response, created_at
+                FROM chat_logs
+                WHERE session_id = $1
+                ORDER BY id DESC
+                LIMIT $2
+                """,
+                session_id,
+                limit,
+            )
+        else:
+            records = await self._pool.fetch(
+                """
+                SELECT id, user_message, bot_response, created_at
+                FROM chat_logs
+                WHERE session_id = $1 AND id < $2
+                ORDER BY id DESC
+                LIMIT $3
+                """,
+                session_id,
+                after_id,
+                limit,
+            )
+        rows = [dict(record) for record in records]
+        if after_id is None and (len(rows) < limit or len(rows) >= db.history_cache.turns):
+            db.history_cache.fill(session_id, rows)
+        return rows
+
+    async def list_tickets(
+        self,
+        limit: int = 50,
+        after_id: Optional[int] = None,
+        status: Optional[str] = None,
+        order: str = "created",
+    ) -> List[Mapping[str, Any]]:
+        # Same keyset pagination as the SQLite backend; the query text only varies with which
+        # filters are present, so each variant stays a single cached prepared statement.
+        clauses = []
+        params: List[Any] = []
+        if status is not None:
+            params.append(status)
+            clauses.append(f"status = ${len(params)}")
+        if after_id is not None:
+            params.append(after_id)
+            if order == "due":
+                clauses.append(f"(due_at, id) > (SELECT due_at, id FROM tickets WHERE id = ${len(params)})")
+            else:
+                clauses.append(f"(created_at, id) < (SELECT created_at, id FROM tickets WHERE id = ${len(params)})")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sort = "due_at ASC, id ASC" if order == "due" else "created_at DESC, id DESC"
+        params.append(limit)
+        return await self._pool.fetch(
+            f"""
+            SELECT {_TICKET_COLUMNS}
+            FROM tickets
+            {where}
+            ORDER BY {sort}
+            LIMIT ${len(params)}
+            """,
+            *params,
+        )
+
+    async def claim_ticket(self, agent: str, lease_seconds: float) -> Optional[Mapping[str, Any]]:
+        now = datetime.utcnow()
+        stamp = now.isoformat()
+        async with self._pool.acquire() as conn:
+            await conn.execute(
+                """
+                UPDATE tickets SET status = 'open', claimed_by = NULL, lease_expires_at = NULL, updated_at = $1
+                WHERE status = 'claimed' AND lease_expires_at < $1
+                """,
+                stamp,
+            )
+            # SKIP LOCKED lets concurrent claimers take the next tickets instead of queueing on one row.
+            return await conn.fetchrow(
+                f"""
+                UPDATE tickets SET status = 'claimed', claimed_by = $1, lease_expires_at = $2, updated_at = $3
+                WHERE id = (
+                    SELECT id FROM tickets WHERE status = 'open' ORDER BY due_at, id LIMIT 1 FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {_TICKET_COLUMNS}
+                """,
+                agent,
+                lease_until(now, lease_seconds),
+                stamp,
+            )
+
+    async def renew_ticket(self, ticket_id: int, agent: str, lease_seconds: float) -> Optional[Mapping[str, Any]]:
+        now = datetime.utcnow()
+        return await self._pool.fetchrow(
+            f"""
+            UPDATE tickets SET lease_expires_at = $1, updated_at = $2
+            WHERE id = $3 AND status = 'claimed' AND claimed_by = $4
+            RETURNING {_TICKET_COLUMNS}
+            """,
+            lease_until(now, lease_seconds),
+            now.isoformat(),
+            ticket_id,
+            agent,
+        )
+
+    async def release_ticket(self, ticket_id: int, agent: str, status: str) -> Optional[Mapping[str, Any]]:
+        return await self._pool.fetchrow(
+            f"""
+            UPDATE tickets SET status = $1, claimed_by = NULL, lease_expires_at = NULL, updated_at = $2
+            WHERE id = $3 AND status = 'claimed' AND claimed_by = $4
+            RETURNING {_TICKET_COLUMNS}
+            """,
+            status,
+            datetime.utcnow().isoformat(),
+            ticket_id,
+            agent,
+        )
+
+    async def upvoted_chat_logs(self, limit: int) -> List[Mapping[str, Any]]:
+        return await self._pool.fetch(
+            """
+            SELECT id, user_message, bot_response
+            FROM chat_logs
+            WHERE id IN (SELECT chat_log_id FROM feedback WHERE rating = 'up')
+            ORDER BY id DESC
+            LIMIT $1
+            """,
+            limit,
+        )
+
+    async def merge_rollups(self, deltas: Mapping[RollupKey, float]) -> None:
+        await self._pool.executemany(
+            """
+            INSERT INTO analytics_rollups (granularity, bucket, metric, dimension, value)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (granularity, bucket, metric, dimension)
+            DO UPDATE SET value = analytics_rollups.value + excluded.value
+            """,
+            [(*key, value) for key, value in deltas.items()],
+        )
+
+    async def read_rollups(self, granularity: str, since: str) -> List[Mapping[str, Any]]:
+        return await self._pool.fetch(
+            """
+            SELECT bucket, metric, dimension, value
+            FROM analytics_rollups
+            WHERE granularity = $1 AND bucket >= $2
+            """,
+            granularity,
+            since,
+        )
+
+    async def rebuild_rollups(self, until: str) -> None:
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                # No retention on this backend, so every bucket before ``until`` is rebuilt.
+                for statement in REBUILD_STATEMENTS:
+                    await conn.execute(statement.replace("?", "$"), "", until)
+
+    def stats(self) -> Dict[str, float]:
+        if self._pool is None:
+            return {"size": 0, "max_size": self.max_size, "idle": 0, "in_use": 0}
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {"size": size, "max_size": self.max_size, "idle": idle, "in_use": size - idle}
@@ -0,0 +1,133 @@
+import math
+import threading
+from collections import OrderedDict
+from textwrap import dedent
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+SYSTEM_PROMPT = dedent(
+    """
+    You are a concise and polite customer support assistant. Use the provided FAQ context and
+    recent conversation to answer the user's question. If you do not have enough information,
+    ask a brief clarifying question and mention that you can escalate to a human agent if needed.
+    Keep responses under 120 words.
+    """
+).strip()
+
+# Rough BPE ratio for English text; close enough for budgeting without a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+SUMMARY_QUESTION_TOKENS = 16
+
+HISTORY_HEADER = "Recent history (most recent first):"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clip(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 0:
+        return ""
+    return text[: max(max_chars - 1, 0)].rstrip() + "…"
+
+
+class PromptBuilder:
+    """Builds chat messages that fit a token budget.
+
+    The system prompt, question and FAQ context are always included. History turns are added
+    newest first while they fit; each turn is clipped to ``turn_max_tokens``, and turns that no
+    longer fit are folded into a one-line summary of the customer's earlier questions. Rendered
+    turns are cached by chat log id, so consecutive turns of a session only render the new one.
+    """
+
+    def __init__(self, max_tokens: int, turn_max_tokens: int, cache_size: int = 4096) -> None:
+        self.max_tokens = max_tokens
+        self.turn_max_tokens = turn_max_tokens
+        self.cache_size = cache_size
+        self._system_tokens = estimate_tokens(SYSTEM_PROMPT)
+        self._turns: "OrderedDict[Tuple[int, str], Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render_turn(self, item: Mapping[str, str]) -> Tuple[str, int]:
+        # created_at guards against reused ids when the database is swapped (e.g. benchmarks).
+        turn_id = (item["id"], item.get("created_at", "")) if item.get("id") is not None else None
+        if turn_id is not None:
+            with self._lock:
+                cached = self._turns.get(turn_id)
+                if cached is not None:
+                    self._turns.move_to_end(turn_id)
+                    self.hits += 1
+                    return cached
+                self.misses += 1
+
+        # Split the per-turn allowance so a long answer cannot crowd out the question.
+        half = self.turn_max_tokens // 2
+        text = f"User: {clip(item.get('user_message') or '', half)}\nBot: {clip(item.get('bot_response') or '', half)}"
+        rendered = (text, estimate_tokens(text))
+
+        if turn_id is not None:
+            with self._lock:
+                self._turns[turn_id] = rendered
+                while len(self._turns) > self.cache_size:
+                    self._turns.popitem(last=False)
+        return rendered
+
+    def render_history(self, history: Iterable[Mapping[str, str]], budget: int) -> Optional[str]:
+        """Renders history (newest first) within ``budget`` tokens, or None if nothing fits."""
+        snippets: List[str] = []
+        older: List[Mapping[str, str]] = []
+        used = 0
+        for item in history:
+            if older:
+                older.append(item)
+                continue
+            text, tokens = self.render_turn(item)
+            # One extra token for the blank line between turns.
+            if used + tokens + 1 > budget:
+                older.append(item)
+                continue
+            snippets.append(text)
+            used += tokens + 1
+
+        if older:
+            questions = "; ".join(clip(item.get("user_message") or "", SUMMARY_QUESTION_TOKENS) for item in older)
+            summary = clip(f"Earlier, the customer also asked: {questions}", max(budget - used, 0))
+            if summary:
+                snippets.append(summary)
+        return "\n\n".join(snippets) or None
+
+    def build(
+        self,
+        user_message: str,
+        context: Optional[str],
+        history: Optional[Iterable[Mapping[str, str]]],
+    ) -> List[Dict[str, str]]:
+        user_parts = [f"Customer question: {user_message}"]
+        if context:
+            user_parts.append(f"FAQ context: {context}")
+
+        remaining = self.max_tokens - self._system_tokens - estimate_tokens("\n\n".join(user_parts))
+        remaining -= estimate_tokens(HISTORY_HEADER) + 1
+        if history and remaining > 0:
+            history_section = self.render_history(history, remaining)
+            if history_section:
+                user_parts.append(f"{HISTORY_HEADER}\n{history_section}")
+
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": "\n\n".join(user_parts)},
+        ]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "cached_turns": len(self._turns),
+                "hits": self.hits,
+                "misses": self.misses,
+                "max_tokens": self.max_tokens,
+            }
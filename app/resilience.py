@@ -0,0 +1,164 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+
+class LLMUnavailable(Exception):
+    """Raised instead of calling the provider; ``reason`` is used as the fallback metric label."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """Fails fast after repeated provider failures.
+
+    Closed: calls pass and consecutive failures are counted. After ``failure_threshold`` the
+    breaker opens and rejects calls for ``reset_timeout`` seconds; then a single probe call is
+    let through (half-open). The probe's outcome closes the breaker again or reopens it; a probe
+    that ends without an outcome (``record_abandoned``) lets the next call probe instead.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_abandoned(self) -> None:
+        """An allowed call ended without saying anything about the provider's health (it was
+        cancelled, or the request itself was rejected). Frees the probe slot if it held it."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "state": {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state],
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class CallLimiter:
+    """Caps concurrent calls and, with a token bucket, calls per second.
+
+    ``rate`` <= 0 disables the per-second limit. Callers wait at most ``timeout`` seconds for a
+    slot and are rejected after that, so a backlog turns into fast fallbacks instead of queueing.
+    """
+
+    _POLL_INTERVAL = 0.01
+
+    def __init__(self, max_concurrency: int, rate: float, burst: Optional[float] = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self.rejected = 0
+
+    def _try_acquire(self) -> float:
+        # Returns 0 on success, otherwise a hint of how long to wait. Caller holds the lock.
+        if self._in_flight >= self.max_concurrency:
+            return self._POLL_INTERVAL
+        if self.rate > 0:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.rate
+            self._tokens -= 1.0
+        self._in_flight += 1
+        return 0.0
+
+    def acquire(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                wait = self._try_acquire()
+                if not wait:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise LLMUnavailable("rate_limited")
+                self._released.wait(min(wait, remaining))
+
+    async def aacquire(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._try_acquire()
+                if not wait:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise LLMUnavailable("rate_limited")
+            await asyncio.sleep(min(wait, remaining, 0.05))
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._released.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rate_per_second": self.rate,
+                "tokens": round(self._tokens, 2),
+                "rejected": self.rejected,
+            }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for retry ``attempt`` (0-based)."""
+    return random.uniform(0.0, min(cap, base * (2**attempt)))
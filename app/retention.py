@@ -0,0 +1,230 @@
+"""Retention and archival for ``chat_logs``.
+
+Usage:
+    python -m app.retention [--days 90] [--archive-dir archive] [--enable-incremental-vacuum]
+
+Chat logs older than the retention age are copied to gzip-compressed, column-oriented JSON files
+partitioned by day (``chat_logs/date=2024-05-01/part-<first id>-<last id>.json.gz``) and then
+deleted from SQLite. Each chunk is read, archived and deleted in its own short transaction, so
+live chat writes only ever wait for one chunk. Afterwards the freed pages are returned to the
+filesystem with ``PRAGMA incremental_vacuum`` in bounded steps.
+
+Every archive file is recorded in ``chat_log_archives`` with its id range, so ids referenced by
+``feedback`` stay resolvable through ``resolve_chat_log``. Analytics rollups are kept as is.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from . import db
+from .config import ARCHIVE_DIR, RETENTION_CHUNK_SIZE, RETENTION_DAYS, RETENTION_VACUUM_PAGES
+
+if TYPE_CHECKING:
+    from .storage import SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = ("id", "user_message", "bot_response", "intent", "confidence", "created_at", "session_id", "source")
+ARCHIVE_FORMAT = "chat_logs-columnar-v1"
+# Pause between chunks so queued writers get the database lock.
+_CHUNK_PAUSE = 0.01
+
+
+def _partition_path(day: str, first_id: int, last_id: int) -> Path:
+    return Path("chat_logs") / f"date={day}" / f"part-{first_id:012d}-{last_id:012d}.json.gz"
+
+
+def write_partition(archive_dir: Path, day: str, rows: List[Dict[str, Any]]) -> Path:
+    """Writes ``rows`` (sorted by id) as one compressed columnar file; returns its path relative to ``archive_dir``."""
+    relative = _partition_path(day, rows[0]["id"], rows[-1]["id"])
+    path = archive_dir / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One array per column compresses much better than row-wise records with repeated keys.
+    payload = {
+        "format": ARCHIVE_FORMAT,
+        "partition": day,
+        "columns": {column: [row[column] for row in rows] for column in ARCHIVE_COLUMNS},
+    }
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with gzip.open(temp_path, "wt", encoding="utf-8") as file:
+        json.dump(payload, file, separators=(",", ":"))
+    os.replace(temp_path, path)
+    return relative
+
+
+def read_partition(path: Path) -> List[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        payload = json.load(file)
+    if payload.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"{path} is not a chat log archive")
+    columns = payload["columns"]
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def _archive_chunk(archive_dir: Path, cutoff: str, after_id: int, chunk_size: int) -> Optional[Tuple[int, int]]:
+    """Archives and deletes the next chunk of expired rows.
+
+    Returns ``(last id, rows archived)``, or None once no expired rows are left.
+    """
+    with db.get_connection() as conn:
+        rows = [
+            dict(row)
+            for row in conn.execute(
+                f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM chat_logs WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, chunk_size),
+            )
+        ]
+    # Rows are walked in id order, which follows insertion time, so the first row inside the
+    # retention window ends the run.
+    expired = []
+    for row in rows:
+        if row["created_at"] >= cutoff:
+            break
+        expired.append(row)
+    if not expired:
+        return None
+
+    partitions: Dict[str, List[Dict[str, Any]]] = {}
+    for row in expired:
+        partitions.setdefault(row["created_at"][:10], []).append(row)
+    # Files are written before the rows are deleted; a crash in between just means the rows are
+    # archived again on the next run.
+    written = [(day, write_partition(archive_dir, day, day_rows), day_rows) for day, day_rows in partitions.items()]
+
+    archived_at = datetime.utcnow().isoformat()
+    with db.get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO chat_log_archives (path, partition, min_id, max_id, row_count, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (str(relative), day, day_rows[0]["id"], day_rows[-1]["id"], len(day_rows), archived_at)
+                for day, relative, day_rows in written
+            ],
+        )
+        conn.executemany("DELETE FROM chat_logs WHERE id = ?", [(row["id"],) for row in expired])
+    return expired[-1]["id"], len(expired)
+
+
+def incremental_vacuum(max_pages: int = RETENTION_VACUUM_PAGES) -> int:
+    """Releases free pages ``max_pages`` at a time, each step its own short write; returns the pages freed."""
+    freed = 0
+    with db.get_connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.warning("auto_vacuum is not INCREMENTAL; run with --enable-incremental-vacuum once to reclaim space")
+            return 0
+        while True:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_pages:
+                break
+            conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+            freed += free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(_CHUNK_PAUSE)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return freed
+
+
+def enable_incremental_vacuum() -> None:
+    """Switches an existing database to incremental auto-vacuum; this rewrites the whole file once."""
+    with db.get_connection() as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def run_retention(
+    days: int = RETENTION_DAYS,
+    archive_dir: Path = ARCHIVE_DIR,
+    chunk_size: int = RETENTION_CHUNK_SIZE,
+    vacuum_pages: int = RETENTION_VACUUM_PAGES,
+) -> Dict[str, int]:
+    """Archives and deletes chat logs older than ``days`` days, then vacuums incrementally."""
+    if days <= 0:
+        return {"archived": 0, "chunks": 0, "pages_freed": 0}
+    cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+    # Archived writes that are still queued would otherwise be missed by the id walk.
+    db.flush_write_behind()
+
+    archived = 0
+    chunks = 0
+    last_id = 0
+    while True:
+        handled = _archive_chunk(archive_dir, cutoff, last_id, chunk_size)
+        if handled is None:
+            break
+        last_id, count = handled
+        archived += count
+        chunks += 1
+        time.sleep(_CHUNK_PAUSE)
+
+    pages_freed = incremental_vacuum(vacuum_pages) if chunks else 0
+    return {"archived": archived, "chunks": chunks, "pages_freed": pages_freed}
+
+
+async def retain_periodically(storage: "SQLiteStorage", interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await storage.run(run_retention)
+        except Exception:
+            logger.exception("Chat log retention run failed; will retry")
+        else:
+            if result["archived"]:
+                logger.info("Archived %d chat logs in %d chunks", result["archived"], result["chunks"])
+
+
+def resolve_chat_log(chat_log_id: int, archive_dir: Path = ARCHIVE_DIR) -> Optional[Dict[str, Any]]:
+    """Looks a chat log up in ``chat_logs`` and then in the archive; ``archived`` tells which."""
+    with db.get_connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM chat_logs WHERE id = ?",
+            (chat_log_id,),
+        ).fetchone()
+        if row is not None:
+            return {**dict(row), "archived": False}
+        paths = [
+            candidate["path"]
+            for candidate in conn.execute(
+                "SELECT path FROM chat_log_archives WHERE max_id >= ? AND min_id <= ? ORDER BY max_id",
+                (chat_log_id, chat_log_id),
+            )
+        ]
+    for path in paths:
+        for archived_row in read_partition(archive_dir / path):
+            if archived_row["id"] == chat_log_id:
+                return {**archived_row, "archived": True}
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive and delete old chat logs")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="Retention age in days (0 disables)")
+    parser.add_argument("--archive-dir", type=Path, default=ARCHIVE_DIR, help="Directory for archive files")
+    parser.add_argument("--chunk-size", type=int, default=RETENTION_CHUNK_SIZE, help="Rows deleted per transaction")
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Convert an existing database to incremental auto-vacuum first (one full VACUUM)",
+    )
+    args = parser.parse_args()
+
+    db.init_db()
+    try:
+        if args.enable_incremental_vacuum:
+            enable_incremental_vacuum()
+        result = run_retention(args.days, args.archive_dir, args.chunk_size)
+    finally:
+        db.shutdown()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
+from .config import DEFAULT_SESSION_ID
+
 
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1)
-    session_id: str = Field("default", min_length=1, description="Conversation/session identifier")
+    session_id: str = Field(DEFAULT_SESSION_ID, min_length=1, description="Conversation/session identifier")
 
 
 class ChatResponse(BaseModel):
@@ -36,11 +38,39 @@ class TicketResponse(BaseModel):
     priority: str
     created_at: str
     bot_confidence: Optional[float]
+    session_id: Optional[str] = None
+    contacts: int = 1
+    negative_feedback: int = 0
+    due_at: Optional[str] = None
+    sla_breached: bool = False
+    claimed_by: Optional[str] = None
+    lease_expires_at: Optional[str] = None
+
+
+class TicketClaimRequest(BaseModel):
+    agent: str = Field(..., min_length=1)
+    lease_seconds: Optional[float] = Field(None, gt=0, le=86400, description="Defaults to TICKET_LEASE_SECONDS")
+
+
+class TicketReleaseRequest(BaseModel):
+    agent: str = Field(..., min_length=1)
 
 
 class HealthResponse(BaseModel):
     status: str
     message: str
+    database: Optional[Dict[str, float]] = None
+    faq: Optional[Dict[str, float]] = None
+    history_cache: Optional[Dict[str, float]] = None
+    analytics: Optional[Dict[str, float]] = None
+    llm: Optional[Dict[str, float]] = None
+    llm_cache: Optional[Dict[str, float]] = None
+    semantic_cache: Optional[Dict[str, float]] = None
+
+
+class ReadinessResponse(BaseModel):
+    status: str
+    startup_seconds: Optional[float] = None
 
 
 class ChatHistoryItem(BaseModel):
@@ -48,3 +78,45 @@ class ChatHistoryItem(BaseModel):
     user_message: str
     bot_response: str
     created_at: str
+
+
+class ChatLogItem(BaseModel):
+    id: int
+    user_message: str
+    bot_response: str
+    intent: Optional[str]
+    confidence: Optional[float]
+    created_at: str
+    session_id: str
+    source: Optional[str]
+    archived: bool
+
+
+class FAQEntry(BaseModel):
+    question: str = Field(..., min_length=1)
+    answer: str = Field(..., min_length=1)
+
+
+class FAQIndexResponse(BaseModel):
+    entries: int
+    delta_entries: int
+    tombstones: int
+    reloads: int
+
+
+class AnalyticsBucket(BaseModel):
+    bucket: str
+    chats: int
+    intents: Dict[str, int]
+    faq_answers: int
+    llm_answers: int
+    avg_confidence: Optional[float]
+    tickets: int
+    ticket_rate: Optional[float]
+    feedback_up: int
+    feedback_down: int
+
+
+class AnalyticsResponse(BaseModel):
+    granularity: str
+    buckets: List[AnalyticsBucket]
@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .faq import words
+from .vectors import HashingVectorizer
+
+# A new answer this close to an existing entry replaces it instead of taking a new slot.
+_DUPLICATE_SIMILARITY = 0.98
+
+
+class SemanticCache:
+    """Answers near-duplicate questions from previously generated responses.
+
+    Questions are embedded with the same hashed n-gram vectorizer as the semantic FAQ mode and
+    kept in a preallocated float32 matrix. A lookup is one matrix-vector product; when the
+    nearest cached question reaches ``threshold`` its answer is reused. Only entries generated
+    with the same FAQ context are considered, like the context in the exact cache key. Once
+    ``capacity`` is reached the least recently used slot is overwritten.
+    """
+
+    def __init__(self, capacity: int, threshold: float, vectorizer: Optional[HashingVectorizer] = None) -> None:
+        self.capacity = capacity
+        self.threshold = threshold
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self._vectors = np.zeros((capacity, self.vectorizer.dim), dtype=np.float32)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._contexts = np.zeros(capacity, dtype=np.int64)
+        self._questions: List[str] = []
+        self._answers: List[str] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _embed(self, question: str) -> Tuple[str, np.ndarray]:
+        # The FAQ analysis: case and accents folded, words of any script kept.
+        normalized = " ".join(words(question))
+        return normalized, self.vectorizer.transform_one(normalized)
+
+    @staticmethod
+    def _context_id(context: Optional[str]) -> int:
+        if not context:
+            return 0
+        return int.from_bytes(hashlib.blake2b(context.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+    def _nearest(self, vector: np.ndarray, context_id: int) -> Tuple[int, float]:
+        size = len(self._answers)
+        if not size:
+            return -1, 0.0
+        scores = self._vectors[:size] @ vector
+        scores[self._contexts[:size] != context_id] = -np.inf
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def lookup(self, question: str, context: Optional[str] = None) -> Optional[str]:
+        normalized, vector = self._embed(question)
+        with self._lock:
+            slot, score = self._nearest(vector, self._context_id(context))
+            if not normalized or slot < 0 or score < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[slot] = time.monotonic()
+            self.hits += 1
+            return self._answers[slot]
+
+    def add(self, question: str, answer: str, context: Optional[str] = None) -> None:
+        normalized, vector = self._embed(question)
+        if not normalized or not answer:
+            return
+        context_id = self._context_id(context)
+        with self._lock:
+            slot, score = self._nearest(vector, context_id)
+            if slot < 0 or score < _DUPLICATE_SIMILARITY:
+                if len(self._answers) < self.capacity:
+                    slot = len(self._answers)
+                    self._questions.append(normalized)
+                    self._answers.append(answer)
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self.evictions += 1
+            self._vectors[slot] = vector
+            self._contexts[slot] = context_id
+            self._questions[slot] = normalized
+            self._answers[slot] = answer
+            self._last_used[slot] = time.monotonic()
+
+    def rebuild(self, entries: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Replaces the contents with ``(question, answer, context)`` entries, oldest first."""
+        with self._lock:
+            self._questions = []
+            self._answers = []
+            self._vectors.fill(0.0)
+            self._last_used.fill(0.0)
+            self._contexts.fill(0)
+        count = 0
+        for question, answer, context in entries:
+            self.add(question, answer, context)
+            count += 1
+        return count
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._answers),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "matrix_bytes": self._vectors.nbytes,
+            }
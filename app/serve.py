@@ -0,0 +1,45 @@
+"""Multi-worker launcher for the API.
+
+Usage:
+    python -m app.serve [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Compiles the FAQ index once (see ``app.faq_store``) and then starts uvicorn with ``N`` worker
+processes (default: one per CPU core). Each worker memory-maps the same index file instead of
+parsing and indexing ``faqs.json``, so workers start quickly and share one copy of the FAQ data.
+SQLite is opened in WAL mode, so all workers can use the same database file. With more than one
+worker the history cache and write-behind batching are turned off (see ``main``).
+"""
+
+import argparse
+import os
+import sys
+
+import uvicorn
+
+from .config import FAQ_INDEX_PATH, FAQ_MATCH_MODE, FAQ_PATH
+from .faq_store import compile_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8000, help="Bind port")
+    args = parser.parse_args()
+
+    compile_index(FAQ_PATH, FAQ_INDEX_PATH, FAQ_MATCH_MODE)
+    if args.workers > 1:
+        # Consecutive turns of a session can land on different workers, so a worker's cached
+        # history could miss turns written by another one. Read history from SQLite instead.
+        os.environ.setdefault("HISTORY_CACHE_SESSIONS", "0")
+        # Each worker would reserve its own id blocks, so ids would stop following insertion
+        # time, which keyset pagination and history ordering depend on.
+        if os.environ.get("DB_WRITE_BEHIND") == "1":
+            print("DB_WRITE_BEHIND is single-process only; disabled for --workers > 1", file=sys.stderr)
+        os.environ["DB_WRITE_BEHIND"] = "0"
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
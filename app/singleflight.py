@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving while it is in
+    flight wait for and share its result or exception. Nothing is cached once the call returns.
+    ``run`` is for threads, ``arun`` for coroutines on an event loop; the two never share calls.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call[Any]] = {}
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def run(self, key: str, func: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def arun(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                # The shared call runs as its own task so a caller that is cancelled (e.g. the
+                # client disconnected) does not cancel it for everyone else.
+                task = asyncio.ensure_future(factory())
+                self._tasks[key] = task
+                task.add_done_callback(lambda done, key=key: self._finish(key, done))
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
@@ -0,0 +1,222 @@
+import abc
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from . import analytics, db
+from .analytics import RollupKey
+from .config import (
+    DATABASE_URL,
+    DB_EXECUTOR_WORKERS,
+    DB_WRITE_BEHIND,
+    PG_POOL_MAX_SIZE,
+    PG_POOL_MIN_SIZE,
+    STORAGE_BACKEND,
+)
+
+T = TypeVar("T")
+
+# (user_message, bot_response, intent, confidence, session_id, create_ticket, source)
+ChatBatchEntry = Tuple[str, str, Optional[str], float, str, bool, Optional[str]]
+
+
+class Storage(abc.ABC):
+    """Async interface to the chat log, ticket and feedback tables.
+
+    Rows come back as mappings with the column names used by the API schemas. The LLM response
+    cache stays in the local SQLite file whichever backend holds these tables.
+    """
+
+    async def start(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    @abc.abstractmethod
+    async def insert_chat_log(
+        self,
+        user_message: str,
+        bot_response: str,
+        intent: Optional[str],
+        confidence: float,
+        session_id: str,
+        source: Optional[str] = None,
+    ) -> int: ...
+
+    @abc.abstractmethod
+    async def open_ticket(
+        self,
+        user_message: str,
+        session_id: str,
+        intent: Optional[str],
+        confidence: Optional[float],
+    ) -> Tuple[int, bool]:
+        """Opens a ticket or appends the contact to the session's active one; returns ``(ticket_id, created)``."""
+
+    @abc.abstractmethod
+    async def insert_feedback(self, chat_log_id: int, rating: str, comment: Optional[str]) -> int: ...
+
+    @abc.abstractmethod
+    async def insert_chat_batch(self, entries: Sequence[ChatBatchEntry]) -> List[Tuple[int, Optional[int], bool]]:
+        """Writes chat logs (and tickets where requested) in bulk.
+
+        Returns ``(chat_log_id, ticket_id, ticket_created)`` per entry.
+        """
+
+    @abc.abstractmethod
+    async def recent_chat_history(
+        self,
+        session_id: str,
+        limit: int = 5,
+        after_id: Optional[int] = None,
+    ) -> List[Mapping[str, Any]]: ...
+
+    @abc.abstractmethod
+    async def list_tickets(
+        self,
+        limit: int = 50,
+        after_id: Optional[int] = None,
+        status: Optional[str] = None,
+        order: str = "created",
+    ) -> List[Mapping[str, Any]]: ...
+
+    @abc.abstractmethod
+    async def claim_ticket(self, agent: str, lease_seconds: float) -> Optional[Mapping[str, Any]]:
+        """Leases the most urgent open ticket to ``agent``; None when the queue is empty."""
+
+    @abc.abstractmethod
+    async def renew_ticket(self, ticket_id: int, agent: str, lease_seconds: float) -> Optional[Mapping[str, Any]]:
+        """Extends the lease; None unless ``agent`` holds the ticket."""
+
+    @abc.abstractmethod
+    async def release_ticket(self, ticket_id: int, agent: str, status: str) -> Optional[Mapping[str, Any]]:
+        """Requeues (``open``) or resolves a claimed ticket; None unless ``agent`` holds it."""
+
+    @abc.abstractmethod
+    async def upvoted_chat_logs(self, limit: int) -> List[Mapping[str, Any]]: ...
+
+    @abc.abstractmethod
+    async def merge_rollups(self, deltas: Mapping[RollupKey, float]) -> None:
+        """Adds ``deltas`` to the ``analytics_rollups`` table."""
+
+    @abc.abstractmethod
+    async def read_rollups(self, granularity: str, since: str) -> List[Mapping[str, Any]]: ...
+
+    @abc.abstractmethod
+    async def rebuild_rollups(self, until: str) -> None: ...
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, float]: ...
+
+
+class SQLiteStorage(Storage):
+    """Runs the blocking ``app.db`` helpers on a dedicated thread pool.
+
+    The pool is sized to the connection pool, so calls neither starve the default executor nor
+    queue up on connection checkout. Set ``DB_PATH=:memory:`` for a throwaway in-memory database.
+    """
+
+    def __init__(self, workers: int = DB_EXECUTOR_WORKERS, write_behind: bool = DB_WRITE_BEHIND) -> None:
+        self.workers = workers
+        self.write_behind = write_behind
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def start(self) -> None:
+        await self.run(db.init_db)
+        if self.write_behind:
+            db.start_write_behind()
+
+    async def close(self) -> None:
+        await analytics.flush(self)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        # Drains queued write-behind rows before the connections are closed.
+        db.shutdown()
+
+    async def insert_chat_log(
+        self,
+        user_message: str,
+        bot_response: str,
+        intent: Optional[str],
+        confidence: float,
+        session_id: str,
+        source: Optional[str] = None,
+    ) -> int:
+        return await self.run(db.insert_chat_log, user_message, bot_response, intent, confidence, session_id, source)
+
+    async def open_ticket(
+        self,
+        user_message: str,
+        session_id: str,
+        intent: Optional[str],
+        confidence: Optional[float],
+    ) -> Tuple[int, bool]:
+        return await self.run(db.open_ticket, user_message, session_id, intent, confidence)
+
+    async def insert_feedback(self, chat_log_id: int, rating: str, comment: Optional[str]) -> int:
+        return await self.run(db.insert_feedback, chat_log_id, rating, comment)
+
+    async def insert_chat_batch(self, entries: Sequence[ChatBatchEntry]) -> List[Tuple[int, Optional[int], bool]]:
+        return await self.run(db.insert_chat_batch, entries)
+
+    async def recent_chat_history(
+        self,
+        session_id: str,
+        limit: int = 5,
+        after_id: Optional[int] = None,
+    ) -> List[Mapping[str, Any]]:
+        return await self.run(db.recent_chat_history, session_id, limit=limit, after_id=after_id)
+
+    async def list_tickets(
+        self,
+        limit: int = 50,
+        after_id: Optional[int] = None,
+        status: Optional[str] = None,
+        order: str = "created",
+    ) -> List[Mapping[str, Any]]:
+        return await self.run(db.list_tickets, limit=limit, after_id=after_id, status=status, order=order)
+
+    async def claim_ticket(self, agent: str, lease_seconds: float) -> Optional[Mapping[str, Any]]:
+        return await self.run(db.claim_ticket, agent, lease_seconds)
+
+    async def renew_ticket(self, ticket_id: int, agent: str, lease_seconds: float) -> Optional[Mapping[str, Any]]:
+        return await self.run(db.renew_ticket, ticket_id, agent, lease_seconds)
+
+    async def release_ticket(self, ticket_id: int, agent: str, status: str) -> Optional[Mapping[str, Any]]:
+        return await self.run(db.release_ticket, ticket_id, agent, status)
+
+    async def upvoted_chat_logs(self, limit: int) -> List[Mapping[str, Any]]:
+        return await self.run(db.upvoted_chat_logs, limit)
+
+    async def merge_rollups(self, deltas: Mapping[RollupKey, float]) -> None:
+        await self.run(db.merge_rollups, deltas)
+
+    async def read_rollups(self, granularity: str, since: str) -> List[Mapping[str, Any]]:
+        return await self.run(db.read_rollups, granularity, since)
+
+    async def rebuild_rollups(self, until: str) -> None:
+        await self.run(db.rebuild_rollups, until)
+
+    def stats(self) -> Dict[str, float]:
+        return db.pool_stats()
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "postgres":
+        from .postgres import PostgresStorage
+
+        if not DATABASE_URL:
+            raise ValueError("STORAGE_BACKEND=postgres requires DATABASE_URL")
+        return PostgresStorage(DATABASE_URL, min_size=PG_POOL_MIN_SIZE, max_size=PG_POOL_MAX_SIZE)
+    raise ValueError(f"Unknown storage backend: {backend!r}")
@@ -0,0 +1,129 @@
+"""Ticket priorities, SLA deadlines and leases.
+
+Open tickets form a queue ordered by SLA deadline (``due_at``). Each priority has its own
+response window, so an urgent ticket normally comes first, but a normal ticket that is about to
+breach overtakes a fresh high one. Both backends index ``(status, due_at, id)``, so claiming the
+next ticket is one index seek rather than a sort of the table.
+
+A session has at most one active (open or claimed) ticket. Later escalations in the same session
+are folded into it: their messages are appended to ``user_message``, ``contacts`` counts them and
+``negative_feedback`` tallies 👎 ratings on the session's answers. ``user_message`` is capped at
+``TICKET_MESSAGE_MAX_CHARS``; past that the first message and the newest text are kept. The priority is re-derived
+from these signals, only ever goes up, and a raised priority pulls the deadline forward. The
+default session is shared by every client that sends no session id, so it identifies nobody:
+its tickets are stored without a session and never merged.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Mapping, Optional
+
+from .config import (
+    DEFAULT_LOW_CONFIDENCE_THRESHOLD,
+    DEFAULT_SESSION_ID,
+    TICKET_MESSAGE_MAX_CHARS,
+    TICKET_SLA_HIGH,
+    TICKET_SLA_NORMAL,
+    TICKET_SLA_URGENT,
+)
+
+# Ascending urgency.
+PRIORITIES = ("normal", "high", "urgent")
+ACTIVE_STATUSES = ("open", "claimed")
+
+SLA = {
+    "normal": timedelta(seconds=TICKET_SLA_NORMAL),
+    "high": timedelta(seconds=TICKET_SLA_HIGH),
+    "urgent": timedelta(seconds=TICKET_SLA_URGENT),
+}
+
+TICKET_COLUMNS = (
+    "id",
+    "user_message",
+    "status",
+    "priority",
+    "created_at",
+    "bot_confidence",
+    "session_id",
+    "contacts",
+    "negative_feedback",
+    "due_at",
+    "claimed_by",
+    "lease_expires_at",
+)
+
+
+def ticket_session(session_id: Optional[str]) -> Optional[str]:
+    """The session a ticket is merged on; None for the shared default session."""
+    return None if session_id == DEFAULT_SESSION_ID else session_id
+
+
+# Stands in for the contacts dropped from the middle of a capped user_message.
+_OMITTED = "\n…\n"
+
+
+def ticket_message(user_message: str, thread: Optional[str] = None, limit: int = TICKET_MESSAGE_MAX_CHARS) -> str:
+    """The ``user_message`` to store: ``thread`` (the active ticket's text) with the repeat contact
+    appended on its own line, or just the message for a new ticket.
+
+    Past ``limit`` characters (<= 0 means no limit) the first line and the newest text are kept,
+    joined by an ellipsis line, so a session that keeps escalating cannot grow the row forever.
+    """
+    combined = user_message if thread is None else f"{thread}\n{user_message}"
+    if limit <= 0 or len(combined) <= limit:
+        return combined
+    first = combined.split("\n", 1)[0][: limit // 2]
+    tail_length = limit - len(first) - len(_OMITTED)
+    if tail_length <= 0:
+        return combined[-limit:]
+    tail = combined[-tail_length:]
+    # Start the tail at a whole contact unless the newest message alone fills it.
+    line_start = tail.find("\n")
+    if 0 <= line_start < len(tail) - 1:
+        tail = tail[line_start + 1 :]
+    return f"{first}{_OMITTED}{tail}"
+
+
+def _rank(priority: str) -> int:
+    # Tickets written before priorities were derived are all "normal".
+    return PRIORITIES.index(priority) if priority in PRIORITIES else 0
+
+
+def derive_priority(intent: Optional[str], confidence: Optional[float], contacts: int, negative_feedback: int) -> str:
+    """Scores the signals of a ticket-worthy turn: explicit escalation weighs most, then repeat
+    contacts in the session, an answer the bot was very unsure of and 👎 feedback."""
+    score = 0
+    if intent == "escalation":
+        score += 2
+    if confidence is not None and confidence < DEFAULT_LOW_CONFIDENCE_THRESHOLD / 2:
+        score += 1
+    score += min(max(contacts - 1, 0), 2)
+    if negative_feedback:
+        score += 1
+    if score >= 3:
+        return "urgent"
+    return "high" if score else "normal"
+
+
+def raise_priority(current: str, derived: str) -> str:
+    return derived if _rank(derived) > _rank(current) else current
+
+
+def due_at(created_at: str, priority: str) -> str:
+    return (datetime.fromisoformat(created_at) + SLA.get(priority, SLA["normal"])).isoformat()
+
+
+def earlier(first: Optional[str], second: str) -> str:
+    # ISO-8601 strings of the same format order chronologically.
+    return second if first is None or second < first else first
+
+
+def lease_until(now: datetime, lease_seconds: float) -> str:
+    return (now + timedelta(seconds=lease_seconds)).isoformat()
+
+
+def is_breached(ticket: Mapping[str, Any], now: Optional[datetime] = None) -> bool:
+    """True for an active ticket whose SLA deadline has passed."""
+    due = ticket["due_at"]
+    if ticket["status"] not in ACTIVE_STATUSES or due is None:
+        return False
+    return due < (now or datetime.utcnow()).isoformat()
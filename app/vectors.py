@@ -0,0 +1,56 @@
+import zlib
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from .config import FAQ_VECTOR_DIM
+
+
+class HashingVectorizer:
+    """Maps text to fixed-size float32 vectors by hashing its character n-grams.
+
+    Needs no vocabulary or model download: each n-gram is hashed with CRC32 into one of ``dim``
+    buckets with a hash-derived sign, and rows are L2-normalized so a dot product is the cosine
+    similarity.
+    """
+
+    def __init__(self, dim: int = FAQ_VECTOR_DIM, ngram_sizes: Tuple[int, ...] = (3, 4)) -> None:
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        padded = f" {' '.join(text.lower().split())} "
+        hashes = [
+            zlib.crc32(padded[i : i + n].encode("utf-8"))
+            for n in self.ngram_sizes
+            for i in range(max(len(padded) - n + 1, 1))
+        ]
+        hashed = np.fromiter(hashes, dtype=np.uint32, count=len(hashes))
+        buckets = (hashed % self.dim).astype(np.intp)
+        signs = np.where(hashed & 0x80000000, -1.0, 1.0)
+        return buckets, signs
+
+    def transform_one(self, text: str) -> np.ndarray:
+        buckets, signs = self._features(text)
+        vector = np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+    def transform(self, texts: Iterable[str]) -> np.ndarray:
+        rows = [self.transform_one(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+
+
+def top_k(matrix: np.ndarray, vector: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the ids and cosine scores of the ``k`` best rows, best first."""
+    scores = matrix @ vector
+    if k < len(scores):
+        ids = np.argpartition(scores, -k)[-k:]
+    else:
+        ids = np.arange(len(scores))
+    ids = ids[np.argsort(scores[ids])[::-1]]
+    return ids, scores[ids]
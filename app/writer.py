@@ -0,0 +1,233 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import AbstractContextManager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ConnectionFactory = Callable[[], AbstractContextManager[sqlite3.Connection]]
+
+# (table, insert statement, parameters including the preallocated id)
+PendingRow = Tuple[str, str, tuple]
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether ``error`` only means the database was busy (locked, or no pooled connection free)."""
+    if isinstance(error, TimeoutError):
+        return True
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def reserve_ids(conn: sqlite3.Connection, table: str, count: int) -> int:
+    """Reserves ``count`` consecutive AUTOINCREMENT ids for ``table`` and returns the first.
+
+    The reservation bumps ``sqlite_sequence`` so regular inserts (from this or any other
+    process) never reuse an id that is still waiting in a write-behind queue.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        first = max(max_id, row[0] if row else 0) + 1
+        if row:
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (first + count - 1, table))
+        else:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, first + count - 1))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return first
+
+
+class WriteBehindWriter:
+    """Queues inserts and flushes them in batched ``executemany`` transactions.
+
+    Callers get their row id immediately from a block of ids reserved up front. A background
+    thread flushes when ``batch_size`` rows are queued or ``flush_interval`` seconds have
+    passed, and ``close()`` drains whatever is left.
+
+    Each process reserves its own id blocks, so with several processes ids no longer follow
+    insertion time, which keyset pagination and history ordering rely on. Use it with a single
+    worker process only (``app.serve`` turns it off for more).
+    """
+
+    def __init__(
+        self,
+        connection_factory: ConnectionFactory,
+        batch_size: int,
+        flush_interval: float,
+        id_block_size: int,
+        max_attempts: int = 3,
+    ) -> None:
+        self._connection_factory = connection_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block_size = id_block_size
+        self.max_attempts = max_attempts
+
+        self._condition = threading.Condition()
+        self._queue: List[PendingRow] = []
+        self._in_flight: List[PendingRow] = []
+        self._id_blocks: Dict[str, Tuple[int, int]] = {}
+        self._id_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._flushed_rows = 0
+        self._flushed_batches = 0
+        self._dropped_rows = 0
+        # Failed writes per (table, id); only touched under _flush_lock.
+        self._attempts: Dict[Tuple[str, int], int] = {}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _allocate_id(self, table: str) -> int:
+        with self._id_lock:
+            next_id, end = self._id_blocks.get(table, (0, 0))
+            if next_id >= end:
+                with self._connection_factory() as conn:
+                    next_id = reserve_ids(conn, table, self.id_block_size)
+                end = next_id + self.id_block_size
+            self._id_blocks[table] = (next_id + 1, end)
+            return next_id
+
+    def submit(self, table: str, sql: str, params: tuple) -> int:
+        row_id = self._allocate_id(table)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Write-behind writer is closed")
+            self._queue.append((table, sql, (row_id, *params)))
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+        return row_id
+
+    def pending(self, table: str) -> List[tuple]:
+        """Rows for ``table`` that are queued or being flushed but not yet committed."""
+        with self._condition:
+            return [params for name, _, params in (*self._in_flight, *self._queue) if name == table]
+
+    def _write(self, rows: List[PendingRow]) -> None:
+        grouped: Dict[str, List[tuple]] = {}
+        for _, sql, params in rows:
+            grouped.setdefault(sql, []).append(params)
+        with self._connection_factory() as conn:
+            for sql, group in grouped.items():
+                conn.executemany(sql, group)
+
+    def _write_each(self, batch: List[PendingRow]) -> Tuple[int, List[PendingRow], Optional[Exception]]:
+        # Isolates the rows that fail so they cannot hold back the rest of the batch.
+        written = 0
+        retry: List[PendingRow] = []
+        for position, row in enumerate(batch):
+            table, _, params = row
+            key = (table, params[0])
+            try:
+                self._write([row])
+            except Exception as error:
+                if is_transient(error):
+                    retry.extend(batch[position:])
+                    return written, retry, error
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    self._dropped_rows += 1
+                    logger.error("Dropping %s row %d after %d failed writes: %s", table, params[0], attempts, error)
+                else:
+                    self._attempts[key] = attempts
+                    retry.append(row)
+            else:
+                self._attempts.pop(key, None)
+                written += 1
+        return written, retry, None
+
+    def flush(self) -> int:
+        """Writes the queued rows and returns how many were committed.
+
+        A batch that finds the database locked is re-queued as a whole and the error re-raised.
+        Any other error is retried row by row; a row that still fails after ``max_attempts``
+        flushes is logged and dropped.
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch, self._queue = self._queue, []
+                self._in_flight = batch
+            if not batch:
+                return 0
+
+            error: Optional[Exception] = None
+            try:
+                self._write(batch)
+                written, retry = len(batch), []
+            except Exception as batch_error:
+                if is_transient(batch_error):
+                    logger.warning("Write-behind flush of %d rows failed (%s); re-queueing", len(batch), batch_error)
+                    written, retry, error = 0, batch, batch_error
+                else:
+                    logger.warning(
+                        "Write-behind flush of %d rows failed (%s); retrying row by row", len(batch), batch_error
+                    )
+                    written, retry, error = self._write_each(batch)
+
+            with self._condition:
+                self._queue[:0] = retry
+                self._in_flight = []
+                self._flushed_rows += written
+                if written:
+                    self._flushed_batches += 1
+            if error is not None:
+                raise error
+            return written
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval
+        backing_off = False
+        while True:
+            with self._condition:
+                while not self._closed and (backing_off or len(self._queue) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                closed = self._closed
+            try:
+                self.flush()
+                backing_off = False
+            except Exception:
+                # The database is locked (already logged); wait a full interval before retrying.
+                backing_off = True
+            if closed:
+                return
+            deadline = time.monotonic() + self.flush_interval
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        # Drain anything the background thread could not write. Failing rows are dropped after
+        # max_attempts flushes, so only a database that stays locked can leave rows behind.
+        for _ in range(self.max_attempts):
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.flush_interval)
+            with self._condition:
+                if not self._queue:
+                    return
+        with self._condition:
+            unwritten = len(self._queue)
+            self._queue = []
+        logger.error("Write-behind writer closed with %d rows it could not write", unwritten)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "queued": len(self._queue),
+                "in_flight": len(self._in_flight),
+                "flushed_rows": self._flushed_rows,
+                "flushed_batches": self._flushed_batches,
+                "dropped_rows": self._dropped_rows,
+            }
@@ -0,0 +1,119 @@
+"""Shared helpers for the benchmark scripts: a stubbed LLM, temp databases and statistics."""
+
+import asyncio
+import math
+import tempfile
+import time
+import types
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+from app import db, llm
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; ``pct`` is in [0, 100]."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Millisecond summary of a list of durations in seconds."""
+    if not samples:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def print_table(title: str, rows: Iterable[Dict[str, Any]]) -> None:
+    rows = list(rows)
+    print(f"\n{title}")
+    if not rows:
+        print("  (no data)")
+        return
+    columns = list(rows[0])
+    widths = {
+        column: max(len(column), *(len(_format(row.get(column))) for row in rows)) for column in columns
+    }
+    print("  " + "  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  " + "  ".join(_format(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def use_temp_database() -> Path:
+    """Points ``app.db`` at a fresh SQLite file so benchmarks never touch support.sqlite3."""
+    path = Path(tempfile.mkdtemp(prefix="support-bench-")) / "bench.sqlite3"
+    db.close_pool()
+    db.DB_PATH = path
+    db.init_db()
+    return path
+
+
+def _completion(content: str) -> Any:
+    message = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def _chunk(content: str) -> Any:
+    delta = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+
+class _StubStream:
+    def __init__(self, tokens: List[str], latency: float) -> None:
+        self._tokens = tokens
+        self._delay = latency / max(len(tokens), 1)
+
+    def __aiter__(self) -> "_StubStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._tokens:
+            raise StopAsyncIteration
+        await asyncio.sleep(self._delay)
+        return _chunk(self._tokens.pop(0))
+
+
+class _StubAsyncCompletions:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    async def create(self, *, messages: List[Dict[str, str]], stream: bool = False, **_: Any) -> Any:
+        answer = f"Stub answer for: {messages[-1]['content'][:40]}"
+        if stream:
+            return _StubStream([f"{word} " for word in answer.split()], self.latency)
+        await asyncio.sleep(self.latency)
+        return _completion(answer)
+
+
+class _StubCompletions:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def create(self, *, messages: List[Dict[str, str]], **_: Any) -> Any:
+        time.sleep(self.latency)
+        return _completion(f"Stub answer for: {messages[-1]['content'][:40]}")
+
+
+def install_stub_llm(latency: float, cache: bool = False) -> None:
+    """Replaces the OpenAI clients with stubs that answer after ``latency`` seconds."""
+    llm.OPENAI_API_KEY = "stub"
+    llm.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=_StubCompletions(latency)))
+    llm.async_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=_StubAsyncCompletions(latency)))
+    if not cache:
+        llm.LLM_CACHE_ENABLED = False
+        llm.semantic_cache = None
@@ -0,0 +1,185 @@
+"""
+In-process load test for /api/chat, replaying data/demo_queries.json.
+
+Requests go through an ASGI transport (no network), the OpenAI client is replaced by a stub
+with configurable latency, and every run uses a throwaway SQLite database.
+
+Usage:
+    python -m benchmarks.load_test [--concurrency 1,8,32] [--requests 500] [--llm-latency 0.2]
+
+Examples:
+    python -m benchmarks.load_test                              # Default sweep
+    python -m benchmarks.load_test --endpoint /api/chat/stream  # Measure the SSE endpoint
+    python -m benchmarks.load_test --llm-latency 0 --cache      # Pipeline overhead only
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from app import db, main
+
+from .common import install_stub_llm, print_table, summarize, use_temp_database
+
+DEMO_QUERIES_PATH = Path(__file__).resolve().parent.parent / "data" / "demo_queries.json"
+
+
+def load_workload() -> List[Tuple[str, str]]:
+    """Returns (session_id, message) pairs from the demo categories and scenarios."""
+    with open(DEMO_QUERIES_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    workload = []
+    for name, category in data["categories"].items():
+        for query in category.get("queries", []):
+            if isinstance(query, str) and query.strip():
+                workload.append((f"bench-{name}", query))
+    for scenario in data.get("test_scenarios", []):
+        for message in scenario["messages"]:
+            workload.append((f"bench-{scenario['session_id']}", message))
+    return workload
+
+
+class StageTimer:
+    """Wraps pipeline functions to record how long each stage takes."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._restore: List[Callable[[], None]] = []
+
+    def _wrap(self, owner: Any, attribute: str, stage: str) -> None:
+        original = getattr(owner, attribute)
+        samples = self.samples[stage]
+
+        if asyncio.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def timed(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    samples.append(time.perf_counter() - started)
+        else:
+            @functools.wraps(original)
+            def timed(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    samples.append(time.perf_counter() - started)
+
+        setattr(owner, attribute, timed)
+        self._restore.append(lambda: setattr(owner, attribute, original))
+
+    def install(self) -> None:
+        self._wrap(main, "detect_intent", "detect_intent")
+        self._wrap(main.faq_service, "best_match", "faq_service.best_match")
+        self._wrap(db, "recent_chat_history", "db.recent_chat_history")
+        self._wrap(main, "agenerate_response", "generate_response")
+        self._wrap(db, "insert_chat_log", "db.insert_chat_log")
+        self._wrap(db, "open_ticket", "db.open_ticket")
+
+    def uninstall(self) -> None:
+        while self._restore:
+            self._restore.pop()()
+
+    def reset(self) -> None:
+        for samples in self.samples.values():
+            samples.clear()
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    workload: List[Tuple[str, str]],
+    concurrency: int,
+    total: int,
+) -> Dict[str, Any]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        session_id, message = workload[i % len(workload)]
+        queue.put_nowait((f"{session_id}-c{concurrency}", message))
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            try:
+                session_id, message = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await client.post(endpoint, json={"message": message, "session_id": session_id})
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": stats["p50_ms"],
+        "p95_ms": stats["p95_ms"],
+        "p99_ms": stats["p99_ms"],
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    use_temp_database()
+    install_stub_llm(args.llm_latency, cache=args.cache)
+    workload = load_workload()
+    timer = StageTimer()
+
+    await main.app.router.startup()
+    timer.install()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            results = []
+            stage_rows = []
+            for concurrency in args.concurrency:
+                timer.reset()
+                results.append(await run_level(client, args.endpoint, workload, concurrency, args.requests))
+                for stage, samples in timer.samples.items():
+                    stage_rows.append({"concurrency": concurrency, "stage": stage, **summarize(samples)})
+    finally:
+        timer.uninstall()
+        await main.app.router.shutdown()
+
+    print(f"Endpoint {args.endpoint}, stub LLM latency {args.llm_latency * 1000:.0f} ms")
+    print_table("Throughput and latency", results)
+    print_table("Per-stage timings", stage_rows)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Load test the chat API in-process")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 8, 32],
+        help="Comma-separated concurrency levels (default: 1,8,32)",
+    )
+    parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--endpoint", default="/api/chat", help="Endpoint to exercise")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response caches enabled")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,130 @@
+"""
+Microbenchmarks for the chat pipeline's building blocks.
+
+Measures FAQService.best_match (lexical and semantic modes), detect_intent and the db helpers
+against synthetic FAQ corpora and a throwaway SQLite database.
+
+Usage:
+    python -m benchmarks.microbench [--sizes 100,1000,10000,100000] [--queries 200]
+
+Examples:
+    python -m benchmarks.microbench --sizes 100,1000       # Quick run
+    python -m benchmarks.microbench --skip-db               # Matching only
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app import db
+from app.config import FAQ_PATH
+from app.faq import FAQService, parse_faqs
+from app.intent import detect_intent
+
+from .common import print_table, summarize, use_temp_database
+from .load_test import load_workload
+
+
+def synthetic_faqs(size: int, seed: int = 7) -> List[Dict[str, str]]:
+    """Returns ``size`` FAQ entries: the real ones plus questions recombined from their words."""
+    with open(FAQ_PATH, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    rng = random.Random(seed)
+    vocabulary = sorted({word.strip("?,.'").lower() for entry in base for word in entry["question"].split()})
+    vocabulary += [f"item{i}" for i in range(max(size // 10, 10))]
+    faqs = list(base[:size])
+    while len(faqs) < size:
+        words = rng.sample(vocabulary, rng.randint(5, 10))
+        faqs.append({"question": " ".join(words).capitalize() + "?", "answer": f"Synthetic answer {len(faqs)}"})
+    return faqs
+
+
+def time_calls(func: Callable[[Any], Any], inputs: List[Any]) -> List[float]:
+    samples = []
+    for value in inputs:
+        started = time.perf_counter()
+        func(value)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_faq(sizes: List[int], modes: List[str], queries: List[str]) -> List[Dict[str, Any]]:
+    rows = []
+    for size in sizes:
+        faqs = synthetic_faqs(size)
+        for mode in modes:
+            # No file watching: the watcher would swap the real corpus in for the synthetic one.
+            service = FAQService(Path(FAQ_PATH), mode=mode, reload_interval=-1)
+            started = time.perf_counter()
+            service.faqs = parse_faqs(faqs)
+            service.index = service.build_index(service.faqs)
+            build_seconds = time.perf_counter() - started
+            stats = summarize(time_calls(service.best_match, queries))
+            rows.append({"faqs": size, "mode": mode, "build_s": build_seconds, **stats})
+    return rows
+
+
+def bench_intent(queries: List[str]) -> List[Dict[str, Any]]:
+    return [{"function": "detect_intent", **summarize(time_calls(detect_intent, queries))}]
+
+
+def bench_db(rows_per_table: int, iterations: int) -> List[Dict[str, Any]]:
+    use_temp_database()
+    rng = random.Random(11)
+    sessions = [f"session-{i}" for i in range(max(rows_per_table // 20, 1))]
+    for i in range(rows_per_table):
+        chat_log_id = db.insert_chat_log(f"question {i}", f"answer {i}", "general", 0.5, rng.choice(sessions))
+        if i % 10 == 0:
+            db.open_ticket(f"question {i}", f"ticket-session-{i}", "escalation", 0.3)
+            db.insert_feedback(chat_log_id, "up", None)
+
+    benches = {
+        "insert_chat_log": lambda i: db.insert_chat_log(f"bench {i}", "answer", "general", 0.5, rng.choice(sessions)),
+        "open_ticket": lambda i: db.open_ticket(f"bench {i}", f"bench-session-{i}", "escalation", 0.3),
+        "open_ticket_repeat": lambda i: db.open_ticket(f"again {i}", f"bench-session-{i}", "general", 0.3),
+        "claim_ticket": lambda i: db.claim_ticket("bench-agent", 60),
+        "insert_feedback": lambda i: db.insert_feedback(i + 1, "down", None),
+        "recent_chat_history": lambda i: db.recent_chat_history(rng.choice(sessions), limit=5),
+        "list_tickets": lambda i: db.list_tickets(limit=50),
+        "list_tickets_queue": lambda i: db.list_tickets(limit=50, status="open", order="due"),
+    }
+    return [
+        {"function": f"db.{name}", "rows": rows_per_table, **summarize(time_calls(bench, list(range(iterations))))}
+        for name, bench in benches.items()
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark FAQ matching, intents and db helpers")
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[100, 1000, 10000, 100000],
+        help="Comma-separated synthetic FAQ corpus sizes",
+    )
+    parser.add_argument(
+        "--modes",
+        type=lambda value: value.split(","),
+        default=["lexical", "semantic"],
+        help="FAQ match modes to measure",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Queries per measurement")
+    parser.add_argument("--db-rows", type=int, default=10000, help="Rows preloaded before db benchmarks")
+    parser.add_argument("--skip-db", action="store_true", help="Skip the db helper benchmarks")
+    args = parser.parse_args()
+
+    messages = [message for _, message in load_workload()]
+    queries = [messages[i % len(messages)] for i in range(args.queries)]
+
+    print_table("FAQService.best_match", bench_faq(args.sizes, args.modes, queries))
+    print_table("Intent detection", bench_intent(queries))
+    if not args.skip_db:
+        print_table("db helpers", bench_db(args.db_rows, args.queries))
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
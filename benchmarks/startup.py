@@ -0,0 +1,164 @@
+"""
+Cold-start benchmark: how long a fresh worker process takes until ``/api/ready`` answers 200.
+
+Every run is a new interpreter, so nothing is shared between runs except the OS page cache (and
+the compiled FAQ index file, when the variant keeps it). Each run reports the import time of
+``app.main``, the duration of the startup handlers and the wall time from spawning the process to
+readiness, plus whether the OpenAI SDK got imported along the way.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--faqs 0] [--skip-uvicorn]
+
+Examples:
+    python -m benchmarks.startup                  # Shipped FAQs, in-process and uvicorn
+    python -m benchmarks.startup --faqs 20000     # Synthetic corpus, shows the compiled index gain
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from app.config import BASE_DIR, FAQ_PATH
+
+from .common import print_table, summarize
+
+# Runs inside the child process: imports the app, runs its startup handlers and asks /api/ready.
+_PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from app import main
+imported = time.perf_counter()
+
+async def probe():
+    await main.app.router.startup()
+    ready = time.perf_counter()
+    import httpx
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        status = (await client.get("/api/ready")).status_code
+    await main.app.router.shutdown()
+    return ready, status
+
+ready, status = asyncio.run(probe())
+print(json.dumps({
+    "import_s": imported - started,
+    "startup_s": ready - imported,
+    "status": status,
+    "openai_imported": "openai" in sys.modules,
+}))
+"""
+
+
+def _env(workdir: Path, faq_path: Path, index_path: Path) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "DB_PATH": str(workdir / "bench.sqlite3"),
+            "FAQ_PATH": str(faq_path),
+            "FAQ_INDEX_PATH": str(index_path),
+            "PYTHONPATH": str(BASE_DIR),
+        }
+    )
+    return env
+
+
+def run_probe(env: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], env=env, cwd=BASE_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # Process exit includes shutdown; the in-process phases are what a readiness check waits for.
+    result["wall_s"] = time.perf_counter() - started
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_uvicorn(env: Dict[str, str], timeout: float = 60.0) -> float:
+    """Spawns ``uvicorn app.main:app`` and returns the seconds until /api/ready answers 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get("/api/ready").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+                time.sleep(0.005)
+        raise TimeoutError(f"uvicorn was not ready within {timeout} seconds")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start time to readiness")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per variant")
+    parser.add_argument("--faqs", type=int, default=0, help="Synthetic FAQ corpus size (0 uses data/faqs.json)")
+    parser.add_argument("--skip-uvicorn", action="store_true", help="Skip the spawn-to-ready runs through uvicorn")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="support-startup-"))
+    faq_path = Path(FAQ_PATH)
+    if args.faqs:
+        from .microbench import synthetic_faqs
+
+        faq_path = workdir / "faqs.json"
+        faq_path.write_text(json.dumps(synthetic_faqs(args.faqs)), encoding="utf-8")
+    index_path = workdir / "faqs.idx"
+    env = _env(workdir, faq_path, index_path)
+
+    rows: List[Dict[str, Any]] = []
+    # "cold" removes the compiled index before every run, so the FAQ index is built from JSON;
+    # "cached" keeps the file the previous run left behind and maps it instead.
+    for variant in ("cold", "cached"):
+        results = []
+        for _ in range(args.runs):
+            if variant == "cold":
+                index_path.unlink(missing_ok=True)
+            results.append(run_probe(env))
+        if any(result["status"] != 200 for result in results):
+            raise RuntimeError(f"/api/ready did not answer 200 in the {variant} runs")
+        for phase in ("import_s", "startup_s", "wall_s"):
+            rows.append(
+                {
+                    "variant": variant,
+                    "phase": phase[:-2],
+                    **summarize([result[phase] for result in results]),
+                    "openai_imported": any(result["openai_imported"] for result in results),
+                }
+            )
+    print_table(f"In-process startup ({args.runs} fresh processes per variant)", rows)
+
+    if not args.skip_uvicorn:
+        samples = [run_uvicorn(env) for _ in range(args.runs)]
+        print_table("uvicorn spawn to /api/ready", [{"variant": "cached", **summarize(samples)}])
+
+
+if __name__ == "__main__":
+    main()
@@ -57,6 +57,8 @@ def print_response(response: dict[str, Any], show_details: bool = True) -> None:
         
         if response.get('created_ticket'):
             print(f"   🎫 Ticket #{response.get('ticket_id')} created")
+        elif response.get('ticket_id'):
+            print(f"   🎫 Added to ticket #{response.get('ticket_id')}")
         
         if response.get('context_summary'):
             print(f"   📄 Context: {response.get('context_summary')[:60]}...")
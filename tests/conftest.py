@@ -0,0 +1,19 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def database(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Points ``app.db`` at a fresh SQLite file (pooled, so threads get their own connections)."""
+    path = tmp_path / "support.sqlite3"
+    db.close_pool()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db()
+    yield path
+    db.close_pool()
+    db.history_cache.clear()
+    db.rollups.drain()
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, time, timedelta
+
+from app import analytics, db
+
+NOW = datetime.combine(datetime.utcnow().date(), time(12))
+TODAY = NOW.date().isoformat()
+YESTERDAY = (NOW - timedelta(days=1)).replace(hour=9).isoformat()
+
+
+class _Storage:
+    async def rebuild_rollups(self, until):
+        db.rebuild_rollups(until)
+
+
+def _day_rollups():
+    return {
+        (row["bucket"], row["metric"], row["dimension"]): row["value"] for row in db.read_rollups("day", "")
+    }
+
+
+def test_rebuild_recomputes_past_days_and_keeps_recent_deltas(database):
+    with db.get_connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO chat_logs (user_message, bot_response, intent, confidence, created_at, session_id, source)
+            VALUES ('refund?', 'answer', 'refund', 0.5, ?, 'alice', 'faq')
+            """,
+            (YESTERDAY,),
+        )
+    # A stale count in the table and a leftover delta for yesterday, and one new chat today.
+    db.merge_rollups({("day", YESTERDAY[:10], "chats", "refund"): 5.0})
+    analytics.rollups.record_chat(YESTERDAY, "refund", 0.5, "faq")
+    db.insert_chat_log("hello", "hi", "general", 0.9, "bob", "faq")
+
+    until = asyncio.run(analytics.rebuild(_Storage(), now=NOW))
+
+    assert until == TODAY
+    rollups = _day_rollups()
+    assert rollups[(YESTERDAY[:10], "chats", "refund")] == 1
+    assert not any(bucket == TODAY for bucket, _, _ in rollups)
+    pending = {
+        (row["bucket"], row["metric"], row["dimension"]): row["value"] for row in analytics.rollups.peek("day", "")
+    }
+    assert pending == {
+        (TODAY, "chats", "general"): 1,
+        (TODAY, "confidence_sum", "general"): 0.9,
+        (TODAY, "answers", "faq"): 1,
+    }
+
+    # Today's chat is counted once, by its delta.
+    db.merge_rollups(analytics.rollups.drain())
+    assert _day_rollups()[(TODAY, "chats", "general")] == 1
+
+
+def test_rebuild_counts_tickets_by_the_priority_they_were_opened_with(database):
+    ticket_id, _ = db.open_ticket("question", "alice", "general", 0.3)
+    chat_log_id = db.insert_chat_log("question", "answer", "general", 0.3, "alice")
+    db.insert_feedback(chat_log_id, "down", None)
+    with db.get_connection() as conn:
+        conn.execute("UPDATE tickets SET created_at = ? WHERE id = ?", (YESTERDAY, ticket_id))
+        ticket = conn.execute("SELECT priority, opened_priority FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+    assert (ticket["priority"], ticket["opened_priority"]) == ("high", "normal")
+
+    asyncio.run(analytics.rebuild(_Storage(), now=NOW))
+
+    rollups = _day_rollups()
+    assert rollups[(YESTERDAY[:10], "tickets", "normal")] == 1
+    assert (YESTERDAY[:10], "tickets", "high") not in rollups
@@ -0,0 +1,35 @@
+from app.cache import ResponseCache, response_cache_key
+
+MODEL = "gpt-3.5-turbo"
+
+
+def test_key_ignores_case_punctuation_and_accents():
+    assert response_cache_key("Where is my ORDER?", None, MODEL) == response_cache_key("where is my order", None, MODEL)
+    assert response_cache_key("¿Dónde está?", None, MODEL) == response_cache_key("donde esta", None, MODEL)
+
+
+def test_non_latin_questions_get_distinct_keys():
+    keys = {
+        response_cache_key(question, None, MODEL)
+        for question in ("Где мой заказ?", "Как вернуть деньги?", "注文はどこですか", "返金してください", "😀😀😀", "😢")
+    }
+    assert len(keys) == 6
+    assert response_cache_key("Где мой заказ?", None, MODEL) == response_cache_key("где МОЙ заказ", None, MODEL)
+
+
+def test_key_depends_on_context_and_model():
+    key = response_cache_key("refund", None, MODEL)
+    assert key != response_cache_key("refund", "Refunds take 5 days.", MODEL)
+    assert key != response_cache_key("refund", None, "gpt-4")
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["evictions"] == 1
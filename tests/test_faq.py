@@ -0,0 +1,102 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from app.config import BASE_DIR, FAQ_MATCH_THRESHOLD, FAQ_SEMANTIC_THRESHOLD
+from app.faq import FAQService, rescale_semantic
+
+FAQ_PATH = BASE_DIR / "data" / "faqs.json"
+DEMO_QUERIES = json.loads((BASE_DIR / "data" / "demo_queries.json").read_text(encoding="utf-8"))["categories"]
+
+
+def _service(mode: str, faq_path: Path = FAQ_PATH) -> FAQService:
+    service = FAQService(faq_path, mode=mode, reload_interval=-1)
+    service.load()
+    return service
+
+
+def _faq_hits(service: FAQService, queries: list) -> int:
+    return sum(score >= FAQ_MATCH_THRESHOLD for _, score in service.best_matches(queries))
+
+
+def test_semantic_scores_are_rescaled_onto_the_match_threshold():
+    assert rescale_semantic(0.0) == 0.0
+    assert rescale_semantic(FAQ_SEMANTIC_THRESHOLD) == pytest.approx(FAQ_MATCH_THRESHOLD)
+    assert rescale_semantic(1.0) == pytest.approx(1.0)
+    assert rescale_semantic(0.2) < rescale_semantic(0.3) < rescale_semantic(0.6)
+
+
+def test_semantic_mode_answers_the_demo_faq_queries_like_lexical_mode():
+    pytest.importorskip("numpy")
+    faq_queries = DEMO_QUERIES["faq_matching"]["queries"]
+    other_queries = [
+        query
+        for name in ("conversational", "escalation", "low_confidence", "edge_cases")
+        for query in DEMO_QUERIES[name]["queries"]
+        if query.strip()
+    ]
+    lexical, semantic = _service("lexical"), _service("semantic")
+
+    assert _faq_hits(semantic, faq_queries) >= _faq_hits(lexical, faq_queries) - 1
+    assert _faq_hits(semantic, other_queries) <= _faq_hits(lexical, other_queries)
+    # Single and batched lookups report the same, rescaled score.
+    assert semantic.best_match(faq_queries[0]) == semantic.best_matches(faq_queries[:1])[0]
+
+
+@pytest.fixture
+def editable(tmp_path: Path) -> FAQService:
+    path = tmp_path / "faqs.json"
+    path.write_bytes(FAQ_PATH.read_bytes())
+    return _service("lexical", path)
+
+
+def test_upsert_adds_and_replaces_entries_through_the_delta(editable):
+    editable.upsert("Do you ship to Canada?", "Yes, we ship to Canada.")
+    editable.upsert("How can I reset my password?", "Ask support to reset it.")
+
+    assert editable.best_match("Do you ship to Canada?") == ("Yes, we ship to Canada.", 1.0)
+    assert editable.best_match("How can I reset my password?")[0] == "Ask support to reset it."
+    stats = editable.stats()
+    assert stats["delta_entries"] == 2 and stats["tombstones"] == 1
+    # The file is written back, and the watcher does not treat our own write as a change.
+    assert not editable.reload()
+    reloaded = _service("lexical", editable.faq_path)
+    assert reloaded.best_match("do you ship to canada")[0] == "Yes, we ship to Canada."
+
+
+def test_delete_hides_the_entry_and_reports_unknown_questions(editable):
+    question = "How can I reset my password?"
+    answer, _ = editable.best_match(question)
+
+    assert editable.delete(question)
+    assert editable.best_match(question)[0] != answer
+    assert not editable.delete(question)
+    assert editable.stats()["tombstones"] == 1
+
+
+def test_restoring_the_base_answer_drops_the_overlay(editable):
+    question = "How can I reset my password?"
+    answer, _ = editable.best_match(question)
+
+    editable.upsert(question, "Something else.")
+    editable.upsert(question, answer)
+
+    assert editable.stats()["delta_entries"] == 0 and editable.stats()["tombstones"] == 0
+    assert editable.best_match(question)[0] == answer
+
+
+def test_large_deltas_are_compacted_in_the_background(editable):
+    for i in range(40):
+        editable.upsert(f"Is product number {i} in stock?", f"Product {i} is in stock.")
+
+    for _ in range(200):
+        if editable.stats()["reloads"]:
+            break
+        time.sleep(0.01)
+    stats = editable.stats()
+    assert stats["reloads"] == 1
+    assert stats["delta_entries"] + stats["tombstones"] < 40
+    assert editable.best_match("is product number 7 in stock")[0] == "Product 7 is in stock."
+    assert editable.best_match("is product number 39 in stock")[0] == "Product 39 is in stock."
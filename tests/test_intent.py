@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from app.intent import INTENT_KEYWORDS, IntentAutomaton, IntentMatcher
+
+
+@pytest.fixture
+def automaton():
+    return IntentAutomaton(INTENT_KEYWORDS)
+
+
+@pytest.mark.parametrize(
+    "message, intent",
+    [
+        ("Where is my order?", "order_tracking"),
+        ("I want a REFUND", "refund"),
+        ("my refunds never arrived", "refund"),
+        ("Please escalate this", "escalation"),
+        ("it was escalated yesterday", "escalation"),
+        ("I can't log in, login fails", "account_help"),
+        ("hello there", "general"),
+    ],
+)
+def test_detects_the_builtin_intents(automaton, message, intent):
+    assert automaton.detect(message)[0] == intent
+
+
+def test_phrases_match_on_word_boundaries_only(automaton):
+    # "agent*" must not fire inside "magenta", nor "tracking" inside "backtracking".
+    assert automaton.detect("a magenta shirt")[0] == "general"
+    assert automaton.detect("backtracking")[0] == "general"
+    assert automaton.detect("agent, please")[0] == "escalation"
+
+
+def test_star_matches_longer_words_but_plain_phrases_do_not():
+    automaton = IntentAutomaton({"shipping": ["ship*", "box"]})
+
+    assert automaton.detect("shipped yesterday") == ("shipping", 0.5)
+    assert automaton.detect("boxes everywhere") == ("general", 0.0)
+    assert automaton.detect("ship the box") == ("shipping", 1.0)
+
+
+def test_overlapping_phrases_are_all_found():
+    automaton = IntentAutomaton({"order": ["my order", "order status", "status"]})
+
+    assert automaton.detect("what is my order status") == ("order", 1.0)
+
+
+def test_score_counts_only_the_phrases_actually_added():
+    automaton = IntentAutomaton({"refund": ["refund", "", "*", "   "]})
+
+    assert automaton.phrase_counts == [1]
+    assert automaton.detect("refund please") == ("refund", 1.0)
+
+
+def test_matcher_falls_back_to_the_builtin_table_and_reloads_the_file(tmp_path):
+    path = tmp_path / "intents.json"
+    matcher = IntentMatcher(path, reload_interval=0)
+    assert matcher.detect("I need a human") == ("escalation", 0.25)
+
+    path.write_text(json.dumps({"intents": {"greeting": ["hello", "hi"]}}), encoding="utf-8")
+    assert matcher.detect("hello") == ("greeting", 0.5)
+
+    path.write_text("not json", encoding="utf-8")
+    os.utime(path, (0, 12345))
+    assert matcher.detect("hello") == ("greeting", 0.5)
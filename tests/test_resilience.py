@@ -0,0 +1,169 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app import llm
+from app.resilience import CallLimiter, CircuitBreaker, LLMUnavailable
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def _open_breaker(reset_timeout=60.0):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def _half_open_breaker():
+    breaker = _open_breaker(reset_timeout=0.01)
+    time.sleep(0.02)
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = _half_open_breaker()
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = _half_open_breaker()
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["opened"] == 2
+
+
+def test_abandoned_probe_frees_the_slot():
+    breaker = _half_open_breaker()
+    assert breaker.allow()
+
+    breaker.record_abandoned()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_limiter_caps_concurrent_calls():
+    limiter = CallLimiter(max_concurrency=1, rate=0)
+    limiter.acquire(timeout=0.1)
+
+    with pytest.raises(LLMUnavailable) as error:
+        limiter.acquire(timeout=0.02)
+    assert error.value.reason == "rate_limited"
+
+    limiter.release()
+    limiter.acquire(timeout=0.1)
+    limiter.release()
+
+
+def _status_error(cls, status):
+    response = httpx.Response(status, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return cls("rejected", response=response, body=None)
+
+
+class _FakeClient:
+    def __init__(self, create):
+        self.calls = 0
+
+        def counted(**kwargs):
+            self.calls += 1
+            return create(**kwargs)
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=counted))
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(llm, "breaker", breaker)
+    monkeypatch.setattr(llm, "limiter", CallLimiter(max_concurrency=4, rate=0))
+
+    def install(create, attribute="client"):
+        fake = _FakeClient(create)
+        monkeypatch.setattr(llm, attribute, fake)
+        return fake
+
+    return breaker, install
+
+
+def test_rejected_api_key_opens_the_breaker_without_retries(fake_llm):
+    breaker, install = fake_llm
+
+    def create(**kwargs):
+        raise _status_error(openai.AuthenticationError, 401)
+
+    fake = install(create)
+    for _ in range(2):
+        with pytest.raises(openai.AuthenticationError):
+            llm._complete(MESSAGES)
+
+    with pytest.raises(LLMUnavailable):
+        llm._complete(MESSAGES)
+    assert fake.calls == 2
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_bad_request_does_not_count_against_the_provider(fake_llm):
+    breaker, install = fake_llm
+
+    def create(**kwargs):
+        raise _status_error(openai.BadRequestError, 400)
+
+    install(create)
+    for _ in range(3):
+        with pytest.raises(openai.BadRequestError):
+            llm._complete(MESSAGES)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_cancelled_probe_lets_the_next_call_probe(fake_llm, monkeypatch):
+    breaker, install = fake_llm
+    monkeypatch.setattr(llm, "breaker", _half_open_breaker())
+
+    async def create(**kwargs):
+        await asyncio.sleep(10)
+
+    install(create, attribute="async_client")
+
+    async def probe_and_cancel():
+        task = asyncio.ensure_future(llm._acomplete(MESSAGES))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(probe_and_cancel())
+
+    assert llm.breaker.state == CircuitBreaker.HALF_OPEN
+    assert llm.breaker.allow()
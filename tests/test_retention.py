@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.retention import read_partition, resolve_chat_log, run_retention
+
+
+def _add_chat_log(message, days_ago):
+    created_at = (datetime.utcnow() - timedelta(days=days_ago)).isoformat()
+    with db.get_connection() as conn:
+        return conn.execute(
+            """
+            INSERT INTO chat_logs (user_message, bot_response, intent, confidence, created_at, session_id, source)
+            VALUES (?, 'answer', 'general', 0.5, ?, 'alice', 'faq')
+            """,
+            (message, created_at),
+        ).lastrowid
+
+
+def _live_ids():
+    with db.get_connection() as conn:
+        return [row["id"] for row in conn.execute("SELECT id FROM chat_logs ORDER BY id")]
+
+
+def test_expired_logs_are_archived_by_day_and_stay_resolvable(database, tmp_path):
+    archive_dir = tmp_path / "archive"
+    old = [_add_chat_log(f"old {i}", days_ago=40 - i // 2) for i in range(4)]
+    recent = _add_chat_log("recent", days_ago=1)
+
+    result = run_retention(days=30, archive_dir=archive_dir, chunk_size=3)
+
+    assert result["archived"] == 4
+    assert result["chunks"] == 2
+    assert _live_ids() == [recent]
+    files = sorted(archive_dir.rglob("*.json.gz"))
+    assert {path.parent.name for path in files} == {
+        f"date={(datetime.utcnow() - timedelta(days=days)).date().isoformat()}" for days in (40, 39)
+    }
+    assert sorted(row["id"] for path in files for row in read_partition(path)) == old
+
+    archived = resolve_chat_log(old[2], archive_dir)
+    assert archived["archived"] is True
+    assert archived["user_message"] == "old 2"
+    assert archived["session_id"] == "alice"
+    live = resolve_chat_log(recent, archive_dir)
+    assert live["archived"] is False
+    assert live["user_message"] == "recent"
+    assert resolve_chat_log(recent + 1, archive_dir) is None
+
+
+def test_a_second_run_finds_nothing_left_to_archive(database, tmp_path):
+    archive_dir = tmp_path / "archive"
+    _add_chat_log("old", days_ago=40)
+    run_retention(days=30, archive_dir=archive_dir)
+
+    assert run_retention(days=30, archive_dir=archive_dir) == {"archived": 0, "chunks": 0, "pages_freed": 0}
+    assert run_retention(days=0, archive_dir=archive_dir)["archived"] == 0
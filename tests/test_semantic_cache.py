@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.semantic_cache import SemanticCache  # noqa: E402
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(capacity=4, threshold=0.9)
+
+
+def test_near_duplicates_share_an_answer(cache):
+    cache.add("How do I reset my password?", "Use the reset link.")
+
+    assert cache.lookup("how do I reset my password") == "Use the reset link."
+    assert cache.lookup("What payment methods do you accept?") is None
+
+
+def test_non_latin_questions_are_not_all_similar(cache):
+    cache.add("Где мой заказ?", "Заказ в пути.")
+
+    assert cache.lookup("где мой заказ") == "Заказ в пути."
+    assert cache.lookup("Как вернуть деньги?") is None
+    assert cache.lookup("注文はどこですか") is None
+
+
+def test_questions_without_words_are_not_cached(cache):
+    cache.add("😀😀😀", "Glad to help!")
+
+    assert cache.stats()["entries"] == 0
+    assert cache.lookup("?!") is None
+
+
+def test_answers_are_only_reused_under_the_same_faq_context(cache):
+    cache.add("Can I get a refund?", "Refunds take 5 days.", context="Refund policy A")
+
+    assert cache.lookup("can I get a refund", context="Refund policy A") == "Refunds take 5 days."
+    assert cache.lookup("can I get a refund", context="Refund policy B") is None
+    assert cache.lookup("can I get a refund") is None
+
+    cache.add("Can I get a refund?", "Refunds take 10 days.", context="Refund policy B")
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("can I get a refund", context="Refund policy B") == "Refunds take 10 days."
+
+
+def test_full_cache_overwrites_the_least_recently_used_slot(cache):
+    questions = ["track my order", "reset my password", "cancel subscription", "gift wrapping"]
+    for question in questions:
+        cache.add(question, question.upper())
+    cache.lookup("track my order")
+
+    cache.add("change shipping address", "ADDRESS")
+
+    assert cache.lookup("reset my password") is None
+    assert cache.lookup("track my order") == "TRACK MY ORDER"
+    assert cache.stats()["evictions"] == 1
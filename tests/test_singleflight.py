@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.run("key", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.run("key", work))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in (leader, *followers):
+        thread.join(5)
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert flights.stats() == {"leaders": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_remembered():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.run("key", fail)
+    assert flights.run("key", lambda: "recovered") == "recovered"
+
+
+def test_coroutines_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flights.arun("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flights.arun("key", work))
+        second = asyncio.ensure_future(flights.arun("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+    assert flights.stats() == {"leaders": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_the_shared_call_finishes_when_every_caller_went_away():
+    flights = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        finished.append(True)
+        raise ValueError("nobody is listening")
+
+    async def main():
+        caller = asyncio.ensure_future(flights.arun("key", work))
+        await asyncio.sleep(0.005)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+
+    assert finished == [True]
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from app import db
+from app.config import DEFAULT_SESSION_ID
+from app.tickets import ticket_message
+
+
+def _ticket(ticket_id):
+    return next(dict(row) for row in db.list_tickets(limit=200) if row["id"] == ticket_id)
+
+
+def test_distinct_sessions_get_their_own_tickets(database):
+    first, first_created = db.open_ticket("where is my refund", "alice", "general", 0.3)
+    second, second_created = db.open_ticket("I need an agent", "bob", "escalation", 0.5)
+
+    assert first_created and second_created
+    assert first != second
+    assert _ticket(first)["session_id"] == "alice"
+    assert _ticket(second)["session_id"] == "bob"
+
+
+def test_repeat_contact_is_appended_to_the_sessions_active_ticket(database):
+    ticket_id, _ = db.open_ticket("where is my refund", "alice", "general", 0.3)
+    repeat_id, created = db.open_ticket("still waiting, get me a human", "alice", "escalation", 0.5)
+
+    ticket = _ticket(ticket_id)
+    assert repeat_id == ticket_id and not created
+    assert ticket["user_message"] == "where is my refund\nstill waiting, get me a human"
+    assert ticket["contacts"] == 2
+    assert ticket["priority"] == "urgent"
+    assert len(db.list_tickets()) == 1
+
+
+def test_repeat_contacts_keep_the_first_and_newest_text_within_the_cap(database, monkeypatch):
+    monkeypatch.setattr(db, "ticket_message", lambda message, thread=None: ticket_message(message, thread, limit=60))
+    ticket_id, _ = db.open_ticket("where is my refund", "alice", "general", 0.3)
+    for i in range(20):
+        db.open_ticket(f"still waiting {i}", "alice", "general", 0.3)
+
+    ticket = _ticket(ticket_id)
+    assert len(ticket["user_message"]) <= 60
+    assert ticket["user_message"] == "where is my refund\n…\nstill waiting 18\nstill waiting 19"
+    assert ticket["contacts"] == 21
+
+
+def test_ticket_message_caps_single_long_messages():
+    assert ticket_message("b", "a", limit=0) == "a\nb"
+    assert ticket_message("x" * 50, limit=20) == "x" * 10 + "\n…\n" + "x" * 7
+    assert ticket_message("y" * 30, "first\n…\nolder", limit=20) == "first\n…\n" + "y" * 12
+
+
+def test_default_session_tickets_are_never_merged(database):
+    messages = ["first customer needs a human", "second customer wants an agent", "third one escalates"]
+    results = [db.open_ticket(message, DEFAULT_SESSION_ID, "escalation", 0.5) for message in messages]
+
+    assert all(created for _, created in results)
+    assert len({ticket_id for ticket_id, _ in results}) == 3
+    for (ticket_id, _), message in zip(results, messages):
+        ticket = _ticket(ticket_id)
+        assert ticket["user_message"] == message
+        assert ticket["contacts"] == 1
+        assert ticket["session_id"] is None
+
+
+def test_resolved_ticket_is_not_reopened_but_counts_as_a_repeat(database):
+    ticket_id, _ = db.open_ticket("question", "alice", "general", 0.3)
+    assert db.claim_ticket("agent-1", 60)["id"] == ticket_id
+    assert db.release_ticket(ticket_id, "agent-1", "resolved") is not None
+
+    new_id, created = db.open_ticket("another question", "alice", "general", 0.3)
+
+    assert created and new_id != ticket_id
+    assert _ticket(new_id)["priority"] == "high"
+
+
+def test_negative_feedback_raises_the_sessions_ticket(database):
+    ticket_id, _ = db.open_ticket("question", "alice", "general", 0.3)
+    other_id, _ = db.open_ticket("question", "bob", "general", 0.3)
+    chat_log_id = db.insert_chat_log("question", "answer", "general", 0.3, "alice")
+
+    db.insert_feedback(chat_log_id, "down", None)
+
+    ticket = _ticket(ticket_id)
+    assert ticket["negative_feedback"] == 1
+    assert ticket["priority"] == "high"
+    assert ticket["due_at"] < _ticket(other_id)["due_at"]
+    assert _ticket(other_id)["negative_feedback"] == 0
+
+
+def test_claim_takes_the_earliest_deadline_first(database):
+    normal_id, _ = db.open_ticket("question", "alice", "general", 0.3)
+    urgent_id, _ = db.open_ticket("agent now", "bob", "escalation", 0.1)
+
+    assert db.claim_ticket("agent-1", 60)["id"] == urgent_id
+    assert db.claim_ticket("agent-2", 60)["id"] == normal_id
+    assert db.claim_ticket("agent-3", 60) is None
+
+
+def test_claimed_ticket_is_held_by_one_agent(database):
+    ticket_id, _ = db.open_ticket("question", "alice", "general", 0.3)
+
+    claimed = db.claim_ticket("agent-1", 60)
+
+    assert claimed["status"] == "claimed" and claimed["claimed_by"] == "agent-1"
+    assert db.claim_ticket("agent-2", 60) is None
+    assert db.renew_ticket(ticket_id, "agent-2", 60) is None
+    assert db.release_ticket(ticket_id, "agent-2", "resolved") is None
+    assert db.renew_ticket(ticket_id, "agent-1", 120)["claimed_by"] == "agent-1"
+    assert db.release_ticket(ticket_id, "agent-1", "open")["status"] == "open"
+    assert db.claim_ticket("agent-2", 60)["id"] == ticket_id
+
+
+def test_concurrent_claims_never_share_a_ticket(database):
+    ticket_ids = {db.open_ticket(f"question {i}", f"session-{i}", "general", 0.3)[0] for i in range(20)}
+    claimed = []
+    lock = threading.Lock()
+
+    def agent(name):
+        while True:
+            row = db.claim_ticket(name, 60)
+            if row is None:
+                return
+            with lock:
+                claimed.append(row["id"])
+
+    threads = [threading.Thread(target=agent, args=(f"agent-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(ticket_ids)
+
+
+def test_expired_lease_returns_the_ticket_to_the_queue(database):
+    ticket_id, _ = db.open_ticket("question", "alice", "general", 0.3)
+    assert db.claim_ticket("agent-1", 0.01)["id"] == ticket_id
+    time.sleep(0.05)
+
+    reclaimed = db.claim_ticket("agent-2", 60)
+
+    assert reclaimed["id"] == ticket_id and reclaimed["claimed_by"] == "agent-2"
+    assert db.renew_ticket(ticket_id, "agent-1", 60) is None
+    assert db.release_ticket(ticket_id, "agent-1", "resolved") is None
+    assert _ticket(ticket_id)["claimed_by"] == "agent-2"
+
+
+def test_batch_tickets_are_deduplicated_like_single_ones(database):
+    entries = [
+        ("talk to a human", "answer", "escalation", 0.5, "alice", True, "llm"),
+        ("human please", "answer", "escalation", 0.5, "alice", True, "llm"),
+        ("agent!", "answer", "escalation", 0.5, DEFAULT_SESSION_ID, True, "llm"),
+        ("agent?", "answer", "escalation", 0.5, DEFAULT_SESSION_ID, True, "llm"),
+        ("thanks", "answer", "general", 0.9, "bob", False, "faq"),
+    ]
+
+    results = db.insert_chat_batch(entries)
+
+    assert [created for _, _, created in results] == [True, False, True, True, False]
+    assert results[0][1] == results[1][1]
+    assert results[2][1] != results[3][1]
+    assert results[4][1] is None
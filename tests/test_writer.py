@@ -0,0 +1,95 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from app import db
+from app.writer import WriteBehindWriter, is_transient
+
+_INSERT = """
+    INSERT INTO chat_logs (id, user_message, bot_response, intent, confidence, created_at, session_id, source)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _row(message):
+    return (message, "answer", "general", 0.5, "2024-01-01T00:00:00", "alice", "faq")
+
+
+@pytest.fixture
+def writer(database):
+    # Flushes only when the test asks for it.
+    writer = WriteBehindWriter(db.get_connection, batch_size=1000, flush_interval=60, id_block_size=10)
+    yield writer
+    writer.close(timeout=0)
+
+
+def _chat_log_ids():
+    with db.get_connection() as conn:
+        return [row["id"] for row in conn.execute("SELECT id FROM chat_logs ORDER BY id")]
+
+
+def test_ids_come_from_a_reserved_block_that_direct_inserts_skip(writer):
+    queued = [writer.submit("chat_logs", _INSERT, _row(f"question {i}")) for i in range(3)]
+    direct = db.insert_chat_log("direct", "answer", "general", 0.5, "bob")
+
+    assert queued == [1, 2, 3]
+    assert direct == 11
+    assert [row[0] for row in writer.pending("chat_logs")] == queued
+    assert writer.flush() == 3
+    assert writer.pending("chat_logs") == []
+    assert _chat_log_ids() == [1, 2, 3, 11]
+
+
+def test_a_failing_row_does_not_hold_back_the_batch(writer):
+    good = writer.submit("chat_logs", _INSERT, _row("fine"))
+    bad = writer.submit("chat_logs", _INSERT, _row(None))
+    later = writer.submit("chat_logs", _INSERT, _row("also fine"))
+
+    assert writer.flush() == 2
+    assert _chat_log_ids() == [good, later]
+    # The bad row is retried on the next flushes and dropped after max_attempts.
+    assert [row[0] for row in writer.pending("chat_logs")] == [bad]
+    writer.flush()
+    writer.flush()
+    assert writer.pending("chat_logs") == []
+    assert writer.stats()["dropped_rows"] == 1
+
+    writer.submit("chat_logs", _INSERT, _row("after the bad row"))
+    assert writer.flush() == 1
+
+
+def test_a_locked_database_requeues_the_whole_batch(database):
+    locked = False
+
+    @contextmanager
+    def connection():
+        if locked:
+            raise sqlite3.OperationalError("database is locked")
+        with db.get_connection() as conn:
+            yield conn
+
+    writer = WriteBehindWriter(connection, batch_size=1000, flush_interval=60, id_block_size=10)
+    ids = [writer.submit("chat_logs", _INSERT, _row(f"question {i}")) for i in range(2)]
+    locked = True
+    for _ in range(writer.max_attempts + 1):
+        with pytest.raises(sqlite3.OperationalError) as error:
+            writer.flush()
+        assert is_transient(error.value)
+    assert [row[0] for row in writer.pending("chat_logs")] == ids
+
+    locked = False
+    assert writer.flush() == 2
+    assert writer.stats()["dropped_rows"] == 0
+    writer.close(timeout=0)
+
+
+def test_close_drains_the_queue_without_raising(database):
+    writer = WriteBehindWriter(db.get_connection, batch_size=1000, flush_interval=0.01, id_block_size=10)
+    good = writer.submit("chat_logs", _INSERT, _row("fine"))
+    writer.submit("chat_logs", _INSERT, _row(None))
+
+    writer.close()
+
+    assert _chat_log_ids() == [good]
+    assert writer.stats()["queued"] == 0